@@ -1,99 +1,405 @@
 #!/usr/bin/env python3
 
+import argparse
 import boto3
+import csv
+import io
+import json
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
-# Set up AWS credentials from environment
-aws_access_key_id = os.environ.get('BEEPMEDIA_AWS_ACCESS_KEY_ID')
-aws_secret_access_key = os.environ.get('BEEPMEDIA_AWS_SECRET_ACCESS_KEY')
-
-if not aws_access_key_id or not aws_secret_access_key:
-    print("Error: AWS credentials not found in environment variables")
-    print("Please set BEEPMEDIA_AWS_ACCESS_KEY_ID and BEEPMEDIA_AWS_SECRET_ACCESS_KEY")
-    exit(1)
-
-# Create EC2 client
-ec2_client = boto3.client(
-    'ec2',
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-    region_name='us-east-1'  # Default region, will try multiple regions
-)
-
-# Get all regions
-regions = [region['RegionName'] for region in ec2_client.describe_regions()['Regions']]
-
-print(f"Checking Elastic IPs across {len(regions)} regions...")
-print("-" * 80)
-
-total_allocated = 0
-total_associated = 0
-total_unassociated = 0
-
-for region in regions:
-    # Create regional client
-    regional_client = boto3.client(
-        'ec2',
+# Regional scans are network-bound; one worker per region is plenty
+MAX_WORKERS = 32
+
+# Approximate cost (as of 2024, AWS charges ~$0.005/hour for unassociated EIPs)
+EIP_HOURLY_COST = 0.005
+
+# Cached region lists and per-region results are reused for this long
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'mcp-inventory'
+DEFAULT_CACHE_TTL = 900
+REGIONS_CACHE_TTL = 24 * 3600
+
+# Written by repos/fleet_inventory.py
+FLEET_SNAPSHOT_NAME = 'fleet-snapshot.json'
+
+CSV_FIELDS = ['region', 'public_ip', 'allocation_id', 'associated', 'instance_id',
+              'network_interface_id', 'association_id', 'private_ip', 'name', 'hourly_cost']
+
+
+def create_session():
+    """Create one boto3 session from the beepmedia credentials in the environment"""
+    aws_access_key_id = os.environ.get('BEEPMEDIA_AWS_ACCESS_KEY_ID')
+    aws_secret_access_key = os.environ.get('BEEPMEDIA_AWS_SECRET_ACCESS_KEY')
+
+    if not aws_access_key_id or not aws_secret_access_key:
+        print("Error: AWS credentials not found in environment variables")
+        print("Please set BEEPMEDIA_AWS_ACCESS_KEY_ID and BEEPMEDIA_AWS_SECRET_ACCESS_KEY")
+        exit(1)
+
+    return boto3.Session(
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
-        region_name=region
+        region_name='us-east-1'  # Default region, will try multiple regions
     )
-    
+
+
+def get_regions(session):
+    """Get all regions"""
+    ec2_client = session.client('ec2')
+    return [region['RegionName'] for region in ec2_client.describe_regions()['Regions']]
+
+
+def is_associated(addr):
+    return bool(addr.get('InstanceId') or addr.get('NetworkInterfaceId'))
+
+
+def scan_region(region, regional_client):
+    """Get Elastic IPs for one region; returns (region, addresses, error)"""
     try:
-        # Get Elastic IPs for this region
         response = regional_client.describe_addresses()
-        addresses = response['Addresses']
-        
-        if addresses:
-            print(f"\nRegion: {region}")
-            print(f"  Elastic IPs: {len(addresses)}")
-            
-            associated = [addr for addr in addresses if 'InstanceId' in addr or 'NetworkInterfaceId' in addr]
-            unassociated = [addr for addr in addresses if 'InstanceId' not in addr and 'NetworkInterfaceId' not in addr]
-            
-            print(f"  - Associated: {len(associated)}")
-            print(f"  - Unassociated: {len(unassociated)}")
-            
-            total_allocated += len(addresses)
-            total_associated += len(associated)
-            total_unassociated += len(unassociated)
-            
-            if unassociated:
-                print(f"  Unassociated IPs:")
-                for addr in unassociated:
-                    print(f"    - {addr['PublicIp']} (Allocation ID: {addr['AllocationId']})")
-                    if 'Tags' in addr:
-                        for tag in addr['Tags']:
-                            if tag['Key'] == 'Name':
-                                print(f"      Name: {tag['Value']}")
-            
-            if associated:
-                print(f"  Associated IPs:")
-                for addr in associated:
-                    instance_id = addr.get('InstanceId', 'N/A')
-                    network_interface = addr.get('NetworkInterfaceId', 'N/A')
-                    print(f"    - {addr['PublicIp']} -> Instance: {instance_id}, Interface: {network_interface}")
-                    if 'Tags' in addr:
-                        for tag in addr['Tags']:
-                            if tag['Key'] == 'Name':
-                                print(f"      Name: {tag['Value']}")
-    
+        return region, response['Addresses'], None
     except Exception as e:
-        # Skip regions with errors (likely permission issues)
-        pass
-
-print("\n" + "=" * 80)
-print(f"SUMMARY:")
-print(f"Total Elastic IPs allocated: {total_allocated}")
-print(f"Total Associated: {total_associated}")
-print(f"Total Unassociated (costing money): {total_unassociated}")
-
-if total_unassociated > 0:
-    # Approximate cost (as of 2024, AWS charges ~$0.005/hour for unassociated EIPs)
-    hourly_cost = total_unassociated * 0.005
-    monthly_cost = hourly_cost * 24 * 30
-    print(f"\nEstimated cost for unassociated IPs:")
-    print(f"  Per hour: ${hourly_cost:.3f}")
-    print(f"  Per month: ${monthly_cost:.2f}")
-    print("\nConsider releasing unassociated Elastic IPs to avoid charges!")
\ No newline at end of file
+        return region, [], e
+
+
+def scan_all_regions(session, regions):
+    """
+    Scan every region concurrently
+
+    Clients are created up front on the calling thread (sessions are not
+    thread-safe, clients are) and then queried in parallel, so a full scan
+    takes about as long as the slowest region.
+    """
+    clients = {region: session.client('ec2', region_name=region) for region in regions}
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(regions)))) as executor:
+        results = list(executor.map(lambda region: scan_region(region, clients[region]), regions))
+    return results
+
+
+class InventoryCache:
+    """JSON files on disk with a fetched_at timestamp and a TTL"""
+
+    def __init__(self, cache_dir, ttl, refresh=False):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def _path(self, name):
+        return self.cache_dir / f'{name}.json'
+
+    def load(self, name, ttl=None):
+        """Return cached data if present and younger than the TTL"""
+        if self.refresh:
+            return None
+        try:
+            entry = json.loads(self._path(name).read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+        if time.time() - entry.get('fetched_at', 0) > (ttl or self.ttl):
+            return None
+        return entry['data']
+
+    def store(self, name, data):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(name)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({'fetched_at': time.time(), 'data': data}, default=str))
+        os.replace(tmp_path, path)
+
+
+def cached_regions(session, cache):
+    regions = cache.load('regions', ttl=REGIONS_CACHE_TTL)
+    if regions is None:
+        regions = get_regions(session)
+        cache.store('regions', regions)
+    return regions
+
+
+def cached_scan(session, regions, cache):
+    """
+    Scan regions, reusing fresh per-region results from the cache
+
+    Only regions without a fresh cache entry are queried. Failed regions
+    are never cached, so they are retried on the next run.
+    """
+    results = {}
+    stale = []
+    for region in regions:
+        cached = cache.load(f'eips-{region}')
+        if cached is None:
+            stale.append(region)
+        else:
+            results[region] = (cached, None)
+
+    if stale:
+        for region, addresses, error in scan_all_regions(session, stale):
+            results[region] = (addresses, error)
+            if error is None:
+                cache.store(f'eips-{region}', addresses)
+
+    return [(region, *results[region]) for region in regions]
+
+
+def snapshot_scan(cache_dir, ttl):
+    """
+    Scan results from the fleet inventory snapshot, or None if it is
+    missing or older than the TTL
+    """
+    try:
+        snapshot = json.loads((Path(cache_dir) / FLEET_SNAPSHOT_NAME).read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if time.time() - snapshot.get('generated_ts', 0) > ttl:
+        return None
+    results = [(region, data['addresses'], None) for region, data in sorted(snapshot['regions'].items())]
+    results += [(region, [], error) for region, error in sorted(snapshot['failed'].items()) if region != 'dns']
+    return results
+
+
+def normalize_address(region, addr):
+    """Flatten an EC2 address record into an inventory row"""
+    tags = {tag['Key']: tag['Value'] for tag in addr.get('Tags', [])}
+    associated = is_associated(addr)
+    return {
+        'region': region,
+        'public_ip': addr.get('PublicIp'),
+        'allocation_id': addr.get('AllocationId'),
+        'associated': associated,
+        'instance_id': addr.get('InstanceId') or None,
+        'network_interface_id': addr.get('NetworkInterfaceId') or None,
+        'association_id': addr.get('AssociationId') or None,
+        'private_ip': addr.get('PrivateIpAddress') or None,
+        'name': tags.get('Name'),
+        'tags': tags,
+        'hourly_cost': 0.0 if associated else EIP_HOURLY_COST
+    }
+
+
+def build_inventory(scan_results):
+    """Machine-readable inventory of addresses per region with totals and failures"""
+    inventory = {
+        'generated_at': datetime.now().isoformat(),
+        'regions': {},
+        'failed_regions': {},
+        'summary': {}
+    }
+    addresses = []
+    for region, region_addresses, error in scan_results:
+        if error is not None:
+            inventory['failed_regions'][region] = str(error)
+            continue
+        rows = [normalize_address(region, addr) for addr in region_addresses]
+        inventory['regions'][region] = rows
+        addresses.extend(rows)
+
+    unassociated = [row for row in addresses if not row['associated']]
+    hourly_cost = len(unassociated) * EIP_HOURLY_COST
+    inventory['summary'] = {
+        'regions_scanned': len(inventory['regions']),
+        'regions_failed': len(inventory['failed_regions']),
+        'total_allocated': len(addresses),
+        'total_associated': len(addresses) - len(unassociated),
+        'total_unassociated': len(unassociated),
+        'hourly_cost': round(hourly_cost, 3),
+        'monthly_cost': round(hourly_cost * 24 * 30, 2)
+    }
+    return inventory
+
+
+def diff_inventories(previous, current):
+    """IPs that became unassociated (or appeared unassociated) since the previous snapshot"""
+    def by_allocation(inventory):
+        return {row['allocation_id']: row
+                for rows in inventory.get('regions', {}).values() for row in rows}
+
+    before = by_allocation(previous)
+    after = by_allocation(current)
+    newly_unassociated = [row for key, row in after.items()
+                          if not row['associated'] and (key not in before or before[key]['associated'])]
+    released = [row for key, row in before.items() if key not in after
+                and row['region'] not in current.get('failed_regions', {})]
+    return {
+        'previous_generated_at': previous.get('generated_at'),
+        'newly_unassociated': newly_unassociated,
+        'released': released
+    }
+
+
+def snapshot_to_save(previous, inventory):
+    """
+    The inventory as stored for the next --diff
+
+    Regions that failed this run keep their rows from the previous
+    snapshot, so a flaky region is not reported as released now and as
+    newly unassociated on the next run.
+    """
+    regions = dict(inventory['regions'])
+    for region in inventory['failed_regions']:
+        if region in previous.get('regions', {}):
+            regions[region] = previous['regions'][region]
+    snapshot = {key: value for key, value in inventory.items() if key != 'diff'}
+    snapshot['regions'] = regions
+    return snapshot
+
+
+def inventory_to_csv(inventory):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for rows in inventory['regions'].values():
+        writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def print_name_tag(addr):
+    if 'Tags' in addr:
+        for tag in addr['Tags']:
+            if tag['Key'] == 'Name':
+                print(f"      Name: {tag['Value']}")
+
+
+def print_region(region, addresses):
+    print(f"\nRegion: {region}")
+    print(f"  Elastic IPs: {len(addresses)}")
+
+    associated = [addr for addr in addresses if is_associated(addr)]
+    unassociated = [addr for addr in addresses if not is_associated(addr)]
+
+    print(f"  - Associated: {len(associated)}")
+    print(f"  - Unassociated: {len(unassociated)}")
+
+    if unassociated:
+        print(f"  Unassociated IPs:")
+        for addr in unassociated:
+            print(f"    - {addr['PublicIp']} (Allocation ID: {addr['AllocationId']})")
+            print_name_tag(addr)
+
+    if associated:
+        print(f"  Associated IPs:")
+        for addr in associated:
+            instance_id = addr.get('InstanceId', 'N/A')
+            network_interface = addr.get('NetworkInterfaceId', 'N/A')
+            print(f"    - {addr['PublicIp']} -> Instance: {instance_id}, Interface: {network_interface}")
+            print_name_tag(addr)
+
+
+def print_text_report(scan_results):
+    total_allocated = 0
+    total_associated = 0
+    total_unassociated = 0
+
+    # Results come back in region order, so output stays deterministic
+    for region, addresses, error in scan_results:
+        if error or not addresses:
+            continue
+
+        print_region(region, addresses)
+        associated = sum(1 for addr in addresses if is_associated(addr))
+        total_allocated += len(addresses)
+        total_associated += associated
+        total_unassociated += len(addresses) - associated
+
+    failed = [(region, error) for region, _, error in scan_results if error]
+    if failed:
+        print(f"\n⚠️  {len(failed)} region(s) could not be scanned:")
+        for region, error in failed:
+            print(f"  - {region}: {error}")
+
+    print("\n" + "=" * 80)
+    print(f"SUMMARY:")
+    print(f"Total Elastic IPs allocated: {total_allocated}")
+    print(f"Total Associated: {total_associated}")
+    print(f"Total Unassociated (costing money): {total_unassociated}")
+
+    if total_unassociated > 0:
+        hourly_cost = total_unassociated * EIP_HOURLY_COST
+        monthly_cost = hourly_cost * 24 * 30
+        print(f"\nEstimated cost for unassociated IPs:")
+        print(f"  Per hour: ${hourly_cost:.3f}")
+        print(f"  Per month: ${monthly_cost:.2f}")
+        print("\nConsider releasing unassociated Elastic IPs to avoid charges!")
+
+
+def print_diff(diff):
+    print(f"\nChanges since {diff['previous_generated_at'] or 'no previous snapshot'}:")
+    if not diff['newly_unassociated'] and not diff['released']:
+        print("  No newly unassociated or released Elastic IPs")
+    for row in diff['newly_unassociated']:
+        name = f" ({row['name']})" if row['name'] else ''
+        print(f"  + Newly unassociated: {row['public_ip']}{name} in {row['region']} [{row['allocation_id']}]")
+    for row in diff['released']:
+        print(f"  - Released: {row['public_ip']} in {row['region']} [{row['allocation_id']}]")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Inventory Elastic IPs across all regions')
+    parser.add_argument('--format', choices=['text', 'json', 'csv'], default='text',
+                        help='Output format (default: text)')
+    parser.add_argument('--output', help='Write the inventory to this file instead of stdout')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help=f'Cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--ttl', type=int, default=DEFAULT_CACHE_TTL,
+                        help=f'Seconds cached region results stay valid (default: {DEFAULT_CACHE_TTL})')
+    parser.add_argument('--refresh', action='store_true', help='Ignore the cache and rescan')
+    parser.add_argument('--from-snapshot', action='store_true',
+                        help='Use the fleet inventory snapshot (repos/fleet_inventory.py) if younger than --ttl')
+    parser.add_argument('--diff', action='store_true',
+                        help='Show IPs that became unassociated since the previous snapshot')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scan_results = snapshot_scan(args.cache_dir, args.ttl) if args.from_snapshot else None
+    if args.from_snapshot and scan_results is None:
+        print("⚠️  No fresh fleet snapshot, scanning instead", file=sys.stderr)
+
+    if scan_results is None:
+        cache = InventoryCache(args.cache_dir, args.ttl, refresh=args.refresh)
+        session = create_session()
+        regions = cached_regions(session, cache)
+
+        if args.format == 'text':
+            print(f"Checking Elastic IPs across {len(regions)} regions...")
+            print("-" * 80)
+
+        scan_results = cached_scan(session, regions, cache)
+    elif args.format == 'text':
+        print(f"Checking Elastic IPs across {len(scan_results)} regions (fleet snapshot)...")
+        print("-" * 80)
+    inventory = build_inventory(scan_results)
+
+    snapshot_path = Path(args.cache_dir) / 'snapshot.json'
+    try:
+        previous = json.loads(snapshot_path.read_text())
+    except (OSError, json.JSONDecodeError):
+        previous = {}
+    if args.diff:
+        inventory['diff'] = diff_inventories(previous, inventory)
+    Path(args.cache_dir).mkdir(parents=True, exist_ok=True)
+    snapshot_path.write_text(json.dumps(snapshot_to_save(previous, inventory), indent=2))
+
+    if args.format == 'text':
+        # The report lists failed regions itself
+        print_text_report(scan_results)
+        if args.diff:
+            print_diff(inventory['diff'])
+        return
+
+    for region, error in inventory['failed_regions'].items():
+        print(f"⚠️  Region {region} failed: {error}", file=sys.stderr)
+
+    output = json.dumps(inventory, indent=2) if args.format == 'json' else inventory_to_csv(inventory)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"Inventory saved to: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,41 +18,16 @@ echo "📋 Copying configuration files..."
 scp -i beepmedia-dev-mcp-key.pem docker-compose.yml ubuntu@3.215.253.37:/opt/mcp-servers/
 scp -i beepmedia-dev-mcp-key.pem nginx.conf ubuntu@3.215.253.37:/opt/mcp-servers/configs/
 
-# Copy and load Docker images
+# Ship Docker images (only layers the server does not already have)
 echo "🐳 Transferring Docker images..."
-for image in mcp-aws mcp-notion mcp-pdf-reader mcp-openai mcp-firecrawl mcp-elevenlabs mcp-redis; do
-    if docker images | grep -q "$image.*test"; then
-        echo "   Saving $image..."
-        docker save "$image:test" | gzip > "$image.tar.gz"
-        echo "   Uploading $image..."
-        scp -i beepmedia-dev-mcp-key.pem "$image.tar.gz" ubuntu@3.215.253.37:/opt/mcp-servers/images/
-        rm "$image.tar.gz"
-    fi
-done
+python3 ship_images.py ship --host ubuntu@3.215.253.37 --key beepmedia-dev-mcp-key.pem --retag latest \
+    mcp-aws:test mcp-notion:test mcp-pdf-reader:test mcp-openai:test mcp-firecrawl:test mcp-elevenlabs:test mcp-redis:test
 
-# Load images and start services on server
+# Configure services on server
 echo "🔧 Setting up services on server..."
 ssh -i beepmedia-dev-mcp-key.pem ubuntu@3.215.253.37 << 'EOF'
 cd /opt/mcp-servers
 
-# Load Docker images
-echo "Loading Docker images..."
-for image in images/*.tar.gz; do
-    if [ -f "$image" ]; then
-        echo "   Loading $(basename $image)..."
-        gunzip -c "$image" | docker load
-    fi
-done
-
-# Tag images as latest
-docker tag mcp-aws:test mcp-aws:latest
-docker tag mcp-notion:test mcp-notion:latest
-docker tag mcp-pdf-reader:test mcp-pdf-reader:latest
-docker tag mcp-openai:test mcp-openai:latest
-docker tag mcp-firecrawl:test mcp-firecrawl:latest
-docker tag mcp-elevenlabs:test mcp-elevenlabs:latest
-docker tag mcp-redis:test mcp-redis:latest
-
 # Create .env file (will be populated with real credentials later)
 cat > .env << 'ENVEOF'
 # AWS Credentials
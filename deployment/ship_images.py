@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Layer-level delta shipping of Docker images to the EC2 host
+Streams `docker save` for each image, but sends only the layers the host
+does not already have; the rest go as placeholders. The host keeps every
+shipped layer in a store addressed by diff_id, rebuilds the full image
+tar from the stream plus the store, and pipes it into `docker load`.
+After the first deploy, a code change usually ships just the top layer.
+
+Images are shipped concurrently. Each one runs as streaming stages with
+no temp files: export (docker save, rewritten on the fly), compression
+(multi-threaded zstd when both ends have it, else pigz or gzip) and
+transfer (ssh). Per-stage throughput and blocked time are reported, so
+it is clear whether disk, CPU or network holds a deploy back.
+
+    # ship to the EC2 host and tag the images :latest there
+    python3 ship_images.py ship mcp-aws:test mcp-notion:test
+
+    # against a local fake layer store, writing the rebuilt tars instead of loading them
+    python3 ship_images.py ship --local /tmp/layer-store --output-dir /tmp/rebuilt mcp-aws:test
+"""
+
+import argparse
+import copy
+import fcntl
+import hashlib
+import io
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+DEFAULT_HOST = 'ubuntu@3.215.253.37'
+DEFAULT_KEY = Path(__file__).resolve().parent / 'beepmedia-dev-mcp-key.pem'
+REMOTE_DIR = '/opt/mcp-servers'
+REMOTE_SCRIPT = f'{REMOTE_DIR}/scripts/ship_images.py'
+REMOTE_STORE = f'{REMOTE_DIR}/layers'
+DEFAULT_IMAGES = ['mcp-aws', 'mcp-notion', 'mcp-pdf-reader', 'mcp-openai',
+                  'mcp-firecrawl', 'mcp-elevenlabs', 'mcp-redis']
+DEFAULT_TAG = 'test'
+
+# Vendor pax keywords: a layer carried in full, or one the host already has
+PAX_LAYER = 'SHIP.layer'
+PAX_REF = 'SHIP.ref'
+STORE_INDEX = 'images.json'
+STORE_LOCK = '.lock'
+COPY_CHUNK = 1024 * 1024
+DEFAULT_JOBS = 3
+# Legacy-format layers have to be hashed before we know whether to send them
+SPOOL_LIMIT = 256 * 1024 * 1024
+
+# Stream codecs, best first: (codec, compress argv, default level); the
+# receiver decompresses zstd with the CLI and gzip with tarfile
+COMPRESSORS = [
+    ('zstd', ['zstd', '-T0', '-q', '-c'], 3),
+    ('gzip', ['pigz', '-c'], 6),
+    ('gzip', ['gzip', '-c'], 6)
+]
+# ssh connection sharing, so concurrent images reuse one session
+SSH_OPTIONS = ['-o', 'BatchMode=yes', '-o', 'ControlMaster=auto',
+               '-o', 'ControlPath=~/.ssh/ship-images-%r@%h:%p', '-o', 'ControlPersist=60']
+
+
+class StageMeter:
+    """Bytes through one pipeline stage and the time it spent blocked on its pipe"""
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.blocked = 0.0
+
+
+class MeteredWriter:
+    """Pipe writer that charges bytes and time blocked in write() to a stage"""
+
+    def __init__(self, raw, meter):
+        self.raw = raw
+        self.meter = meter
+
+    def write(self, data):
+        started = time.perf_counter()
+        written = self.raw.write(data)
+        self.meter.blocked += time.perf_counter() - started
+        self.meter.bytes += len(data)
+        return written
+
+    def flush(self):
+        self.raw.flush()
+
+    def close(self):
+        self.raw.close()
+
+
+class MeteredReader:
+    """Pipe reader that charges bytes and time blocked in read() to a stage"""
+
+    def __init__(self, raw, meter):
+        self.raw = raw
+        self.meter = meter
+
+    def read(self, size=-1):
+        started = time.perf_counter()
+        data = self.raw.read(size)
+        self.meter.blocked += time.perf_counter() - started
+        self.meter.bytes += len(data)
+        return data
+
+
+class Target:
+    """Where the receiving side runs: over ssh on the host, or locally against a store directory"""
+
+    def __init__(self, host=DEFAULT_HOST, key=DEFAULT_KEY, local_store=None):
+        self.host = host
+        self.key = str(key)
+        self.local_store = local_store
+        self.store = local_store or REMOTE_STORE
+
+    def command(self, args):
+        args = [*args, '--store', self.store]
+        if self.local_store:
+            return [sys.executable, str(Path(__file__).resolve()), *args]
+        return ['ssh', '-i', self.key, *SSH_OPTIONS, self.host,
+                shlex.join(['python3', REMOTE_SCRIPT, *args])]
+
+    def install(self):
+        """Copy this script to the host so both ends speak the same stream format"""
+        if self.local_store:
+            return
+        subprocess.run(['ssh', '-i', self.key, self.host, f'mkdir -p {REMOTE_DIR}/scripts {REMOTE_STORE}'],
+                       check=True)
+        subprocess.run(['scp', '-q', '-i', self.key, str(Path(__file__).resolve()),
+                        f'{self.host}:{REMOTE_SCRIPT}'], check=True)
+
+    def have(self, diff_ids):
+        """(diff_ids already in the target's layer store, codecs it can decompress)"""
+        result = subprocess.run(self.command(['have']), input='\n'.join(diff_ids),
+                                capture_output=True, text=True, check=True)
+        words = result.stdout.split()
+        codecs = {word.split(':', 1)[1] for word in words if word.startswith('codec:')}
+        return {word for word in words if word.startswith('sha256:')}, codecs or {'gzip'}
+
+    def prune(self):
+        subprocess.run(self.command(['prune']), check=True)
+
+
+def image_diff_ids(image):
+    """Uncompressed layer digests of a local image, bottom first"""
+    result = subprocess.run(['docker', 'image', 'inspect', '--format', '{{json .RootFS.Layers}}', image],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout)
+
+
+def pick_compressor(codecs, level=None):
+    """(codec, argv) for the best compressor available here that the target can decompress"""
+    for codec, argv, default_level in COMPRESSORS:
+        if codec in codecs and shutil.which(argv[0]):
+            return codec, [*argv, f'-{level or default_level}']
+    raise RuntimeError('no gzip or zstd binary found')
+
+
+def _hash_member(fileobj, size):
+    """Spool a member and return (diff_id, spool) positioned at the start"""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT)
+    digest = hashlib.sha256()
+    remaining = size
+    while remaining:
+        chunk = fileobj.read(min(COPY_CHUNK, remaining))
+        if not chunk:
+            break
+        digest.update(chunk)
+        spool.write(chunk)
+        remaining -= len(chunk)
+    spool.seek(0)
+    return f'sha256:{digest.hexdigest()}', spool
+
+
+def _rewrite(src, dst, diff_ids, present, stats):
+    """Copy a docker save stream, replacing layers the target has with placeholders"""
+    for member in src:
+        if not member.isfile():
+            dst.addfile(member)
+            continue
+
+        data = src.extractfile(member)
+        spool = None
+        diff_id = None
+        match = re.fullmatch(r'blobs/sha256/([0-9a-f]{64})', member.name)
+        if match and f'sha256:{match.group(1)}' in diff_ids:
+            diff_id = f'sha256:{match.group(1)}'
+        elif member.name.endswith('/layer.tar'):
+            diff_id, spool = _hash_member(data, member.size)
+            data = spool
+
+        if diff_id is None:
+            dst.addfile(member, data)
+            continue
+
+        stats['bytes_raw'] += member.size
+        info = copy.copy(member)
+        if diff_id in present:
+            info.size = 0
+            info.pax_headers = {**member.pax_headers, PAX_REF: diff_id}
+            dst.addfile(info)
+            stats['layers_skipped'] += 1
+            stats['bytes_skipped'] += member.size
+        else:
+            info.pax_headers = {**member.pax_headers, PAX_LAYER: diff_id}
+            dst.addfile(info, data)
+            # A layer repeated in the same image goes once
+            present.add(diff_id)
+            stats['layers_sent'] += 1
+        if spool:
+            spool.close()
+
+
+def _pump(src, dst, abort):
+    """
+    Copy the compressor's output to the transfer stage, then close it
+
+    If the receiver goes away, abort() stops the stages upstream;
+    otherwise the compressor would block on a full pipe, and the rewrite
+    feeding it would block with it.
+    """
+    try:
+        while True:
+            chunk = src.read(COPY_CHUNK)
+            if not chunk:
+                break
+            dst.write(chunk)
+    except OSError as e:
+        abort(e)
+    finally:
+        try:
+            dst.close()
+        except OSError:
+            pass
+
+
+def ship_image(target, image, retag=None, output_dir=None, level=None):
+    """
+    Stream one image to the target, skipping layers it already has
+
+    docker save -> rewrite (this thread) -> compressor process -> pump
+    thread -> receiver (ssh). Every stage streams through pipes, so a
+    slow stage stalls the ones before it; the time each spends blocked
+    shows which one that is.
+
+    OCI-layout saves (Docker 25+) name layer blobs by diff_id, so skipped
+    layers are never read. Legacy saves name them by v1 id, so each
+    layer.tar is hashed first (spooled, in memory up to SPOOL_LIMIT).
+
+    Returns:
+        Per-image stats, or None if the image does not exist locally
+    """
+    diff_ids = image_diff_ids(image)
+    if diff_ids is None:
+        return None
+    present, codecs = target.have(diff_ids)
+    codec, compress_argv = pick_compressor(codecs, level)
+    meters = {name: StageMeter(name) for name in ('export', 'compress', 'transfer')}
+    stats = {'image': image, 'codec': codec, 'layers': len(diff_ids), 'layers_sent': 0,
+             'layers_skipped': 0, 'bytes_raw': 0, 'bytes_skipped': 0, 'bytes_wire': 0}
+    started = time.perf_counter()
+
+    args = ['receive', '--name', image, '--codec', codec]
+    if retag:
+        args += ['--retag', retag]
+    if output_dir:
+        args += ['--output-dir', str(output_dir)]
+    receiver = subprocess.Popen(target.command(args), stdin=subprocess.PIPE)
+    compressor = subprocess.Popen(compress_argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    save = subprocess.Popen(['docker', 'save', image], stdout=subprocess.PIPE)
+    receiver_gone = []
+
+    def abort(error):
+        receiver_gone.append(error)
+        save.kill()
+        compressor.kill()
+
+    pump = threading.Thread(target=_pump, daemon=True,
+                            args=(compressor.stdout, MeteredWriter(receiver.stdin, meters['transfer']), abort))
+    pump.start()
+
+    error = None
+    try:
+        with tarfile.open(fileobj=MeteredReader(save.stdout, meters['export']), mode='r|') as src, \
+                tarfile.open(fileobj=MeteredWriter(compressor.stdin, meters['compress']), mode='w|') as dst:
+            _rewrite(src, dst, diff_ids, present, stats)
+        compressor.stdin.close()
+    except (OSError, tarfile.TarError) as e:
+        error = e
+        save.kill()
+        compressor.kill()
+    finally:
+        pump.join()
+        for stream in (save.stdout, compressor.stdout):
+            stream.close()
+
+    # With the stages stopped the receiver sees the end of its input and
+    # exits; report whichever stage failed first
+    receiver.wait()
+    if receiver_gone:
+        raise RuntimeError(f'{image}: receiver exited with {receiver.returncode}')
+    if save.wait() != 0:
+        raise RuntimeError(f'{image}: docker save exited with {save.returncode}')
+    if compressor.wait() != 0:
+        raise RuntimeError(f'{image}: {compress_argv[0]} exited with {compressor.returncode}')
+    if error:
+        raise RuntimeError(f'{image}: transfer failed: {error}')
+    if receiver.returncode != 0:
+        raise RuntimeError(f'{image}: receiver exited with {receiver.returncode}')
+    stats['duration'] = time.perf_counter() - started
+    stats['bytes_wire'] = meters['transfer'].bytes
+    stats['stages'] = {name: {'bytes': meter.bytes, 'blocked': meter.blocked} for name, meter in meters.items()}
+    return stats
+
+
+def bottleneck(stages, duration):
+    """
+    The stage holding the pipeline back
+
+    A stage blocked writing is waiting on the next one, so blocking is
+    read from the network end backwards; export blocked reading means
+    docker save (disk) is slow to produce.
+    """
+    share = {name: stage['blocked'] / duration for name, stage in stages.items()} if duration else {}
+    if share.get('transfer', 0) > 0.5:
+        return 'network'
+    if share.get('compress', 0) > 0.5:
+        return 'cpu (compression)'
+    if share.get('export', 0) > 0.5:
+        return 'disk (docker save)'
+    return None
+
+
+def _store_path(store, diff_id):
+    return Path(store) / f"{diff_id.split(':', 1)[1]}.tar"
+
+
+def cmd_have(store):
+    """Print which of the diff_ids on stdin are in the store, then the codecs we can decompress"""
+    for diff_id in sys.stdin.read().split():
+        if re.fullmatch(r'sha256:[0-9a-f]{64}', diff_id) and _store_path(store, diff_id).exists():
+            print(diff_id)
+    print('codec:gzip')
+    if shutil.which('zstd'):
+        print('codec:zstd')
+
+
+def _store_layer(store, diff_id, fileobj):
+    """Write a layer into the store (verifying its digest) and return the stored path"""
+    path = _store_path(store, diff_id)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=store, delete=False) as tmp:
+        while True:
+            chunk = fileobj.read(COPY_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            tmp.write(chunk)
+    if f'sha256:{digest.hexdigest()}' != diff_id:
+        os.unlink(tmp.name)
+        raise ValueError(f'layer {diff_id} arrived corrupted')
+    os.replace(tmp.name, path)
+    return path
+
+
+def _locked_index(store):
+    """Exclusive lock on the store index, for receivers running side by side"""
+    lock = open(Path(store) / STORE_LOCK, 'w')
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+
+def _read_index(store):
+    try:
+        return json.loads((Path(store) / STORE_INDEX).read_text())
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _record(store, name, diff_ids):
+    """Remember which layers an image was rebuilt from"""
+    with _locked_index(store):
+        index = _read_index(store)
+        index[name] = diff_ids
+        index_path = Path(store) / STORE_INDEX
+        tmp_path = index_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(index, indent=2))
+        os.replace(tmp_path, index_path)
+
+
+def cmd_prune(store):
+    """
+    Drop layers no shipped image uses any more
+
+    Run once after every image has been received: a receiver still
+    streaming may have stored layers its image is not yet recorded with.
+    """
+    with _locked_index(store):
+        index = _read_index(store)
+        keep = {_store_path(store, diff_id).name for ids in index.values() for diff_id in ids}
+        for path in Path(store).glob('*.tar'):
+            if path.name not in keep:
+                path.unlink()
+
+
+def cmd_receive(store, name, codec='gzip', retag=None, output_dir=None):
+    """Rebuild the image tar from stdin plus the store and load it"""
+    Path(store).mkdir(parents=True, exist_ok=True)
+    if output_dir:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        sink = open(Path(output_dir) / f"{name.replace('/', '_').replace(':', '_')}.tar", 'wb')
+        loader = None
+    else:
+        loader = subprocess.Popen(['docker', 'load'], stdin=subprocess.PIPE)
+        sink = loader.stdin
+
+    if codec == 'zstd':
+        decompressor = subprocess.Popen(['zstd', '-dcq'], stdin=sys.stdin.buffer, stdout=subprocess.PIPE)
+        stream, mode = decompressor.stdout, 'r|'
+    else:
+        decompressor = None
+        stream, mode = sys.stdin.buffer, 'r|gz'
+
+    layers = []
+    manifest = None
+    with tarfile.open(fileobj=stream, mode=mode) as src, \
+            tarfile.open(fileobj=sink, mode='w|') as dst:
+        for member in src:
+            info = copy.copy(member)
+            info.pax_headers = {key: value for key, value in member.pax_headers.items()
+                                if key not in (PAX_LAYER, PAX_REF)}
+            if PAX_REF in member.pax_headers:
+                diff_id = member.pax_headers[PAX_REF]
+                path = _store_path(store, diff_id)
+            elif PAX_LAYER in member.pax_headers:
+                diff_id = member.pax_headers[PAX_LAYER]
+                path = _store_layer(store, diff_id, src.extractfile(member))
+            else:
+                data = src.extractfile(member) if member.isfile() else None
+                if member.name == 'manifest.json':
+                    raw = data.read()
+                    manifest = json.loads(raw)
+                    data = io.BytesIO(raw)
+                dst.addfile(info, data)
+                continue
+
+            layers.append(diff_id)
+            with open(path, 'rb') as layer:
+                info.size = os.fstat(layer.fileno()).st_size
+                dst.addfile(info, layer)
+    sink.close()
+
+    if decompressor and decompressor.wait() != 0:
+        sys.exit(f'zstd failed for {name}')
+    if loader and loader.wait() != 0:
+        sys.exit(f'docker load failed for {name}')
+    _record(store, name, layers)
+
+    if retag and loader and manifest:
+        for repo_tag in manifest[0].get('RepoTags') or []:
+            repo = repo_tag.rsplit(':', 1)[0]
+            subprocess.run(['docker', 'tag', repo_tag, f'{repo}:{retag}'], check=True)
+
+
+def _mb(size):
+    return f'{size / 1024 / 1024:.1f} MB'
+
+
+def print_stats(stats):
+    lines = [f"🐳 {stats['image']}: {stats['layers_sent']}/{stats['layers']} layers sent, "
+             f"{_mb(stats['bytes_skipped'])} already on target, "
+             f"{_mb(stats['bytes_wire'])} on the wire ({stats['codec']}) in {stats['duration']:.1f}s"]
+    for name, stage in stats['stages'].items():
+        rate = stage['bytes'] / stats['duration'] / 1024 / 1024 if stats['duration'] else 0
+        blocked = stage['blocked'] / stats['duration'] * 100 if stats['duration'] else 0
+        lines.append(f"   {name:<9} {_mb(stage['bytes']):>10}  {rate:7.1f} MB/s  blocked {blocked:3.0f}%")
+    limit = bottleneck(stats['stages'], stats['duration'])
+    if limit:
+        lines.append(f"   bottleneck: {limit}")
+    print('\n'.join(lines), flush=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Ship Docker images to the EC2 host, sending only missing layers')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    ship_parser = sub.add_parser('ship', help='Ship images')
+    ship_parser.add_argument('images', nargs='*',
+                             help=f'Images to ship (default: the deploy.sh set, tagged :{DEFAULT_TAG})')
+    ship_parser.add_argument('--host', default=DEFAULT_HOST, help=f'ssh target (default: {DEFAULT_HOST})')
+    ship_parser.add_argument('--key', default=str(DEFAULT_KEY), help='ssh private key')
+    ship_parser.add_argument('--retag', default='latest', help='Tag to add on the host (default: latest)')
+    ship_parser.add_argument('--local', metavar='STORE', help='Receive locally into this layer store instead of ssh')
+    ship_parser.add_argument('--output-dir', help='Write rebuilt tars here instead of running docker load')
+    ship_parser.add_argument('--compress-level', type=int,
+                             help='Compression level (default: 3 for zstd, 6 for gzip)')
+    ship_parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS,
+                             help=f'Images to ship concurrently (default: {DEFAULT_JOBS})')
+
+    # The receiving end, run by `ship` over ssh
+    have_parser = sub.add_parser('have', help='Print which diff_ids on stdin are in the store')
+    have_parser.add_argument('--store', required=True)
+    receive_parser = sub.add_parser('receive', help='Rebuild an image from a ship stream on stdin')
+    receive_parser.add_argument('--store', required=True)
+    receive_parser.add_argument('--name', required=True)
+    receive_parser.add_argument('--codec', choices=['gzip', 'zstd'], default='gzip')
+    receive_parser.add_argument('--retag')
+    receive_parser.add_argument('--output-dir')
+    prune_parser = sub.add_parser('prune', help='Drop layers no shipped image uses')
+    prune_parser.add_argument('--store', required=True)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.mode == 'have':
+        cmd_have(args.store)
+        return
+    if args.mode == 'receive':
+        cmd_receive(args.store, args.name, args.codec, args.retag, args.output_dir)
+        return
+    if args.mode == 'prune':
+        cmd_prune(args.store)
+        return
+
+    images = args.images or [f'{name}:{DEFAULT_TAG}' for name in DEFAULT_IMAGES]
+    target = Target(args.host, args.key, args.local)
+    target.install()
+
+    totals = {'bytes_raw': 0, 'bytes_skipped': 0, 'bytes_wire': 0}
+    failed = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(ship_image, target, image, args.retag, args.output_dir,
+                                   args.compress_level): image
+                   for image in images}
+        for future in as_completed(futures):
+            image = futures[future]
+            try:
+                stats = future.result()
+            except (RuntimeError, subprocess.CalledProcessError) as e:
+                print(f'❌ {e}', flush=True)
+                failed.append(image)
+                continue
+            if stats is None:
+                print(f'➖ {image}: not found locally, skipped', flush=True)
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+            print_stats(stats)
+
+    target.prune()
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ {_mb(totals['bytes_wire'])} sent for {_mb(totals['bytes_raw'])} of layers "
+          f"({_mb(totals['bytes_skipped'])} skipped) in {elapsed:.1f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -52,6 +52,15 @@ const MCP_SERVERS = {
   }
 };
 
+// Optional fake server for offline load testing (scripts/bridge-load-test.py)
+if (process.env.MCP_FAKE_SERVER) {
+  MCP_SERVERS['fake'] = {
+    command: process.env.MCP_FAKE_PYTHON || 'python3',
+    args: [process.env.MCP_FAKE_SERVER],
+    env: {}
+  };
+}
+
 // Create MCP session with direct process spawning
 async function createMcpSession(serverType) {
   const config = MCP_SERVERS[serverType];
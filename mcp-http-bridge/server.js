@@ -1,5 +1,7 @@
 const express = require('express');
 const { spawn } = require('child_process');
+const fs = require('fs');
+const path = require('path');
 const cors = require('cors');
 const { v4: uuidv4 } = require('uuid');
 
@@ -52,6 +54,65 @@ const MCP_SERVERS = {
   }
 };
 
+// 'mux' mode: sessions share one long-lived container per server type through
+// scripts/mcp_multiplexer.py (needs python3). MCP_MUX=1 applies it to all 'run' entries.
+// It only works for a bridge running on the host: the node:18-alpine image has no
+// python3 and its build context (this directory) does not include ../scripts, so in
+// the container mux entries fall back to a container per session.
+const MUX_SCRIPT = process.env.MCP_MUX_SCRIPT || path.join(__dirname, '..', 'scripts', 'mcp_multiplexer.py');
+const MUX_PYTHON = process.env.MCP_MUX_PYTHON || 'python3';
+const MUX_AVAILABLE = fs.existsSync(MUX_SCRIPT);
+const USE_MUX = process.env.MCP_MUX === '1';
+// Cache list methods (and a config's cacheTools) in front of the shared server, so a
+// new session's tools/list, prompts/list and resources/list are answered without it.
+// MCP_CACHE=1 applies it to every multiplexed entry.
+const USE_CACHE = process.env.MCP_CACHE === '1';
+const muxServers = new Map();
+
+// docker args for a fresh container
+function dockerRunArgs(config) {
+  const args = ['run', '--rm', '-i'];
+  
+  // Add environment variables
+  if (config.env) {
+    Object.entries(config.env).forEach(([key, value]) => {
+      args.push('-e', `${key}=${value}`);
+    });
+  }
+  
+  args.push(config.image, config.command);
+  if (config.args && Array.isArray(config.args)) {
+    args.push(...config.args);
+  }
+  return args;
+}
+
+// Start the multiplexer for a server type once; returns its socket path
+function ensureMuxServer(serverType, config) {
+  if (muxServers.has(serverType)) {
+    return muxServers.get(serverType).socket;
+  }
+  
+  const socket = config.socket || `/tmp/mcp-mux-${serverType}.sock`;
+  const muxArgs = [MUX_SCRIPT, 'serve', '--socket', socket];
+  if (config.cache || USE_CACHE) {
+    muxArgs.push('--cache');
+    Object.entries(config.cacheTools || {}).forEach(([tool, ttl]) => {
+      muxArgs.push('--cache-tool', `${tool}=${ttl}`);
+    });
+  }
+  const muxProcess = spawn(MUX_PYTHON, [...muxArgs, '--', 'docker', ...dockerRunArgs(config)], {
+    stdio: ['ignore', 'inherit', 'inherit']
+  });
+  muxServers.set(serverType, { process: muxProcess, socket });
+  
+  muxProcess.on('exit', (code) => {
+    console.error(`MCP multiplexer (${serverType}) exited with code ${code}`);
+    muxServers.delete(serverType);
+  });
+  return socket;
+}
+
 // Create MCP session
 async function createMcpSession(serverType) {
   const config = MCP_SERVERS[serverType];
@@ -60,23 +121,22 @@ async function createMcpSession(serverType) {
   }
 
   const sessionId = uuidv4();
+  let command = 'docker';
   let args;
   
-  if (config.mode === 'run') {
+  const wantsMux = config.mode === 'mux' || (USE_MUX && config.mode === 'run');
+  if (wantsMux && !MUX_AVAILABLE) {
+    console.error(`${MUX_SCRIPT} not found, running ${serverType} without the multiplexer`);
+  }
+  
+  if (wantsMux && MUX_AVAILABLE) {
+    // Connect to the shared server instead of starting a container
+    const socket = ensureMuxServer(serverType, config);
+    command = MUX_PYTHON;
+    args = [MUX_SCRIPT, 'connect', '--socket', socket, '--wait', '30'];
+  } else if (config.mode === 'run' || config.mode === 'mux') {
     // Run a new container
-    args = ['run', '--rm', '-i'];
-    
-    // Add environment variables
-    if (config.env) {
-      Object.entries(config.env).forEach(([key, value]) => {
-        args.push('-e', `${key}=${value}`);
-      });
-    }
-    
-    args.push(config.image, config.command);
-    if (config.args && Array.isArray(config.args)) {
-      args.push(...config.args);
-    }
+    args = dockerRunArgs(config);
   } else {
     // Exec into existing container
     args = ['exec', '-i', config.container, config.command];
@@ -85,7 +145,7 @@ async function createMcpSession(serverType) {
     }
   }
   
-  const mcpProcess = spawn('docker', args);
+  const mcpProcess = spawn(command, args);
   
   const session = {
     id: sessionId,
@@ -213,6 +273,12 @@ app.get('/health', (req, res) => {
   res.send('OK');
 });
 
+// Stop shared multiplexers with the bridge
+process.on('SIGTERM', () => {
+  muxServers.forEach(({ process: muxProcess }) => muxProcess.kill('SIGTERM'));
+  process.exit(0);
+});
+
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   console.log(`MCP HTTP Bridge running on port ${PORT}`);
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Fleet-wide inventory snapshot: Elastic IPs, instances, security groups and DNS
+Collects everything concurrently into one snapshot file and checks that
+each DNS A record points at an associated Elastic IP whose instance's
+security groups expose 443. The other scripts can read the snapshot with
+--from-snapshot instead of calling the APIs again.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from update_security_group import MAX_WORKERS, create_session, get_regions, normalize_permissions
+
+DEFAULT_SNAPSHOT_PATH = Path.home() / '.cache' / 'mcp-inventory' / 'fleet-snapshot.json'
+DEFAULT_MAX_AGE = 900
+DEFAULT_ZONE = 'beepmedia.com'
+CHECK_PORT = 443
+PUBLIC_CIDRS = {'0.0.0.0/0', '::/0'}
+
+
+def collect_region(region, ec2):
+    """Addresses, the instances they point at and every security group in one region"""
+    addresses = ec2.describe_addresses()['Addresses']
+
+    instances = {}
+    instance_ids = sorted({addr['InstanceId'] for addr in addresses if addr.get('InstanceId')})
+    if instance_ids:
+        for reservation in ec2.describe_instances(InstanceIds=instance_ids)['Reservations']:
+            for instance in reservation['Instances']:
+                instances[instance['InstanceId']] = {
+                    'state': instance.get('State', {}).get('Name'),
+                    'public_ip': instance.get('PublicIpAddress'),
+                    'security_groups': [group['GroupId'] for group in instance.get('SecurityGroups', [])]
+                }
+
+    security_groups = {}
+    for page in ec2.get_paginator('describe_security_groups').paginate():
+        for sg in page['SecurityGroups']:
+            security_groups[sg['GroupId']] = {
+                'name': sg['GroupName'],
+                'vpc_id': sg.get('VpcId'),
+                'rules': normalize_permissions(sg['IpPermissions'])
+            }
+
+    return {'addresses': addresses, 'instances': instances, 'security_groups': security_groups}
+
+
+def collect_dns(zone, cache_dir=None):
+    """All records in the Cloudflare zone"""
+    from update_cloudflare_dns import (COMPARED_FIELDS, DEFAULT_CACHE_DIR, CloudflareManager, IdCache,
+                                       get_cloudflare_credentials)
+
+    cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+    # Keep stdout for the report; the credential lookup is chatty
+    with contextlib.redirect_stdout(sys.stderr):
+        creds = get_cloudflare_credentials(cache_dir)
+    api_token = creds and (creds.get('api_token') or creds.get('api_key') or creds.get('token'))
+    if not api_token:
+        raise RuntimeError('Could not retrieve Cloudflare credentials')
+
+    with CloudflareManager(api_token, creds.get('email') or creds.get('api_email'),
+                           id_cache=IdCache(cache_dir / 'cloudflare-ids.json')) as cf:
+        zone_id = cf.get_zone_id(zone)
+        if not zone_id:
+            raise RuntimeError(f'Could not find Cloudflare zone for {zone}')
+        zone_id, records = cf.with_zone(zone, zone_id, cf.list_records)
+    return {'zone': zone, 'zone_id': zone_id, 'records': [
+        # Everything update_cloudflare_dns.py --from-snapshot needs to plan a reconcile
+        {key: record.get(key) for key in ('id', 'name', 'type', *COMPARED_FIELDS)}
+        for record in records
+    ]}
+
+
+def collect(session, regions, zone=DEFAULT_ZONE, include_dns=True):
+    """
+    Gather every region and the DNS zone concurrently
+
+    Regional clients are created up front on the calling thread, as in
+    check_elastic_ips.py. A failing source is recorded under 'failed'
+    instead of aborting the snapshot.
+    """
+    clients = {region: session.client('ec2', region_name=region) for region in regions}
+    snapshot = {
+        'generated_at': datetime.now().isoformat(),
+        'generated_ts': time.time(),
+        'regions': {},
+        'dns': None,
+        'failed': {}
+    }
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(regions) + 1))) as executor:
+        dns_future = executor.submit(collect_dns, zone) if include_dns else None
+        futures = {region: executor.submit(collect_region, region, clients[region]) for region in regions}
+        for region, future in futures.items():
+            try:
+                snapshot['regions'][region] = future.result()
+            except (ClientError, BotoCoreError) as e:
+                snapshot['failed'][region] = str(e)
+        if dns_future:
+            try:
+                snapshot['dns'] = dns_future.result()
+            except Exception as e:
+                snapshot['failed']['dns'] = str(e)
+
+    snapshot['checks'] = cross_check(snapshot)
+    return snapshot
+
+
+def exposes_port(rules, port=CHECK_PORT):
+    """True if any rule opens the TCP port to the whole internet"""
+    return any(rule['cidr'] in PUBLIC_CIDRS and
+               (rule['protocol'] == '-1' or
+                (rule['protocol'] in ('tcp', '6') and rule['from'] <= port <= rule['to']))
+               for rule in rules)
+
+
+def cross_check(snapshot, hosts=None, port=CHECK_PORT):
+    """
+    Check DNS -> associated Elastic IP -> instance security groups -> port
+
+    Returns:
+        One result per A record with a status of ok, not_an_eip,
+        eip_unassociated, instance_unknown or port_closed
+    """
+    eips = {}
+    for region, data in snapshot['regions'].items():
+        for addr in data['addresses']:
+            eips[addr.get('PublicIp')] = (region, addr)
+
+    checks = []
+    for record in (snapshot.get('dns') or {}).get('records', []):
+        if record['type'] != 'A' or (hosts and record['name'] not in hosts):
+            continue
+        check = {'name': record['name'], 'ip': record['content'], 'region': None,
+                 'instance_id': None, 'security_groups': [], 'status': 'ok'}
+        checks.append(check)
+
+        if record['content'] not in eips:
+            check['status'] = 'not_an_eip'
+            continue
+        region, addr = eips[record['content']]
+        check['region'] = region
+        check['instance_id'] = addr.get('InstanceId') or None
+        if not (addr.get('InstanceId') or addr.get('NetworkInterfaceId')):
+            check['status'] = 'eip_unassociated'
+            continue
+
+        instance = snapshot['regions'][region]['instances'].get(addr.get('InstanceId'))
+        if not instance:
+            check['status'] = 'instance_unknown'
+            continue
+        check['security_groups'] = instance['security_groups']
+        groups = snapshot['regions'][region]['security_groups']
+        rules = [rule for group_id in instance['security_groups']
+                 for rule in groups.get(group_id, {}).get('rules', [])]
+        if not exposes_port(rules, port):
+            check['status'] = 'port_closed'
+    return checks
+
+
+def save_snapshot(snapshot, path=DEFAULT_SNAPSHOT_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(snapshot, indent=2, default=str))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path=DEFAULT_SNAPSHOT_PATH, max_age=DEFAULT_MAX_AGE):
+    """Return the snapshot if it exists and is younger than max_age seconds, else None"""
+    try:
+        snapshot = json.loads(Path(path).read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if max_age is not None and time.time() - snapshot.get('generated_ts', 0) > max_age:
+        return None
+    return snapshot
+
+
+def print_checks(checks, port=CHECK_PORT):
+    labels = {
+        'ok': f'✅ associated EIP, {port} open',
+        'not_an_eip': '➖ not an Elastic IP',
+        'eip_unassociated': '❌ Elastic IP is not associated',
+        'instance_unknown': '❌ associated instance not found',
+        'port_closed': f'❌ security groups do not expose {port}'
+    }
+    for check in sorted(checks, key=lambda c: (c['status'] == 'not_an_eip', c['name'])):
+        where = ' '.join(filter(None, [check['region'], check['instance_id']]))
+        where = f" [{where}]" if where else ''
+        print(f"  {check['name']} -> {check['ip']}{where}: {labels[check['status']]}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Collect and cross-check the fleet inventory')
+    parser.add_argument('--snapshot', default=str(DEFAULT_SNAPSHOT_PATH),
+                        help=f'Snapshot file (default: {DEFAULT_SNAPSHOT_PATH})')
+    parser.add_argument('--from-snapshot', action='store_true',
+                        help='Check the existing snapshot instead of collecting a new one')
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help=f'With --from-snapshot, oldest usable snapshot in seconds (default: {DEFAULT_MAX_AGE})')
+    parser.add_argument('--region', action='append', dest='regions',
+                        help='Region to collect (repeatable; default: all enabled regions)')
+    parser.add_argument('--zone', default=DEFAULT_ZONE, help=f'Cloudflare zone (default: {DEFAULT_ZONE})')
+    parser.add_argument('--no-dns', action='store_true', help='Skip Cloudflare')
+    parser.add_argument('--host', action='append', dest='hosts', help='Only check these DNS names')
+    parser.add_argument('--json', action='store_true', help='Print the checks as JSON')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    out = sys.stderr if args.json else sys.stdout
+
+    if args.from_snapshot:
+        snapshot = load_snapshot(args.snapshot, args.max_age)
+        if snapshot is None:
+            print(f"No snapshot younger than {args.max_age}s at {args.snapshot}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Using snapshot from {snapshot['generated_at']}", file=out)
+    else:
+        session = create_session()
+        regions = args.regions or get_regions(session)
+        print(f"Collecting inventory across {len(regions)} regions"
+              f"{'' if args.no_dns else f' and {args.zone}'}...", file=out)
+        started = time.perf_counter()
+        snapshot = collect(session, regions, args.zone, include_dns=not args.no_dns)
+        save_snapshot(snapshot, args.snapshot)
+        print(f"Snapshot saved to {args.snapshot} in {time.perf_counter() - started:.1f}s", file=out)
+
+    for source, error in snapshot['failed'].items():
+        print(f"⚠️  {source} failed: {error}", file=sys.stderr)
+
+    checks = cross_check(snapshot, set(args.hosts) if args.hosts else None)
+    if args.json:
+        print(json.dumps(checks, indent=2))
+        return
+
+    summary = {
+        'Elastic IPs': sum(len(r['addresses']) for r in snapshot['regions'].values()),
+        'Security groups': sum(len(r['security_groups']) for r in snapshot['regions'].values()),
+        'DNS records': len((snapshot.get('dns') or {}).get('records', []))
+    }
+    print('\n' + ', '.join(f'{label}: {count}' for label, count in summary.items()))
+    print(f"\nDNS -> Elastic IP -> port {CHECK_PORT}:")
+    print_checks(checks)
+    if any(check['status'] not in ('ok', 'not_an_eip') for check in checks):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
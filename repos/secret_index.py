@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Secret discovery index for AWS Secrets Manager
+Finds the secret belonging to a service from one paginated list_secrets
+pass over names, tags and descriptions, cached locally with a TTL, so
+only the matching secret value is ever fetched
+"""
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+DEFAULT_CACHE_PATH = Path.home() / '.cache' / 'mcp-inventory' / 'secret-index.json'
+DEFAULT_INDEX_TTL = 3600
+LIST_PAGE_SIZE = 100
+
+# Tag keys that name the service a secret belongs to
+SERVICE_TAG_KEYS = ('service', 'Service', 'tool', 'Tool', 'app', 'App')
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in re.split(r'[^a-z0-9]+', (text or '').lower()) if word]
+
+
+class SecretIndex:
+    """
+    Metadata for the secrets matching a set of search terms
+
+    The list_secrets pass is filtered server-side with the 'all' filter
+    (prefix match on name, description, tag keys and tag values), so
+    unrelated secrets are never listed. Secret values are never cached.
+    """
+
+    def __init__(self, client, cache_path: Path = DEFAULT_CACHE_PATH,
+                 ttl: int = DEFAULT_INDEX_TTL, refresh: bool = False):
+        self.client = client
+        self.cache_path = Path(cache_path)
+        self.ttl = ttl
+        self.refresh = refresh
+        self.list_calls = 0
+
+    def _load_cache(self) -> Dict:
+        try:
+            return json.loads(self.cache_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _store_cache(self, key: str, entries: List[Dict]):
+        cache = self._load_cache()
+        cache[key] = {'fetched_at': time.time(), 'entries': entries}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(cache, indent=2, default=str))
+        os.replace(tmp_path, self.cache_path)
+
+    def _list(self, terms: List[str]) -> List[Dict]:
+        """One paginated list_secrets pass filtered by the search terms"""
+        entries = []
+        paginator = self.client.get_paginator('list_secrets')
+        pages = paginator.paginate(
+            Filters=[{'Key': 'all', 'Values': terms}],
+            PaginationConfig={'PageSize': LIST_PAGE_SIZE}
+        )
+        for page in pages:
+            self.list_calls += 1
+            for secret in page.get('SecretList', []):
+                entries.append({
+                    'name': secret['Name'],
+                    'arn': secret.get('ARN'),
+                    'description': secret.get('Description', ''),
+                    'tags': {tag['Key']: tag['Value'] for tag in secret.get('Tags', [])},
+                    'last_changed': secret.get('LastChangedDate')
+                })
+        return entries
+
+    def entries(self, terms: Iterable[str]) -> List[Dict]:
+        """Secret metadata matching any of the terms, from cache when fresh"""
+        terms = sorted({term.lower() for term in terms})
+        key = ','.join(terms)
+        if not self.refresh:
+            cached = self._load_cache().get(key)
+            if cached and time.time() - cached.get('fetched_at', 0) <= self.ttl:
+                return cached['entries']
+        entries = self._list(terms)
+        self._store_cache(key, entries)
+        self.refresh = False
+        return entries
+
+    def find(self, service: str, aliases: Iterable[str] = (),
+             preferred: Iterable[str] = ()) -> List[Dict]:
+        """
+        Rank the secrets that belong to a service
+
+        Args:
+            service: Service name, e.g. 'cloudflare'
+            aliases: Other words that identify the service, e.g. 'cf'
+            preferred: Secret names to rank first, in order
+
+        Returns:
+            Matching entries, best match first
+        """
+        names = {service.lower(), *(alias.lower() for alias in aliases)}
+        preferred = list(preferred)
+        ranked = []
+        for entry in self.entries(names):
+            score = 0
+            if any(entry['tags'].get(key, '').lower() in names for key in SERVICE_TAG_KEYS):
+                score += 100
+            if entry['name'] in preferred:
+                score += 80 - preferred.index(entry['name'])
+            if names & set(_words(entry['name'])):
+                score += 40
+            elif service.lower() in entry['name'].lower():
+                score += 20
+            if names & set(_words(entry['description'])):
+                score += 10
+            if any(names & set(_words(f'{key} {value}')) for key, value in entry['tags'].items()):
+                score += 5
+            if score:
+                ranked.append((score, entry))
+        ranked.sort(key=lambda item: -item[0])
+        return [entry for _, entry in ranked]
+
+    def fetch(self, service: str, parse: Callable[[str], Optional[Dict]],
+              aliases: Iterable[str] = (), preferred: Iterable[str] = ()) -> Optional[Dict]:
+        """
+        Fetch and parse the best matching secret for a service
+
+        Candidates are tried best first, so normally a single
+        get_secret_value call is made. A candidate that no longer exists
+        drops the cached index and the search is repeated once; any other
+        error (access denied, decryption failure, throttling) moves on to
+        the next candidate.
+
+        Args:
+            parse: Turns a SecretString into credentials, or None if the
+                secret is not usable
+
+        Returns:
+            The parsed credentials, or None if no secret matched
+        """
+        for attempt in range(2):
+            for entry in self.find(service, aliases, preferred):
+                try:
+                    value = self.client.get_secret_value(SecretId=entry['arn'] or entry['name'])
+                except self.client.exceptions.ResourceNotFoundException:
+                    if attempt == 0:
+                        self.refresh = True
+                        break
+                    continue
+                except ClientError as e:
+                    print(f"Error retrieving {entry['name']}: {e}")
+                    continue
+                parsed = parse(value.get('SecretString', ''))
+                if parsed:
+                    return parsed
+            else:
+                return None
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search the secret discovery index')
+    parser.add_argument('service', help='Service name, e.g. cloudflare')
+    parser.add_argument('--alias', action='append', default=[], help='Other words for the service')
+    parser.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    parser.add_argument('--refresh', action='store_true', help='Ignore the cached index')
+    args = parser.parse_args()
+
+    index = SecretIndex(boto3.client('secretsmanager', region_name=args.region), refresh=args.refresh)
+    for entry in index.find(args.service, args.alias):
+        tags = ', '.join(f'{k}={v}' for k, v in entry['tags'].items())
+        print(f"{entry['name']}  {entry['description']}  {tags}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,23 @@
 #!/usr/bin/env python3
 """
 Update Cloudflare DNS record for mcp.beepmedia.com to production IP
+With --reconcile, bring a whole zone in line with a desired-state file
 """
 import os
 import json
+import argparse
+import random
+import re
+import time
+from pathlib import Path
 import boto3
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from typing import Dict, List, Optional, Tuple, Union
+
+from fleet_inventory import DEFAULT_MAX_AGE, load_snapshot
+from secret_index import SecretIndex
 
 # AWS Configuration using Beepmedia credentials
 AWS_ACCESS_KEY_ID = os.environ.get('BEEPMEDIA_AWS_ACCESS_KEY_ID')
@@ -21,12 +32,99 @@ DNS_RECORD = {
     'proxied': False
 }
 
+# HTTP behaviour for Cloudflare API calls
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+MAX_RETRIES = 4
+RETRY_BACKOFF = 0.5
+MAX_RETRY_DELAY = 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Safe to resend after a timeout or 5xx; other methods (record creates,
+# batches) are only retried when Cloudflare cannot have applied them
+IDEMPOTENT_METHODS = {'GET', 'PUT', 'DELETE'}
+
+# Zone and record IDs cached between runs
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'mcp-inventory'
+ZONE_CACHE_TTL = 7 * 24 * 3600
+RECORD_CACHE_TTL = 24 * 3600
+# Cloudflare error codes meaning a zone or record ID no longer exists
+STALE_ID_ERRORS = {7003, 81044}
+
+# Reconcile mode
+LIST_PAGE_SIZE = 1000
+BATCH_LIMIT = 200  # changes per dns_records/batch call
+# Fields compared when deciding whether an existing record needs updating
+COMPARED_FIELDS = ('content', 'proxied', 'ttl', 'priority', 'comment')
+
+class IdCache:
+    """Cloudflare zone and record IDs cached in a JSON file with a TTL"""
+    
+    def __init__(self, path: Path, refresh: bool = False):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = False
+        if not refresh:
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except (OSError, json.JSONDecodeError):
+                pass
+    
+    def get(self, key: str, ttl: int) -> Optional[Dict]:
+        """Return the entry if present and younger than the TTL"""
+        entry = self.entries.get(key)
+        if not entry or time.time() - entry.get('cached_at', 0) > ttl:
+            return None
+        return entry
+    
+    def set(self, key: str, **data):
+        self.entries[key] = {**data, 'cached_at': time.time()}
+        self.dirty = True
+    
+    def invalidate(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self.dirty = True
+    
+    def invalidate_zone(self, zone_id: str):
+        """Drop a zone ID and every record cached under it"""
+        for key, entry in list(self.entries.items()):
+            if entry.get('id') == zone_id or key.startswith(f'record:{zone_id}:'):
+                self.invalidate(key)
+    
+    def save(self):
+        """Write the cache atomically if anything changed"""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.entries, indent=2))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+class StaleZoneError(RuntimeError):
+    """The API no longer recognises a (cached) zone ID"""
+
+def record_key(zone_id: str, name: str, record_type: str) -> str:
+    return f'record:{zone_id}:{name.lower()}:{record_type.upper()}'
+
+def base_domain(domain: str) -> str:
+    """Zone name for a domain (beepmedia.com from *.beepmedia.com)"""
+    return '.'.join(domain.split('.')[-2:])
+
 class CloudflareManager:
     """Manage Cloudflare DNS records"""
     
-    def __init__(self, api_token: str, api_email: Optional[str] = None):
+    def __init__(self, api_token: str, api_email: Optional[str] = None,
+                 timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+                 max_retries: int = MAX_RETRIES, backoff: float = RETRY_BACKOFF,
+                 id_cache: Optional[IdCache] = None):
         self.api_token = api_token
         self.api_email = api_email
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.call_stats: List[Dict] = []
+        self.id_cache = id_cache
+        # Zone listings taken from a fleet snapshot, keyed by zone ID
+        self.snapshot_records: Dict[str, List[Dict]] = {}
         
         # Set headers based on authentication method
         if api_email:
@@ -44,55 +142,211 @@ class CloudflareManager:
             }
         
         self.base_url = 'https://api.cloudflare.com/client/v4'
+        
+        # One pooled session so every call reuses the same TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=10))
+    
+    def close(self):
+        """Save cached IDs and close pooled connections"""
+        if self.id_cache:
+            self.id_cache.save()
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        """Delay before the next attempt, honouring Cloudflare's rate-limit headers"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            # e.g. ratelimit: "default";r=0;t=30
+            match = re.search(r'\bt=(\d+)', response.headers.get('ratelimit', ''))
+            if match:
+                return min(float(match.group(1)), MAX_RETRY_DELAY)
+        return min(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5), MAX_RETRY_DELAY)
+    
+    @staticmethod
+    def _never_sent(error: requests.RequestException) -> bool:
+        """True if the request failed before reaching Cloudflare"""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Call the Cloudflare API over the pooled session
+        
+        Retries connection errors, timeouts, 429 and 5xx responses with
+        backoff, and records the latency of every call in call_stats.
+        POST and PATCH are retried only on 429 and on failures to connect,
+        so a create is never sent twice.
+        """
+        url = f'{self.base_url}{path}'
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_statuses = RETRY_STATUSES if idempotent else {429}
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries or not (idempotent or self._never_sent(e)):
+                    raise
+            finally:
+                self.call_stats.append({
+                    'method': method,
+                    'path': path,
+                    'status': response.status_code if response is not None else None,
+                    'ms': round((time.perf_counter() - started) * 1000, 1),
+                    'attempt': attempt + 1
+                })
+            
+            if response is not None and (response.status_code not in retry_statuses
+                                         or attempt == self.max_retries):
+                return response
+            time.sleep(self._retry_delay(response, attempt))
+    
+    def latency_summary(self) -> Dict:
+        """Call count, retries and latency over all API calls so far"""
+        if not self.call_stats:
+            return {'calls': 0}
+        latencies = sorted(call['ms'] for call in self.call_stats)
+        return {
+            'calls': len(latencies),
+            'retries': sum(1 for call in self.call_stats if call['attempt'] > 1),
+            'total_ms': round(sum(latencies), 1),
+            'p50_ms': latencies[len(latencies) // 2],
+            'max_ms': latencies[-1]
+        }
     
     def get_zone_id(self, domain: str) -> Optional[str]:
         """Get zone ID for a domain"""
-        # Extract base domain (beepmedia.com from *.beepmedia.com)
-        parts = domain.split('.')
-        base_domain = '.'.join(parts[-2:])
+        zone = base_domain(domain)
+        cached = self.id_cache.get(f'zone:{zone}', ZONE_CACHE_TTL) if self.id_cache else None
+        if cached:
+            return cached['id']
         
-        response = requests.get(
-            f'{self.base_url}/zones',
-            headers=self.headers,
-            params={'name': base_domain}
-        )
+        response = self._request('GET', '/zones', params={'name': zone})
         
         if response.status_code == 200:
             data = response.json()
             if data['success'] and data['result']:
-                return data['result'][0]['id']
+                zone_id = data['result'][0]['id']
+                if self.id_cache:
+                    self.id_cache.set(f'zone:{zone}', id=zone_id)
+                return zone_id
         
         print(f"Error getting zone ID: {response.status_code} - {response.text}")
         return None
     
-    def get_existing_record(self, zone_id: str, name: str) -> Optional[Dict]:
-        """Check if a DNS record already exists"""
-        response = requests.get(
-            f'{self.base_url}/zones/{zone_id}/dns_records',
-            headers=self.headers,
-            params={'name': name}
-        )
+    def with_zone(self, domain: str, zone_id: str, call):
+        """
+        Run call(zone_id), re-resolving the zone once if its ID is stale
+        
+        Returns:
+            (zone_id, result), where zone_id is the one the call succeeded with
+        """
+        try:
+            return zone_id, call(zone_id)
+        except StaleZoneError:
+            print("Cached zone ID is stale, looking the zone up again")
+            self.snapshot_records.pop(zone_id, None)
+            if self.id_cache:
+                self.id_cache.invalidate_zone(zone_id)
+            fresh_id = self.get_zone_id(domain)
+            if not fresh_id or fresh_id == zone_id:
+                raise
+            return fresh_id, call(fresh_id)
+    
+    def get_existing_record(self, zone_id: str, name: str, record_type: Optional[str] = None) -> Optional[Dict]:
+        """
+        Check if a DNS record already exists
+        
+        Raises:
+            StaleZoneError: if the API rejects the zone ID
+        """
+        params = {'name': name}
+        if record_type:
+            params['type'] = record_type
+        response = self._request('GET', f'/zones/{zone_id}/dns_records', params=params)
         
         if response.status_code == 200:
             data = response.json()
             if data['success'] and data['result']:
-                return data['result'][0]
+                existing = data['result'][0]
+                if self.id_cache:
+                    self.id_cache.set(record_key(zone_id, existing['name'], existing['type']),
+                                      id=existing['id'], content=existing['content'])
+                return existing
+        elif self._is_stale(response):
+            raise StaleZoneError(f"Unknown zone {zone_id}: {response.status_code} - {response.text}")
         
         return None
     
+    @staticmethod
+    def _is_stale(response: requests.Response) -> bool:
+        """True if the API rejected a zone or record ID as unknown"""
+        if response.status_code == 404:
+            return True
+        try:
+            errors = response.json().get('errors') or []
+        except ValueError:
+            return False
+        return any(error.get('code') in STALE_ID_ERRORS for error in errors)
+    
+    def _put_record(self, zone_id: str, record_id: str, record: Dict) -> requests.Response:
+        response = self._request('PUT', f"/zones/{zone_id}/dns_records/{record_id}", json=record)
+        if response.status_code == 200 and response.json().get('success') and self.id_cache:
+            result = response.json()['result']
+            self.id_cache.set(record_key(zone_id, result['name'], result['type']),
+                              id=result['id'], content=result['content'])
+        return response
+    
     def update_record(self, zone_id: str, record: Dict) -> bool:
-        """Update a DNS record"""
-        existing = self.get_existing_record(zone_id, record['name'])
+        """
+        Update a DNS record
+        
+        With a cached record ID this is a single PUT. If the API reports
+        the ID as unknown, the cache entry is dropped and the record is
+        looked up again, re-resolving the zone if its ID is stale too.
+        """
+        key = record_key(zone_id, record['name'], record['type'])
+        cached = self.id_cache.get(key, RECORD_CACHE_TTL) if self.id_cache else None
+        if cached:
+            print(f"Current record (cached): {record['name']} -> {cached['content']}")
+            print(f"Updating to: {record['name']} -> {record['content']}")
+            
+            response = self._put_record(zone_id, cached['id'], record)
+            if response.status_code == 200 and response.json().get('success'):
+                print(f"Successfully updated: {record['name']} -> {record['content']}")
+                return True
+            if not self._is_stale(response):
+                print(f"Error updating record: {response.status_code} - {response.text}")
+                return False
+            print("Cached record ID is stale, looking the record up again")
+            self.id_cache.invalidate(key)
+        
+        try:
+            zone_id, existing = self.with_zone(
+                record['name'], zone_id,
+                lambda zone: self.get_existing_record(zone, record['name'], record['type']))
+        except StaleZoneError as e:
+            print(f"Error looking up record: {e}")
+            return False
         
         if existing:
             print(f"Current record: {record['name']} -> {existing['content']}")
             print(f"Updating to: {record['name']} -> {record['content']}")
             
-            response = requests.put(
-                f"{self.base_url}/zones/{zone_id}/dns_records/{existing['id']}",
-                headers=self.headers,
-                json=record
-            )
+            response = self._put_record(zone_id, existing['id'], record)
             
             if response.status_code == 200:
                 data = response.json()
@@ -105,8 +359,252 @@ class CloudflareManager:
         else:
             print(f"No existing record found for: {record['name']}")
             return False
+    
+    def list_records(self, zone_id: str) -> List[Dict]:
+        """
+        List every DNS record in a zone, following pagination
+        
+        A zone seeded from a fleet snapshot is answered from the snapshot.
+        
+        Raises:
+            StaleZoneError: if the API rejects the zone ID
+            RuntimeError: on any other API error
+        """
+        if zone_id in self.snapshot_records:
+            return list(self.snapshot_records[zone_id])
+        
+        records = []
+        page = 1
+        while True:
+            response = self._request('GET', f'/zones/{zone_id}/dns_records',
+                                     params={'page': page, 'per_page': LIST_PAGE_SIZE})
+            if self._is_stale(response):
+                raise StaleZoneError(f"Unknown zone {zone_id}: {response.status_code} - {response.text}")
+            if response.status_code != 200 or not response.json().get('success'):
+                raise RuntimeError(f"Error listing records: {response.status_code} - {response.text}")
+            data = response.json()
+            records.extend(data['result'])
+            if page >= data.get('result_info', {}).get('total_pages', 1):
+                break
+            page += 1
+        
+        self._cache_record_ids(zone_id, records)
+        return records
+    
+    def _cache_record_ids(self, zone_id: str, records: List[Dict]):
+        """Cache the ID of every (name, type) that has a single record"""
+        if not self.id_cache:
+            return
+        for (name, record_type), group in index_records(records).items():
+            if len(group) == 1:
+                self.id_cache.set(record_key(zone_id, name, record_type),
+                                  id=group[0]['id'], content=group[0]['content'])
+    
+    def seed_from_snapshot(self, dns: Dict):
+        """
+        Use the zone ID and records from a fleet snapshot's 'dns' section
+        
+        get_zone_id and list_records then answer without an API call, and
+        update_record PUTs straight to the snapshot's record ID. A stale ID
+        falls back to the API like any other cached one.
+        """
+        zone_id = dns['zone_id']
+        self.snapshot_records[zone_id] = dns['records']
+        if self.id_cache:
+            self.id_cache.set(f"zone:{base_domain(dns['zone'])}", id=zone_id)
+            self._cache_record_ids(zone_id, dns['records'])
+    
+    def apply_changes(self, zone_id: str, plan: Dict) -> bool:
+        """
+        Apply a reconcile plan
+        
+        Sends the changes through the batch endpoint in chunks of
+        BATCH_LIMIT (deletes, then updates, then creates). If a batch is
+        rejected, it and everything after it are applied one record at a time.
+        """
+        operations = ([('deletes', {'id': record['id']}) for record in plan['delete']] +
+                      [('patches', {'id': existing['id'], **desired}) for existing, desired in plan['update']] +
+                      [('posts', desired) for desired in plan['create']])
+        
+        for start in range(0, len(operations), BATCH_LIMIT):
+            batch: Dict[str, List[Dict]] = {}
+            for kind, item in operations[start:start + BATCH_LIMIT]:
+                batch.setdefault(kind, []).append(item)
+            response = self._request('POST', f'/zones/{zone_id}/dns_records/batch', json=batch)
+            if response.status_code != 200 or not response.json().get('success'):
+                print(f"Batch update rejected ({response.status_code}), applying records one at a time")
+                return self._apply_individually(zone_id, operations[start:])
+        return True
+    
+    def _apply_individually(self, zone_id: str, operations: List[Tuple[str, Dict]]) -> bool:
+        """Apply batch operations with one API call each"""
+        ok = True
+        for kind, item in operations:
+            if kind == 'deletes':
+                response = self._request('DELETE', f"/zones/{zone_id}/dns_records/{item['id']}")
+                action = f"delete record {item['id']}"
+            elif kind == 'patches':
+                record = {k: v for k, v in item.items() if k != 'id'}
+                response = self._request('PATCH', f"/zones/{zone_id}/dns_records/{item['id']}", json=record)
+                action = f"update {item['name']} {item['type']}"
+            else:
+                response = self._request('POST', f'/zones/{zone_id}/dns_records', json=item)
+                action = f"create {item['name']} {item['type']}"
+            ok &= self._check(response, action)
+        return ok
+    
+    @staticmethod
+    def _check(response: requests.Response, action: str) -> bool:
+        if response.status_code == 200 and response.json().get('success'):
+            return True
+        print(f"Error trying to {action}: {response.status_code} - {response.text}")
+        return False
 
-def get_cloudflare_credentials():
+def load_desired_state(path: str) -> Dict:
+    """
+    Load a desired-state file
+    
+    Format:
+        {"zone": "beepmedia.com",
+         "records": [{"name": "mcp", "type": "A", "content": "44.206.106.173"},
+                     {"name": "old", "type": "A", "absent": true}]}
+    
+    Names without the zone suffix are treated as relative to the zone.
+    Several entries may share a name and type (round-robin / failover IPs).
+    """
+    with open(path) as f:
+        state = json.load(f)
+    
+    zone = state['zone'].lower().rstrip('.')
+    records = []
+    for entry in state.get('records', []):
+        record = dict(entry)
+        name = record['name'].lower().rstrip('.')
+        if name == '@':
+            name = zone
+        elif name != zone and not name.endswith(f'.{zone}'):
+            name = f'{name}.{zone}'
+        record['name'] = name
+        record['type'] = record['type'].upper()
+        records.append(record)
+    return {'zone': zone, 'records': records}
+
+def index_records(records: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+    """Group records by (name, type)"""
+    index: Dict[Tuple[str, str], List[Dict]] = {}
+    for record in records:
+        index.setdefault((record['name'].lower(), record['type'].upper()), []).append(record)
+    return index
+
+def _needs_update(existing: Dict, desired: Dict) -> bool:
+    return any(field in desired and existing.get(field) != desired[field] for field in COMPARED_FIELDS)
+
+def plan_changes(existing_records: List[Dict], desired_records: List[Dict]) -> Dict:
+    """
+    Diff desired records against the zone
+    
+    Only (name, type) pairs mentioned in the desired state are touched.
+    Within a pair, records are matched by content first; leftovers are
+    updated in place, then created or deleted.
+    
+    Returns:
+        Dict with 'create' (records), 'update' ((existing, desired) pairs)
+        and 'delete' (existing records) lists
+    """
+    plan = {'create': [], 'update': [], 'delete': []}
+    existing_index = index_records(existing_records)
+    
+    for key, desired_group in index_records(desired_records).items():
+        existing_group = list(existing_index.get(key, []))
+        if any(record.get('absent') for record in desired_group):
+            plan['delete'].extend(existing_group)
+            continue
+    
+        unmatched = []
+        for desired in desired_group:
+            match = next((r for r in existing_group if r.get('content') == desired['content']), None)
+            if match:
+                existing_group.remove(match)
+                if _needs_update(match, desired):
+                    plan['update'].append((match, desired))
+            else:
+                unmatched.append(desired)
+    
+        for desired in unmatched:
+            if existing_group:
+                plan['update'].append((existing_group.pop(0), desired))
+            else:
+                plan['create'].append(desired)
+        plan['delete'].extend(existing_group)
+    
+    return plan
+
+def print_plan(plan: Dict):
+    """Print a reconcile plan"""
+    for record in plan['create']:
+        print(f"  + {record['name']} {record['type']} {record['content']}")
+    for existing, desired in plan['update']:
+        changes = ', '.join(f"{field}: {existing.get(field)} -> {desired[field]}"
+                            for field in COMPARED_FIELDS
+                            if field in desired and existing.get(field) != desired[field])
+        print(f"  ~ {desired['name']} {desired['type']} ({changes})")
+    for record in plan['delete']:
+        print(f"  - {record['name']} {record['type']} {record['content']}")
+    print(f"\n{len(plan['create'])} to create, {len(plan['update'])} to update, "
+          f"{len(plan['delete'])} to delete")
+
+def reconcile(cf: CloudflareManager, desired_path: str, dry_run: bool = False) -> bool:
+    """Bring a zone in line with a desired-state file"""
+    desired = load_desired_state(desired_path)
+    zone_id = cf.get_zone_id(desired['zone'])
+    if not zone_id:
+        print(f"Error: Could not find Cloudflare zone for {desired['zone']}")
+        return False
+    
+    try:
+        zone_id, existing = cf.with_zone(desired['zone'], zone_id, cf.list_records)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return False
+    print(f"\nZone {desired['zone']}: {len(existing)} existing records, "
+          f"{len(desired['records'])} desired\n")
+    plan = plan_changes(existing, desired['records'])
+    print_plan(plan)
+    
+    if dry_run:
+        print("\nDry run - no changes applied")
+        return True
+    
+    if cf.apply_changes(zone_id, plan):
+        print("\nReconcile completed successfully!")
+        return True
+    print("\nReconcile finished with errors. Please check the errors above.")
+    return False
+
+# Known Cloudflare secret names, ranked first when they exist
+PREFERRED_SECRET_NAMES = [
+    'beepmedia/tool/cloudflare/api',
+    'beepmedia/tool/cloudflare/credentials',
+    'cloudflare-api-token',
+    'cloudflare/api-token',
+    'beepmedia/cloudflare/api',
+    'beepmedia/cloudflare'
+]
+
+def parse_cloudflare_secret(secret_string: str) -> Optional[Dict]:
+    """Credentials from a secret value, or None if it holds something else"""
+    try:
+        creds = json.loads(secret_string)
+    except json.JSONDecodeError:
+        # If not JSON and not a PEM file, assume it's the API token
+        if secret_string and not secret_string.startswith('-----'):
+            return {'api_token': secret_string}
+        return None
+    if isinstance(creds, dict) and any(key in creds for key in ['api_token', 'api_key', 'token']):
+        return creds
+    return None
+
+def get_cloudflare_credentials(cache_dir: Path = DEFAULT_CACHE_DIR, refresh: bool = False):
     """Retrieve Cloudflare API credentials from AWS Secrets Manager"""
     print("Connecting to AWS Secrets Manager...")
     
@@ -118,81 +616,59 @@ def get_cloudflare_credentials():
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY
     )
     
-    # Try known Cloudflare secret names first
-    possible_names = [
-        'beepmedia/tool/cloudflare/api',
-        'beepmedia/tool/cloudflare/credentials',
-        'cloudflare-api-token',
-        'cloudflare-api-key',
-        'cloudflare/api-token',
-        'cloudflare/api-key',
-        'beepmedia/cloudflare',
-        'beepmedia/cloudflare/api',
-        'beepmedia/prod/cloudflare',
-        'beepmedia/api/cloudflare',
-        'prod/cloudflare',
-        'cf-api-token',
-        'cf-api-key',
-        'beepmedia/cf'
-    ]
-    
-    for name in possible_names:
-        try:
-            print(f"Trying secret: {name}")
-            secret_value = client.get_secret_value(SecretId=name)
-            
-            # Try to parse as JSON
-            try:
-                return json.loads(secret_value['SecretString'])
-            except json.JSONDecodeError:
-                # If not JSON, assume it's the API token directly
-                return {'api_token': secret_value['SecretString']}
-        except client.exceptions.ResourceNotFoundException:
-            continue
-        except Exception as e:
-            print(f"Error retrieving {name}: {str(e)}")
-    
-    # If not found by known names, search through all secrets
-    print("\nSearching through all secrets for Cloudflare credentials...")
+    index = SecretIndex(client, Path(cache_dir) / 'secret-index.json', refresh=refresh)
     try:
-        response = client.list_secrets(MaxResults=100)
-        all_secrets = response['SecretList']
-        
-        # Handle pagination
-        while 'NextToken' in response:
-            response = client.list_secrets(MaxResults=100, NextToken=response['NextToken'])
-            all_secrets.extend(response['SecretList'])
-        
-        # Look for Cloudflare-related secrets
-        for secret in all_secrets:
-            name_lower = secret['Name'].lower()
-            if 'cloudflare' in name_lower or 'cf' in name_lower:
-                print(f"Found potential Cloudflare secret: {secret['Name']}")
-                
-                try:
-                    secret_value = client.get_secret_value(SecretId=secret['Name'])
-                    
-                    # Try to parse as JSON
-                    try:
-                        creds = json.loads(secret_value['SecretString'])
-                        # Check if it contains API credentials
-                        if any(key in creds for key in ['api_token', 'api_key', 'token']):
-                            return creds
-                    except json.JSONDecodeError:
-                        # If not JSON and not a PEM file, assume it's the API token
-                        if not secret_value['SecretString'].startswith('-----'):
-                            return {'api_token': secret_value['SecretString']}
-                except Exception as e:
-                    print(f"Error retrieving {secret['Name']}: {str(e)}")
-        
+        return index.fetch('cloudflare', parse_cloudflare_secret,
+                           aliases=['cf'], preferred=PREFERRED_SECRET_NAMES)
     except Exception as e:
-        print(f"Error listing secrets: {str(e)}")
-    
-    return None
+        print(f"Error searching secrets: {str(e)}")
+        return None
+
+def snapshot_dns(max_age: int) -> Optional[Dict]:
+    """The 'dns' section of a fresh fleet snapshot, or None"""
+    snapshot = load_snapshot(max_age=max_age)
+    if snapshot is None:
+        print("No fresh fleet snapshot, using the Cloudflare API")
+        return None
+    if not snapshot.get('dns'):
+        reason = snapshot.get('failed', {}).get('dns', 'not collected')
+        print(f"Fleet snapshot has no DNS zone ({reason}), using the Cloudflare API")
+        return None
+    print(f"Using zone {snapshot['dns']['zone']} from the fleet snapshot of {snapshot['generated_at']}")
+    return snapshot['dns']
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Update Cloudflare DNS records')
+    parser.add_argument('--reconcile', metavar='FILE',
+                        help='Reconcile the zone against a desired-state JSON file '
+                             '(see dns-records.example.json)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='With --reconcile, show the plan without applying it')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                        help=f'Where zone and record IDs are cached (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached zone/record IDs and the secret index')
+    parser.add_argument('--from-snapshot', action='store_true',
+                        help='Take the zone ID and records from the fleet inventory snapshot '
+                             'instead of listing them')
+    parser.add_argument('--max-age', type=int, default=DEFAULT_MAX_AGE,
+                        help=f'With --from-snapshot, oldest usable snapshot in seconds (default: {DEFAULT_MAX_AGE})')
+    return parser.parse_args()
+
+def print_call_stats(cf: CloudflareManager):
+    """Print the API call summary and release pooled connections"""
+    stats = cf.latency_summary()
+    print(f"\nCloudflare API: {stats['calls']} calls, {stats.get('retries', 0)} retries, "
+          f"{stats.get('total_ms', 0)}ms total")
+    cf.close()
 
 def main():
     """Main function to update DNS record"""
-    print("Updating Cloudflare DNS for mcp.beepmedia.com")
+    args = parse_args()
+    if args.reconcile:
+        print(f"Reconciling Cloudflare DNS from {args.reconcile}")
+    else:
+        print("Updating Cloudflare DNS for mcp.beepmedia.com")
     print("=" * 50)
     
     # Check AWS credentials
@@ -202,7 +678,7 @@ def main():
         return
     
     # Get Cloudflare credentials from AWS
-    cloudflare_creds = get_cloudflare_credentials()
+    cloudflare_creds = get_cloudflare_credentials(args.cache_dir, refresh=args.refresh)
     
     if not cloudflare_creds:
         print("\nError: Could not retrieve Cloudflare credentials from AWS Secrets Manager")
@@ -221,7 +697,17 @@ def main():
     print("\nCloudflare API credentials retrieved successfully")
     
     # Initialize Cloudflare manager
-    cf = CloudflareManager(api_token, api_email)
+    id_cache = IdCache(Path(args.cache_dir) / 'cloudflare-ids.json', refresh=args.refresh)
+    cf = CloudflareManager(api_token, api_email, id_cache=id_cache)
+    if args.from_snapshot:
+        dns = snapshot_dns(args.max_age)
+        if dns:
+            cf.seed_from_snapshot(dns)
+    
+    if args.reconcile:
+        reconcile(cf, args.reconcile, dry_run=args.dry_run)
+        print_call_stats(cf)
+        return
     
     # Get zone ID
     zone_id = cf.get_zone_id('beepmedia.com')
@@ -239,6 +725,8 @@ def main():
         print(f"\nmcp.beepmedia.com now points to {DNS_RECORD['content']} (Production Elastic IP)")
     else:
         print("\nFailed to update DNS record. Please check the errors above.")
+    
+    print_call_stats(cf)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,49 +1,83 @@
 #!/usr/bin/env python3
 
+import argparse
 import boto3
+import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError, NoCredentialsError
 
-# Set AWS credentials from environment variables
-aws_access_key_id = os.environ.get('BEEPMEDIA_AWS_ACCESS_KEY_ID')
-aws_secret_access_key = os.environ.get('BEEPMEDIA_AWS_SECRET_ACCESS_KEY')
+SG_NAME = 'beepmedia-mcp-sg'
 
-if not aws_access_key_id or not aws_secret_access_key:
-    print("Error: BEEPMEDIA AWS credentials not found in environment variables")
-    sys.exit(1)
+# Regional lookups are network-bound; one worker per region is plenty
+MAX_WORKERS = 32
 
-# Create EC2 client with beepmedia credentials
-ec2 = boto3.client(
-    'ec2',
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-    region_name='us-east-1'  # Change this if your resources are in a different region
-)
+# Protocols whose FromPort/ToPort are a port range; others (icmp, -1) match exactly
+RANGE_PROTOCOLS = {'tcp', 'udp', '6', '17'}
+REQUIRED_PORTS = {22: 'SSH', 80: 'HTTP', 443: 'HTTPS'}
 
-def get_security_group(sg_name):
-    """Get security group by name"""
-    try:
-        response = ec2.describe_security_groups(
-            Filters=[
-                {
-                    'Name': 'group-name',
-                    'Values': [sg_name]
-                }
-            ]
-        )
+def create_session():
+    """Create one boto3 session from the beepmedia credentials in the environment"""
+    aws_access_key_id = os.environ.get('BEEPMEDIA_AWS_ACCESS_KEY_ID')
+    aws_secret_access_key = os.environ.get('BEEPMEDIA_AWS_SECRET_ACCESS_KEY')
+    
+    if not aws_access_key_id or not aws_secret_access_key:
+        print("Error: BEEPMEDIA AWS credentials not found in environment variables")
+        sys.exit(1)
         
-        if response['SecurityGroups']:
-            return response['SecurityGroups'][0]
-        else:
-            print(f"Security group '{sg_name}' not found")
-            return None
+    return boto3.Session(
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        region_name='us-east-1'
+    )
+
+def get_regions(session):
+    """Regions enabled for the account"""
+    ec2 = session.client('ec2')
+    return [region['RegionName'] for region in ec2.describe_regions()['Regions']]
+
+def get_security_groups(ec2, sg_name):
+    """Get every security group with this name in the client's region"""
+    response = ec2.describe_security_groups(
+        Filters=[
+            {
+                'Name': 'group-name',
+                'Values': [sg_name]
+            }
+        ]
+    )
+    return response['SecurityGroups']
+
+def find_security_groups(session, sg_name, regions):
+    """
+    Look for a security group in every region concurrently
+    
+    Clients are created up front on the calling thread (sessions are not
+    thread-safe, clients are) and then queried in parallel.
+    
+    Returns:
+        (matches, errors) where matches is a list of (region, client, group)
+        and errors maps region to the exception raised there
+    """
+    clients = {region: session.client('ec2', region_name=region) for region in regions}
+    
+    def lookup(region):
+        try:
+            return region, get_security_groups(clients[region], sg_name), None
+        except (ClientError, NoCredentialsError) as e:
+            return region, [], e
             
-    except ClientError as e:
-        print(f"Error retrieving security group: {e}")
-        return None
+    matches = []
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(regions)))) as executor:
+        for region, groups, error in executor.map(lookup, regions):
+            if error:
+                errors[region] = error
+            matches.extend((region, clients[region], sg) for sg in groups)
+    return matches, errors
 
-def remove_port_range(sg_id, port_range_start, port_range_end):
+def remove_port_range(ec2, sg_id, port_range_start, port_range_end):
     """Remove a port range from security group"""
     try:
         # Remove the ingress rule for the port range
@@ -68,6 +102,187 @@ def remove_port_range(sg_id, port_range_start, port_range_end):
             print(f"Error removing port range: {e}")
         return False
 
+def parse_ports(value):
+    """Port spec (443, "8000-8020", [8000, 8020]) to an inclusive (from, to) pair"""
+    if value is None:
+        return -1, -1
+    if isinstance(value, int):
+        return value, value
+    if isinstance(value, (list, tuple)):
+        return int(value[0]), int(value[-1])
+    low, _, high = str(value).partition('-')
+    return int(low), int(high or low)
+
+def normalize_permissions(permissions):
+    """Flatten IpPermissions into one rule per (protocol, port range, CIDR)"""
+    rules = []
+    for perm in permissions:
+        protocol = perm['IpProtocol']
+        from_port = perm.get('FromPort', -1)
+        to_port = perm.get('ToPort', -1)
+        ranges = [(r['CidrIp'], r.get('Description')) for r in perm.get('IpRanges', [])]
+        ranges += [(r['CidrIpv6'], r.get('Description')) for r in perm.get('Ipv6Ranges', [])]
+        for cidr, description in ranges:
+            rules.append({'protocol': protocol, 'from': from_port, 'to': to_port,
+                          'cidr': cidr, 'description': description})
+    return rules
+
+def load_policy(path):
+    """
+    Load a desired ingress policy
+    
+    Format:
+        {"ingress": [{"protocol": "tcp", "ports": "443", "cidr": ["0.0.0.0/0", "::/0"],
+                      "description": "HTTPS"}]}
+    """
+    with open(path) as f:
+        policy = json.load(f)
+        
+    rules = []
+    for entry in policy.get('ingress', []):
+        protocol = str(entry.get('protocol', 'tcp')).lower()
+        from_port, to_port = parse_ports(None if protocol == '-1' else entry.get('ports'))
+        cidrs = entry['cidr'] if isinstance(entry['cidr'], list) else [entry['cidr']]
+        for cidr in cidrs:
+            rules.append({'protocol': protocol, 'from': from_port, 'to': to_port,
+                          'cidr': cidr, 'description': entry.get('description')})
+    return rules
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or adjacent inclusive intervals"""
+    merged = []
+    for low, high in sorted(intervals):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+def build_index(rules):
+    """Port intervals per (protocol, CIDR), merged for port-range protocols"""
+    index = {}
+    for rule in rules:
+        index.setdefault((rule['protocol'], rule['cidr']), []).append((rule['from'], rule['to']))
+    return {key: merge_intervals(intervals) if key[0] in RANGE_PROTOCOLS else sorted(set(intervals))
+            for key, intervals in index.items()}
+
+def is_covered(intervals, protocol, low, high):
+    if protocol not in RANGE_PROTOCOLS:
+        return (low, high) in intervals
+    return any(start <= low and high <= end for start, end in intervals)
+
+def subtract_intervals(intervals, covered, protocol):
+    """Parts of intervals not covered by the (merged) covered intervals"""
+    if protocol not in RANGE_PROTOCOLS:
+        return [interval for interval in intervals if interval not in covered]
+    gaps = []
+    for low, high in intervals:
+        for start, end in covered:
+            if end < low or start > high:
+                continue
+            if start > low:
+                gaps.append((low, start - 1))
+            low = end + 1
+            if low > high:
+                break
+        if low <= high:
+            gaps.append((low, high))
+    return gaps
+
+def plan_reconcile(existing_rules, desired_rules):
+    """
+    Minimal diff between existing and desired ingress rules
+    
+    Existing rules that lie entirely inside the desired coverage for their
+    (protocol, CIDR) are kept; every other rule is revoked exactly as it
+    exists. Desired coverage that the kept rules miss is authorized.
+    
+    Returns:
+        Dict with 'keep', 'revoke' and 'authorize' rule lists
+    """
+    desired_index = build_index(desired_rules)
+    plan = {'keep': [], 'revoke': [], 'authorize': []}
+    for rule in existing_rules:
+        intervals = desired_index.get((rule['protocol'], rule['cidr']), [])
+        covered = is_covered(intervals, rule['protocol'], rule['from'], rule['to'])
+        plan['keep' if covered else 'revoke'].append(rule)
+        
+    kept_index = build_index(plan['keep'])
+    for (protocol, cidr), intervals in sorted(desired_index.items()):
+        for low, high in subtract_intervals(intervals, kept_index.get((protocol, cidr), []), protocol):
+            description = next((r['description'] for r in desired_rules
+                                if (r['protocol'], r['cidr']) == (protocol, cidr)
+                                and r['from'] <= low <= r['to']), None)
+            plan['authorize'].append({'protocol': protocol, 'from': low, 'to': high,
+                                      'cidr': cidr, 'description': description})
+    return plan
+
+def to_permissions(rules, with_descriptions=True):
+    """Group flat rules back into as few IpPermissions entries as possible"""
+    grouped = {}
+    for rule in rules:
+        perm = grouped.get((rule['protocol'], rule['from'], rule['to']))
+        if perm is None:
+            perm = {'IpProtocol': rule['protocol']}
+            if rule['protocol'] != '-1':
+                perm['FromPort'] = rule['from']
+                perm['ToPort'] = rule['to']
+            grouped[(rule['protocol'], rule['from'], rule['to'])] = perm
+        if ':' in rule['cidr']:
+            entry, field = {'CidrIpv6': rule['cidr']}, 'Ipv6Ranges'
+        else:
+            entry, field = {'CidrIp': rule['cidr']}, 'IpRanges'
+        if with_descriptions and rule.get('description'):
+            entry['Description'] = rule['description']
+        perm.setdefault(field, []).append(entry)
+    return list(grouped.values())
+
+def apply_plan(ec2, sg_id, plan):
+    """
+    Apply a reconcile plan with at most two API calls
+    
+    New coverage is authorized before anything is revoked, so access that
+    is being reshaped (e.g. a single port widened to a range) never drops.
+    """
+    if plan['authorize']:
+        ec2.authorize_security_group_ingress(GroupId=sg_id, IpPermissions=to_permissions(plan['authorize']))
+    if plan['revoke']:
+        ec2.revoke_security_group_ingress(GroupId=sg_id,
+                                          IpPermissions=to_permissions(plan['revoke'], with_descriptions=False))
+
+def format_rule(rule):
+    protocol = 'all' if rule['protocol'] == '-1' else rule['protocol']
+    ports = '' if rule['protocol'] == '-1' else (
+        str(rule['from']) if rule['from'] == rule['to'] else f"{rule['from']}-{rule['to']}")
+    return f"{protocol:<5} {ports:<12} {rule['cidr']}"
+
+def print_plan(plan):
+    for rule in plan['authorize']:
+        print(f"  + {format_rule(rule)}")
+    for rule in plan['revoke']:
+        print(f"  - {format_rule(rule)}")
+    print(f"\n{len(plan['authorize'])} to authorize, {len(plan['revoke'])} to revoke, "
+          f"{len(plan['keep'])} unchanged")
+
+def reconcile_security_group(ec2, sg, desired_rules, dry_run=False):
+    """Plan and (unless dry_run) apply the desired policy to one group"""
+    plan = plan_reconcile(normalize_permissions(sg['IpPermissions']), desired_rules)
+    result = {'group_id': sg['GroupId'], 'group_name': sg['GroupName'], **plan,
+              'applied': False, 'error': None}
+    if not dry_run and (plan['authorize'] or plan['revoke']):
+        try:
+            apply_plan(ec2, sg['GroupId'], plan)
+            result['applied'] = True
+        except ClientError as e:
+            result['error'] = str(e)
+    return result
+
+def port_is_open(rules, port):
+    """True if any TCP (or all-traffic) rule covers the port"""
+    return any(rule['protocol'] == '-1' or
+               (rule['protocol'] in ('tcp', '6') and rule['from'] <= port <= rule['to'])
+               for rule in rules)
+
 def display_security_group_rules(sg):
     """Display current security group rules"""
     print(f"\nSecurity Group: {sg['GroupName']} ({sg['GroupId']})")
@@ -108,57 +323,9 @@ def display_security_group_rules(sg):
             
         print(f"{protocol:<10} {port_range:<15} {source:<20} {description}")
 
-def main():
-    sg_name = 'beepmedia-mcp-sg'
-    
-    print(f"Connecting to AWS with beepmedia credentials...")
-    print(f"Looking for security group: {sg_name}")
-    
-    # Get the security group
-    sg = get_security_group(sg_name)
-    if not sg:
-        # Try different regions if not found in us-east-1
-        regions = ['us-west-2', 'eu-west-1', 'ap-southeast-1']
-        for region in regions:
-            print(f"\nTrying region: {region}")
-            ec2_regional = boto3.client(
-                'ec2',
-                aws_access_key_id=aws_access_key_id,
-                aws_secret_access_key=aws_secret_access_key,
-                region_name=region
-            )
-            
-            try:
-                response = ec2_regional.describe_security_groups(
-                    Filters=[
-                        {
-                            'Name': 'group-name',
-                            'Values': [sg_name]
-                        }
-                    ]
-                )
-                
-                if response['SecurityGroups']:
-                    sg = response['SecurityGroups'][0]
-                    global ec2
-                    ec2 = ec2_regional
-                    print(f"Found security group in region: {region}")
-                    break
-                    
-            except ClientError:
-                continue
-                
-        if not sg:
-            print("\nCould not find the security group in any common region.")
-            print("\nListing all security groups in us-east-1:")
-            try:
-                all_sgs = ec2.describe_security_groups()
-                for security_group in all_sgs['SecurityGroups']:
-                    print(f"  - {security_group['GroupName']} ({security_group['GroupId']})")
-            except ClientError as e:
-                print(f"Error listing security groups: {e}")
-            return
-    
+def update_security_group(ec2, sg):
+    """Remove the 8000-8020 range and check the required ports are still open"""
+    sg_name = sg['GroupName']
     sg_id = sg['GroupId']
     
     print("\nCurrent security group rules:")
@@ -166,27 +333,123 @@ def main():
     
     # Remove port range 8000-8020
     print(f"\nRemoving port range 8000-8020 from security group {sg_name}...")
-    remove_port_range(sg_id, 8000, 8020)
+    remove_port_range(ec2, sg_id, 8000, 8020)
     
     # Get updated security group
-    sg = get_security_group(sg_name)
+    response = ec2.describe_security_groups(GroupIds=[sg_id])
+    sg = response['SecurityGroups'][0] if response['SecurityGroups'] else None
     if sg:
         print("\nUpdated security group rules:")
         display_security_group_rules(sg)
         
-        # Verify required ports are still open
-        print("\nVerifying required ports:")
-        required_ports = {'22': 'SSH', '80': 'HTTP', '443': 'HTTPS'}
-        for rule in sg['IpPermissions']:
-            from_port = str(rule.get('FromPort', ''))
-            if from_port in required_ports:
-                print(f"✓ Port {from_port} ({required_ports[from_port]}) is open")
-                del required_ports[from_port]
+        verify_required_ports(sg)
+
+def verify_required_ports(sg):
+    """Check SSH/HTTP/HTTPS are still reachable, including through port ranges"""
+    print("\nVerifying required ports:")
+    rules = normalize_permissions(sg['IpPermissions'])
+    missing = {}
+    for port, service in REQUIRED_PORTS.items():
+        if port_is_open(rules, port):
+            print(f"✓ Port {port} ({service}) is open")
+        else:
+            missing[port] = service
+            
+    if missing:
+        print("\n⚠️  Warning: The following required ports are not open:")
+        for port, service in missing.items():
+            print(f"  - Port {port} ({service})")
+
+def snapshot_regions(sg_name, regions, out=sys.stdout):
+    """Narrow the regions to those where the fleet snapshot saw the group"""
+    from fleet_inventory import load_snapshot
+    
+    snapshot = load_snapshot()
+    if snapshot is None:
+        print("No fresh fleet snapshot, searching every region", file=out)
+        return regions
+    found = [region for region in regions
+             if region in snapshot['regions'] and any(
+                 group['name'] == sg_name for group in snapshot['regions'][region]['security_groups'].values())]
+    # Regions the snapshot could not read still have to be searched
+    found += [region for region in regions if region in snapshot['failed']]
+    print(f"Fleet snapshot from {snapshot['generated_at']}: searching {', '.join(found) or 'no regions'}", file=out)
+    return found
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Update the MCP security group')
+    parser.add_argument('--name', default=SG_NAME, help=f'Security group name (default: {SG_NAME})')
+    parser.add_argument('--region', action='append', dest='regions',
+                        help='Region to search (repeatable; default: all enabled regions)')
+    parser.add_argument('--from-snapshot', action='store_true',
+                        help='Only search regions where the fleet inventory snapshot saw the group')
+    parser.add_argument('--policy', metavar='FILE',
+                        help='Reconcile ingress rules against a desired policy file '
+                             '(see sg-policy.example.json)')
+    parser.add_argument('--dry-run', action='store_true', help='With --policy, only show the plan')
+    parser.add_argument('--json', action='store_true', help='With --policy, print the plan as JSON')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sg_name = args.name
+    desired_rules = load_policy(args.policy) if args.policy else None
+    # Keep stdout clean for --json; progress goes to stderr
+    out = sys.stderr if args.json else sys.stdout
+    
+    print(f"Connecting to AWS with beepmedia credentials...", file=out)
+    session = create_session()
+    regions = args.regions or get_regions(session)
+    if args.from_snapshot:
+        regions = snapshot_regions(sg_name, regions, out)
+    
+    print(f"Looking for security group: {sg_name} in {len(regions)} regions", file=out)
+    matches, errors = find_security_groups(session, sg_name, regions)
+    for region, error in sorted(errors.items()):
+        print(f"  ⚠️  {region}: {error}", file=out)
+        
+    if not matches:
+        print("\nCould not find the security group in any region.", file=out)
+        if args.json:
+            print(json.dumps([]))
+            return
+        print("\nListing all security groups in us-east-1:")
+        try:
+            all_sgs = session.client('ec2').describe_security_groups()
+            for security_group in all_sgs['SecurityGroups']:
+                print(f"  - {security_group['GroupName']} ({security_group['GroupId']})")
+        except ClientError as e:
+            print(f"Error listing security groups: {e}")
+        return
+        
+    print(file=out)
+    for region, ec2, sg in matches:
+        print(f"Found security group {sg['GroupId']} in region: {region}", file=out)
+        
+    if desired_rules is None:
+        for region, ec2, sg in matches:
+            print(f"\n=== {region} ===")
+            update_security_group(ec2, sg)
+        return
+        
+    results = []
+    for region, ec2, sg in matches:
+        result = {'region': region, **reconcile_security_group(ec2, sg, desired_rules, args.dry_run)}
+        results.append(result)
+        if not args.json:
+            print(f"\n=== {region} {sg['GroupId']} ===")
+            print_plan(result)
+            if result['error']:
+                print(f"❌ Error applying changes: {result['error']}")
+            elif result['applied']:
+                print("✅ Changes applied")
                 
-        if required_ports:
-            print("\n⚠️  Warning: The following required ports are not open:")
-            for port, service in required_ports.items():
-                print(f"  - Port {port} ({service})")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    elif args.dry_run:
+        print("\nDry run - no changes applied")
+    if any(result['error'] for result in results):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
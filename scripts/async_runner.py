@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory, cancellable subprocess runner for the test harnesses
+Streams a command's output to a log file while keeping only a short tail
+in memory, kills it (and its container, if named) on a hard timeout, and
+stops everything still running when the harness is interrupted
+"""
+
+import asyncio
+import contextlib
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+TAIL_LINES = 100
+READ_CHUNK = 64 * 1024
+
+
+class CommandResult:
+    """Outcome of one command; output beyond the tail lives only in the log file"""
+
+    def __init__(self, argv, log_path=None, tail_lines=TAIL_LINES):
+        self.argv = argv
+        self.log_path = log_path
+        self.returncode = None
+        self.timed_out = False
+        self.cancelled = False
+        self.duration = 0.0
+        self.stdout_tail = deque(maxlen=tail_lines)
+        self.stderr_tail = deque(maxlen=tail_lines)
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    @property
+    def stdout(self):
+        return '\n'.join(self.stdout_tail)
+
+    @property
+    def stderr(self):
+        lines = list(self.stderr_tail)
+        if self.timed_out:
+            lines.append(f'Command timed out after {self.duration:.0f}s')
+        elif self.cancelled:
+            lines.append('Command cancelled')
+        return '\n'.join(lines)
+
+
+class AsyncRunner:
+    """
+    Runs commands as asyncio subprocesses
+
+    Each command gets its own process group, so a timeout or cancel takes
+    down everything it started. run() may be called from several worker
+    threads at once (each gets its own event loop); cancel_all() is safe
+    to call from the main thread on Ctrl-C.
+    """
+
+    def __init__(self, log_dir=None, tail_lines=TAIL_LINES):
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.tail_lines = tail_lines
+        self._active = {}
+        self._containers = set()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def log_path(self, log_name):
+        if not (self.log_dir and log_name):
+            return None
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        return self.log_dir / f'{log_name}.log'
+
+    async def _pump(self, stream, tail, log_file):
+        """Copy a pipe to the log in chunks, keeping the last lines in the tail"""
+        partial = b''
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            if log_file:
+                log_file.write(chunk)
+            lines = (partial + chunk).split(b'\n')
+            # Never hold more than one chunk of an unterminated line
+            partial = lines.pop()[-READ_CHUNK:]
+            tail.extend(line.decode('utf-8', errors='replace').rstrip('\r') for line in lines[-tail.maxlen:])
+        if partial:
+            tail.append(partial.decode('utf-8', errors='replace'))
+
+    async def run_async(self, argv, log_name=None, timeout=None, cwd=None, env=None, container_name=None):
+        """
+        Run a command to completion, a timeout or cancellation
+
+        Args:
+            argv: Command as a list (no shell)
+            log_name: Full output goes to <log_dir>/<log_name>.log
+            timeout: Hard limit in seconds
+            container_name: Container to remove if the command is killed
+
+        Returns:
+            CommandResult
+        """
+        result = CommandResult(list(argv), self.log_path(log_name), self.tail_lines)
+        if self._cancelled.is_set():
+            result.cancelled = True
+            return result
+
+        started = time.monotonic()
+        log_file = open(result.log_path, 'wb') if result.log_path else None
+        try:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *argv, cwd=cwd, env=env,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True
+                )
+            except OSError as e:
+                result.returncode = -1
+                result.stderr_tail.append(str(e))
+                return result
+
+            with self._lock:
+                self._active[process.pid] = container_name
+            try:
+                await asyncio.wait_for(asyncio.gather(
+                    self._pump(process.stdout, result.stdout_tail, log_file),
+                    self._pump(process.stderr, result.stderr_tail, log_file),
+                    process.wait()
+                ), timeout)
+            except asyncio.TimeoutError:
+                result.timed_out = True
+                self._kill(process.pid, container_name)
+                await process.wait()
+            except asyncio.CancelledError:
+                result.cancelled = True
+                self._kill(process.pid, container_name)
+                raise
+            finally:
+                with self._lock:
+                    self._active.pop(process.pid, None)
+
+            result.returncode = process.returncode
+            if self._cancelled.is_set() and result.returncode != 0:
+                result.cancelled = True
+            return result
+        finally:
+            result.duration = time.monotonic() - started
+            if log_file:
+                log_file.close()
+
+    def run(self, argv, **kwargs):
+        """Blocking wrapper around run_async() for thread-based callers"""
+        return asyncio.run(self.run_async(argv, **kwargs))
+
+    @staticmethod
+    def _kill(pid, container_name=None):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        if container_name:
+            # Killing the docker CLI does not stop the container it started
+            AsyncRunner._remove_container(container_name)
+
+    @staticmethod
+    def _remove_container(container_name):
+        try:
+            subprocess.run(['docker', 'rm', '-f', container_name], capture_output=True, timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    @contextlib.contextmanager
+    def container(self, container_name):
+        """
+        Register a container started outside run() (e.g. by an MCP client)
+        so cancel_all() removes it too; its docker CLI then exits and the
+        client's pending requests fail instead of blocking the worker
+        """
+        with self._lock:
+            self._containers.add(container_name)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._containers.discard(container_name)
+
+    def cancel_all(self):
+        """Kill every running command and registered container, and refuse new ones"""
+        self._cancelled.set()
+        with self._lock:
+            active = list(self._active.items())
+            containers = list(self._containers)
+        for pid, container_name in active:
+            self._kill(pid, container_name)
+        for container_name in containers:
+            self._remove_container(container_name)
+        return len(active) + len(containers)
@@ -1,23 +1,230 @@
 import boto3
 import json
 import os
-from typing import Optional, Union, Dict, Any
-from datetime import datetime, timedelta
-from functools import lru_cache
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union, Dict, Any, Callable, Iterable, Tuple
+from datetime import timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# BatchGetSecretValue accepts at most 20 secret IDs per call
+BATCH_GET_LIMIT = 20
+# ListSecrets accepts at most 10 values per filter
+LIST_FILTER_LIMIT = 10
+DEFAULT_FETCH_WORKERS = 8
+
+
+class _KeyLoad:
+    """Serialises loads of one key; users counts the threads holding or waiting on it"""
+    
+    __slots__ = ('lock', 'users')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class SecretCache:
+    """
+    Thread-safe secret cache with TTL expiry and LRU eviction
+    
+    Concurrent misses for the same key share a single load, so each secret
+    is fetched from AWS at most once per TTL window.
+    """
+    
+    def __init__(self, ttl: timedelta = timedelta(hours=1), max_size: int = 128):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Only keys being loaded right now; dropped when their last user leaves
+        self._loading: Dict[str, _KeyLoad] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _lookup(self, key: str):
+        """Return (found, value); caller must hold the lock"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expiry, value = entry
+        if expiry <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+    
+    def get(self, key: str):
+        """Return (found, value) without loading"""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+    
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl.total_seconds(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value, calling loader() once on a miss"""
+        found, value = self.get(key)
+        if found:
+            return value
+        
+        with self._lock:
+            load = self._loading.setdefault(key, _KeyLoad())
+            load.users += 1
+        try:
+            with load.lock:
+                # Another thread may have loaded it while we waited
+                with self._lock:
+                    found, value = self._lookup(key)
+                if found:
+                    return value
+                value = loader()
+                self.set(key, value)
+                return value
+        finally:
+            with self._lock:
+                load.users -= 1
+                if not load.users:
+                    del self._loading[key]
+    
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one entry, or everything when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries)
+            }
+
+
 class SecureSecretsManager:
     """
     Secure AWS Secrets Manager wrapper for MCP servers
     Implements caching and secure credential handling
     """
     
-    def __init__(self, region: str = "us-east-1"):
-        self.client = boto3.client('secretsmanager', region_name=region)
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self.cache_ttl = timedelta(hours=1)
+    def __init__(self, region: str = "us-east-1", cache_ttl: timedelta = timedelta(hours=1),
+                 cache_size: int = 128, endpoint_url: Optional[str] = None):
+        # endpoint_url (or AWS_ENDPOINT_URL_SECRETS_MANAGER) points at a local stand-in
+        self.client = boto3.client('secretsmanager', region_name=region, endpoint_url=endpoint_url)
+        self._cache = SecretCache(ttl=cache_ttl, max_size=cache_size)
+        self.cache_ttl = cache_ttl
+    
+    def _fetch_secret(self, secret_name: str) -> Union[str, Dict[str, Any]]:
+        """Fetch and parse a secret from AWS (uncached)"""
+        response = self.client.get_secret_value(SecretId=secret_name)
+        
+        # Parse secret value
+        if 'SecretString' in response:
+            return self._parse_secret_string(response['SecretString'])
+        raise ValueError("Binary secrets not supported")
+    
+    @staticmethod
+    def _parse_secret_string(secret_string: str) -> Union[str, Dict[str, Any]]:
+        try:
+            return json.loads(secret_string)
+        except json.JSONDecodeError:
+            return secret_string
+    
+    def _batch_fetch(self, secret_names: list) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Fetch secrets with BatchGetSecretValue, 20 at a time"""
+        values, errors = {}, {}
+        for start in range(0, len(secret_names), BATCH_GET_LIMIT):
+            chunk = secret_names[start:start + BATCH_GET_LIMIT]
+            kwargs = {'SecretIdList': chunk}
+            while True:
+                response = self.client.batch_get_secret_value(**kwargs)
+                for item in response.get('SecretValues', []):
+                    if 'SecretString' in item:
+                        values[item['Name']] = self._parse_secret_string(item['SecretString'])
+                    else:
+                        errors[item['Name']] = "Binary secrets not supported"
+                for error in response.get('Errors', []):
+                    errors[error['SecretId']] = f"{error.get('ErrorCode')}: {error.get('Message')}"
+                if not response.get('NextToken'):
+                    break
+                kwargs['NextToken'] = response['NextToken']
+        return values, errors
+    
+    def _concurrent_fetch(self, secret_names: list, max_workers: int) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Fetch secrets one call each, spread over a bounded thread pool"""
+        values, errors = {}, {}
+        
+        def fetch(name):
+            try:
+                return name, self._fetch_secret(name), None
+            except Exception as e:
+                return name, None, str(e)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(secret_names)))) as executor:
+            for name, value, error in executor.map(fetch, secret_names):
+                if error is None:
+                    values[name] = value
+                else:
+                    errors[name] = error
+        return values, errors
+    
+    def get_secrets(self, secret_names: Iterable[str],
+                    max_workers: int = DEFAULT_FETCH_WORKERS) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Get many secrets at once, using the cache and batching the misses
+        
+        Args:
+            secret_names: Names of the secrets in AWS
+            max_workers: Concurrency used when batch retrieval is unavailable
+            
+        Returns:
+            (values, errors) dicts keyed by secret name; a failing secret
+            never prevents the others from resolving
+        """
+        values, missing = {}, []
+        for name in dict.fromkeys(secret_names):
+            found, value = self._cache.get(name)
+            if found:
+                values[name] = value
+            else:
+                missing.append(name)
+        if not missing:
+            return values, {}
+        
+        try:
+            fetched, errors = self._batch_fetch(missing)
+        except Exception as e:
+            # Older botocore, no BatchGetSecretValue permission or an endpoint without it
+            logger.info(f"Batch retrieval unavailable ({e}), fetching concurrently")
+            fetched, errors = self._concurrent_fetch(missing, max_workers)
+        
+        for name, value in fetched.items():
+            self._cache.set(name, value)
+        for name, error in errors.items():
+            logger.error(f"Failed to retrieve secret {name}: {error}")
+        values.update(fetched)
+        return values, errors
     
     def get_secret(self, secret_name: str, key: Optional[str] = None) -> Union[str, Dict[str, Any]]:
         """
@@ -30,44 +237,51 @@ class SecureSecretsManager:
         Returns:
             Secret value (string or dict)
         """
-        cache_key = f"{secret_name}:{key or 'full'}"
-        
-        # Check cache
-        if cache_key in self._cache:
-            cached = self._cache[cache_key]
-            if cached['expiry'] > datetime.now():
-                return cached['value']
-        
         try:
-            response = self.client.get_secret_value(SecretId=secret_name)
-            
-            # Parse secret value
-            if 'SecretString' in response:
-                try:
-                    secret_value = json.loads(response['SecretString'])
-                except json.JSONDecodeError:
-                    secret_value = response['SecretString']
-            else:
-                raise ValueError("Binary secrets not supported")
-            
-            # Extract specific key if requested
-            value = secret_value.get(key) if key and isinstance(secret_value, dict) else secret_value
-            
-            # Cache the result
-            self._cache[cache_key] = {
-                'value': value,
-                'expiry': datetime.now() + self.cache_ttl
-            }
-            
-            return value
-            
+            # Cache the whole secret so different keys share one API call
+            secret_value = self._cache.get_or_load(secret_name, lambda: self._fetch_secret(secret_name))
         except Exception as e:
             logger.error(f"Failed to retrieve secret {secret_name}: {str(e)}")
             raise
+        
+        # Extract specific key if requested
+        return secret_value.get(key) if key and isinstance(secret_value, dict) else secret_value
+    
+    def get_secret_versions(self, secret_names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Get the AWSCURRENT version ID of each secret without reading values
+        
+        Uses ListSecrets with name filters, so ten secrets cost one call.
+        
+        Returns:
+            Dict of secret name to current version ID (None if not found)
+        """
+        wanted = list(dict.fromkeys(secret_names))
+        versions: Dict[str, Optional[str]] = {name: None for name in wanted}
+        for start in range(0, len(wanted), LIST_FILTER_LIMIT):
+            chunk = wanted[start:start + LIST_FILTER_LIMIT]
+            paginator = self.client.get_paginator('list_secrets')
+            for page in paginator.paginate(Filters=[{'Key': 'name', 'Values': chunk}]):
+                for entry in page.get('SecretList', []):
+                    # The name filter is a prefix match; keep exact names only
+                    if entry['Name'] not in versions:
+                        continue
+                    for version_id, stages in entry.get('SecretVersionsToStages', {}).items():
+                        if 'AWSCURRENT' in stages:
+                            versions[entry['Name']] = version_id
+        return versions
+    
+    def invalidate(self, secret_name: str):
+        """Forget a cached secret so the next lookup sees its rotated value"""
+        self._cache.invalidate(secret_name)
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Cache hit/miss counters"""
+        return self._cache.stats()
     
     def clear_cache(self):
         """Clear cache for security or refresh purposes"""
-        self._cache.clear()
+        self._cache.invalidate()
 
 
 # MCP-specific secret mappings
@@ -93,7 +307,18 @@ MCP_SECRET_MAPPINGS = {
 }
 
 
-@lru_cache(maxsize=128)
+def resolve_secret_path(mcp_secret_name: str, use_beepmedia: bool = True) -> str:
+    """Map an MCP secret identifier to its AWS secret path"""
+    secret_key = mcp_secret_name
+    if use_beepmedia and f"{mcp_secret_name}_BEEPMEDIA" in MCP_SECRET_MAPPINGS:
+        secret_key = f"{mcp_secret_name}_BEEPMEDIA"
+    
+    secret_path = MCP_SECRET_MAPPINGS.get(secret_key)
+    if not secret_path:
+        raise ValueError(f"Unknown MCP secret: {mcp_secret_name}")
+    return secret_path
+
+
 def get_mcp_secret(mcp_secret_name: str, use_beepmedia: bool = True) -> Union[str, Dict[str, Any]]:
     """
     Get MCP secret by name
@@ -105,25 +330,47 @@ def get_mcp_secret(mcp_secret_name: str, use_beepmedia: bool = True) -> Union[st
     Returns:
         Secret value
     """
-    manager = SecureSecretsManager()
-    
-    # Determine which secret to use
-    secret_key = mcp_secret_name
-    if use_beepmedia and f"{mcp_secret_name}_BEEPMEDIA" in MCP_SECRET_MAPPINGS:
-        secret_key = f"{mcp_secret_name}_BEEPMEDIA"
+    manager = get_secrets_manager()
+    secret_path = resolve_secret_path(mcp_secret_name, use_beepmedia)
     
-    secret_path = MCP_SECRET_MAPPINGS.get(secret_key)
-    if not secret_path:
-        raise ValueError(f"Unknown MCP secret: {mcp_secret_name}")
+    return _extract_mcp_value(secret_path, manager.get_secret(secret_path))
+
+
+def _extract_mcp_value(secret_path: str, value: Union[str, Dict[str, Any]]) -> Union[str, Dict[str, Any]]:
+    """Handle different secret formats"""
+    if 'credentials' in secret_path and isinstance(value, dict) and 'password' in value:
+        return value['password']  # Return API key from password field
+    return value
+
+
+def get_mcp_secrets(mcp_secret_names: Iterable[str], use_beepmedia: bool = True,
+                    max_workers: int = DEFAULT_FETCH_WORKERS) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Get several MCP secrets in as few round trips as possible
     
-    # Handle different secret formats
-    if 'credentials' in secret_path:
-        creds = manager.get_secret(secret_path)
-        if isinstance(creds, dict) and 'password' in creds:
-            return creds['password']  # Return API key from password field
-        return creds
+    Args:
+        mcp_secret_names: MCP secret identifiers
+        use_beepmedia: Use beepmedia account secrets
+        max_workers: Concurrency used when batch retrieval is unavailable
+        
+    Returns:
+        (values, errors) dicts keyed by MCP secret name
+    """
+    paths, errors = {}, {}
+    for name in mcp_secret_names:
+        try:
+            paths[name] = resolve_secret_path(name, use_beepmedia)
+        except ValueError as e:
+            errors[name] = str(e)
     
-    return manager.get_secret(secret_path)
+    fetched, fetch_errors = get_secrets_manager().get_secrets(paths.values(), max_workers)
+    values = {}
+    for name, path in paths.items():
+        if path in fetched:
+            values[name] = _extract_mcp_value(path, fetched[path])
+        else:
+            errors[name] = fetch_errors.get(path, 'not returned')
+    return values, errors
 
 
 # Environment variable injection for Docker deployments
@@ -150,9 +397,14 @@ def inject_secrets_to_env(secrets_list: list[str], use_beepmedia: bool = True):
             logger.error(f"Failed to inject secret {secret_name}: {str(e)}")
 
 
-# Singleton instance
+# Singleton instance shared by every lookup in this process
 _secrets_manager = SecureSecretsManager()
 
 def get_secrets_manager() -> SecureSecretsManager:
     """Get singleton SecureSecretsManager instance"""
-    return _secrets_manager
\ No newline at end of file
+    return _secrets_manager
+
+
+def invalidate_mcp_secret(mcp_secret_name: str, use_beepmedia: bool = True):
+    """Drop a cached MCP secret, e.g. after a rotation"""
+    get_secrets_manager().invalidate(resolve_secret_path(mcp_secret_name, use_beepmedia))
\ No newline at end of file
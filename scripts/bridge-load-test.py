@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator for the MCP bridge's /mcp/:serverType endpoint
+Opens many concurrent sessions and drives JSON-RPC traffic over the JSON
+(POST + /poll) and SSE response paths
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import aiohttp
+
+from mcp_benchmark import summarize
+from mcp_stdio_client import CLIENT_INFO, DEFAULT_PROTOCOL_VERSION
+
+SCRIPTS_PATH = Path(__file__).resolve().parent
+BRIDGE_SCRIPT = SCRIPTS_PATH.parent / 'mcp-bridge-fixed' / 'server-v2.js'
+FAKE_SERVER = SCRIPTS_PATH / 'fake_mcp_server.py'
+
+
+class BridgeSession:
+    """One logical MCP session against the bridge"""
+
+    def __init__(self, http, base_url, server_type, auth_header, mode, timeout):
+        self.http = http
+        self.url = f"{base_url}/mcp/{server_type}"
+        self.auth_header = auth_header
+        self.mode = mode
+        self.timeout = timeout
+        self.session_id = None
+        self.next_id = 1
+        self.waiters = {}
+        self.sse_streams = []
+        self.sse_tasks = []
+        self.latencies = {}
+        self.errors = []
+        self.open = False
+
+    def _headers(self, sse=False):
+        headers = {'Authorization': self.auth_header, 'Content-Type': 'application/json'}
+        if self.session_id:
+            headers['Mcp-Session-Id'] = self.session_id
+        if sse:
+            headers['Accept'] = 'application/json, text/event-stream'
+        return headers
+
+    def _message(self, method, params=None):
+        message = {'jsonrpc': '2.0', 'id': self.next_id, 'method': method}
+        if params is not None:
+            message['params'] = params
+        self.next_id += 1
+        self.waiters[message['id']] = asyncio.get_running_loop().create_future()
+        return message
+
+    def _dispatch(self, message):
+        waiter = self.waiters.pop(message.get('id'), None)
+        if waiter and not waiter.done():
+            waiter.set_result(message)
+
+    async def _read_sse(self, response):
+        async for raw in response.content:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if line.startswith('data:'):
+                try:
+                    self._dispatch(json.loads(line[5:].strip()))
+                except json.JSONDecodeError:
+                    pass
+
+    async def _poll_until(self, waiter):
+        """Wait for a response, draining /poll while it hasn't arrived"""
+        deadline = time.perf_counter() + self.timeout
+        while not waiter.done():
+            try:
+                return await asyncio.wait_for(asyncio.shield(waiter), 0.05)
+            except asyncio.TimeoutError:
+                pass
+            if time.perf_counter() > deadline:
+                raise asyncio.TimeoutError('no response before timeout')
+            if self.mode == 'json':
+                async with self.http.get(f"{self.url}/poll", headers=self._headers()) as resp:
+                    if resp.status == 200:
+                        for message in (await resp.json()).get('responses', []):
+                            self._dispatch(message)
+        return waiter.result()
+
+    async def _open_stream(self, message):
+        """
+        POST a request whose response comes back as an SSE stream
+
+        The bridge kills the session's process when any of its streams
+        closes, so streams stay open until close().
+        """
+        response = await self.http.post(self.url, json=message, headers=self._headers(sse=True))
+        if response.status != 200:
+            response.close()
+            raise RuntimeError(f"HTTP {response.status} opening SSE stream")
+        self.session_id = response.headers.get('Mcp-Session-Id', self.session_id)
+        self.sse_streams.append(response)
+        self.sse_tasks.append(asyncio.create_task(self._read_sse(response)))
+
+    async def _post(self, message):
+        async with self.http.post(self.url, json=message, headers=self._headers()) as resp:
+            self.session_id = resp.headers.get('Mcp-Session-Id', self.session_id)
+            if resp.status == 200:
+                body = await resp.json()
+                if 'jsonrpc' in body:
+                    self._dispatch(body)
+            elif resp.status != 202:
+                raise RuntimeError(f"HTTP {resp.status}: {await resp.text()}")
+
+    async def initialize(self):
+        """Create the session; returns seconds until the initialize response"""
+        message = self._message('initialize', {
+            'protocolVersion': DEFAULT_PROTOCOL_VERSION,
+            'capabilities': {},
+            'clientInfo': CLIENT_INFO
+        })
+        waiter = self.waiters[message['id']]
+        started = time.perf_counter()
+
+        if self.mode == 'sse':
+            await self._open_stream(message)
+        else:
+            await self._post(message)
+
+        self.open = True
+        await self._poll_until(waiter)
+        elapsed = time.perf_counter() - started
+
+        notification = {'jsonrpc': '2.0', 'method': 'notifications/initialized'}
+        async with self.http.post(self.url, json=notification, headers=self._headers()):
+            pass
+        return elapsed
+
+    async def request(self, method, params=None):
+        message = self._message(method, params)
+        waiter = self.waiters[message['id']]
+        started = time.perf_counter()
+        if self.mode == 'sse':
+            await self._open_stream(message)
+        else:
+            await self._post(message)
+        await self._poll_until(waiter)
+        self.latencies.setdefault(method, []).append(time.perf_counter() - started)
+
+    async def close(self):
+        """Close the SSE streams, which makes the bridge kill the process"""
+        for task in self.sse_tasks:
+            task.cancel()
+        for response in self.sse_streams:
+            response.close()
+        self.open = False
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        credentials = base64.b64encode(f"beepmedia:{args.api_key}".encode()).decode()
+        self.auth_header = f"Basic {credentials}"
+        self.sessions = []
+        self.session_create = {'json': [], 'sse': []}
+        self.health_samples = []
+        self.failures = []
+
+    def live_sessions(self):
+        return sum(1 for session in self.sessions if session.open)
+
+    async def sample_health(self, http, stop):
+        while not stop.is_set():
+            await self.record_health(http)
+            try:
+                await asyncio.wait_for(stop.wait(), self.args.health_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def record_health(self, http):
+        try:
+            async with http.get(f"{self.args.url}/health") as resp:
+                health = await resp.json()
+        except (aiohttp.ClientError, json.JSONDecodeError) as e:
+            self.failures.append(f"health: {e}")
+            return None
+        sample = {
+            't': round(time.perf_counter() - self.started, 3),
+            'reported': health.get('activeSessions', 0),
+            'live': self.live_sessions()
+        }
+        self.health_samples.append(sample)
+        return sample
+
+    async def run_session(self, http, index, mode):
+        session = BridgeSession(http, self.args.url, self.args.server_type, self.auth_header,
+                                mode, self.args.timeout)
+        self.sessions.append(session)
+        try:
+            self.session_create[mode].append(await session.initialize())
+            for i in range(self.args.requests):
+                if i % 2 == 0:
+                    await session.request('tools/list')
+                else:
+                    await session.request('tools/call', {'name': 'echo',
+                                                         'arguments': {'text': f'{index}-{i}'}})
+        except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError) as e:
+            self.failures.append(f"session {index} ({mode}): {e!r}")
+        finally:
+            if mode == 'sse' or self.args.close_json:
+                await session.close()
+
+    async def run(self):
+        modes = ['json', 'sse'] if self.args.mode == 'both' else [self.args.mode]
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.args.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            self.started = time.perf_counter()
+            baseline = await self.record_health(http)
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(self.sample_health(http, stop))
+
+            await asyncio.gather(*(
+                self.run_session(http, i, modes[i % len(modes)])
+                for i in range(self.args.sessions)
+            ))
+            elapsed = time.perf_counter() - self.started
+
+            stop.set()
+            await sampler
+            # Give the bridge a moment to reap processes of closed streams
+            await asyncio.sleep(self.args.settle)
+            final = await self.record_health(http)
+
+        return self.build_report(elapsed, baseline, final)
+
+    def build_report(self, elapsed, baseline, final):
+        latencies = {}
+        for session in self.sessions:
+            for method, values in session.latencies.items():
+                latencies.setdefault(f"{session.mode} {method}", []).extend(values)
+        total_requests = sum(len(v) for v in latencies.values())
+        baseline_count = baseline['reported'] if baseline else 0
+
+        return {
+            'url': self.args.url,
+            'server_type': self.args.server_type,
+            'sessions': self.args.sessions,
+            'requests_per_session': self.args.requests,
+            'duration': round(elapsed, 3),
+            'throughput_rps': round(total_requests / elapsed, 2) if elapsed else None,
+            'session_create_ms': {mode: summarize(v) for mode, v in self.session_create.items() if v},
+            'request_latency_ms': {key: summarize(v) for key, v in sorted(latencies.items())},
+            'health': {
+                'baseline_reported': baseline_count,
+                'peak_reported': max((s['reported'] for s in self.health_samples), default=0),
+                'peak_live': max((s['live'] for s in self.health_samples), default=0),
+                'final_reported': final['reported'] if final else None,
+                'final_live': final['live'] if final else None,
+                # Sessions the bridge still counts that no client holds any more
+                'orphaned': (final['reported'] - baseline_count - final['live']) if final else None
+            },
+            'failures': self.failures
+        }
+
+
+def print_report(report):
+    print(f"\n{'='*60}")
+    print("📊 Bridge Load Test")
+    print(f"{'='*60}")
+    print(f"Sessions: {report['sessions']} x {report['requests_per_session']} requests "
+          f"in {report['duration']}s ({report['throughput_rps']} req/s)")
+    print(f"\n{'Metric':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'n':>6}")
+    print(f"{'-'*60}")
+    rows = [(f"create ({mode})", stats) for mode, stats in report['session_create_ms'].items()]
+    rows += list(report['request_latency_ms'].items())
+    for name, stats in rows:
+        print(f"{name:<28} {stats['p50']:>9} {stats['p95']:>9} {stats['p99']:>9} {stats['samples']:>6}")
+    health = report['health']
+    print(f"\n/health sessions: peak {health['peak_reported']} reported vs {health['peak_live']} live, "
+          f"final {health['final_reported']} reported vs {health['final_live']} live")
+    if health['orphaned']:
+        print(f"⚠️  {health['orphaned']} session(s) still held by the bridge with no client")
+    if report['failures']:
+        print(f"\n❌ {len(report['failures'])} failure(s):")
+        for failure in report['failures'][:10]:
+            print(f"   {failure}")
+
+
+def spawn_bridge(port, api_key):
+    """Start a local bridge wired to the bundled fake MCP server"""
+    env = dict(os.environ, PORT=str(port), MCP_API_KEY=api_key,
+               MCP_FAKE_SERVER=str(FAKE_SERVER), MCP_FAKE_PYTHON=sys.executable)
+    process = subprocess.Popen(['node', str(BRIDGE_SCRIPT)], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # Wait for the listen banner
+    for line in process.stdout:
+        if 'running on port' in line:
+            break
+    else:
+        raise RuntimeError(f"Bridge exited with code {process.wait()} before listening")
+    # Keep reading so the bridge never blocks on a full stdout pipe
+    threading.Thread(target=deque, args=(process.stdout, 0), daemon=True).start()
+    return process
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test the MCP HTTP bridge')
+    parser.add_argument('--url', default='http://localhost:3000', help='Bridge base URL')
+    parser.add_argument('--server-type', default='fake', help='Bridge server type to target')
+    parser.add_argument('--sessions', type=int, default=20, help='Concurrent sessions')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per session after initialize')
+    parser.add_argument('--mode', choices=['json', 'sse', 'both'], default='both',
+                        help='Response path to exercise')
+    parser.add_argument('--api-key', default=os.getenv('MCP_API_KEY', 'test-key'))
+    parser.add_argument('--timeout', type=float, default=15.0, help='Per-request timeout in seconds')
+    parser.add_argument('--health-interval', type=float, default=0.5)
+    parser.add_argument('--settle', type=float, default=1.0,
+                        help='Seconds to wait before the final /health sample')
+    parser.add_argument('--close-json', action='store_true',
+                        help='Count JSON sessions as closed once done (the bridge has no close endpoint)')
+    parser.add_argument('--spawn-bridge', action='store_true',
+                        help='Start a local bridge backed by the fake MCP server')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    bridge = None
+    if args.spawn_bridge:
+        port = args.url.rsplit(':', 1)[-1].rstrip('/')
+        print(f"🚀 Starting local bridge on port {port} with the fake MCP server...")
+        try:
+            bridge = spawn_bridge(port, args.api_key)
+        except RuntimeError as e:
+            sys.exit(f"❌ {e}")
+
+    try:
+        report = asyncio.run(LoadTest(args).run())
+    finally:
+        if bridge:
+            bridge.terminate()
+            bridge.wait()
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nReport saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
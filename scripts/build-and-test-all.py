@@ -4,168 +4,79 @@ Comprehensive MCP Server Build and Test Suite
 Builds Docker images and tests all MCP servers
 """
 
-import subprocess
+import argparse
 import json
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
+from async_runner import AsyncRunner
+from build_manifest import BuildManifest, docker_image_id
+from mcp_benchmark import benchmark_server, find_regressions, load_previous_benchmarks, make_client_factory
+from mcp_probe import ToolCatalog, probe_image
+from mcp_servers import MCP_SERVERS
+from mcp_stdio_client import MCPClientError, docker_command
+
 # Base path
 BASE_PATH = Path('/Users/andreihasna/Missions/beepmedia/mission-mcps')
 REPOS_PATH = BASE_PATH / 'repos'
 DOCKERFILES_PATH = BASE_PATH / 'dockerfiles'
 REPORTS_PATH = BASE_PATH / 'reports'
+MANIFEST_PATH = BASE_PATH / '.build-manifest.json'
+CATALOG_PATH = REPORTS_PATH / 'mcp-catalog.json'
+LOGS_PATH = REPORTS_PATH / 'logs'
+BUILD_TIMEOUT = 600
+
+# Concurrency limits: docker builds are CPU/IO heavy, protocol probes are light
+DEFAULT_BUILD_JOBS = max(1, (os.cpu_count() or 2) // 2)
+DEFAULT_PROBE_JOBS = 8
 
-# MCP Servers configuration
-MCP_SERVERS = {
-    # Python-based servers
-    'mcp-aws': {
-        'path': 'mcp-aws/src/core-mcp-server',
-        'dockerfile': 'Dockerfile',
-        'type': 'python',
-        'env': {'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test', 'AWS_REGION': 'us-east-1'}
-    },
-    'mcp-google-workspace': {
-        'path': 'mcp-google-workspace',
-        'dockerfile': 'Dockerfile',
-        'type': 'python',
-        'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test.json'}
-    },
-    'mcp-google-sheets': {
-        'path': 'mcp-google-sheets',
-        'dockerfile': 'Dockerfile.mcp-google-sheets',
-        'dockerfile_location': 'dockerfiles',
-        'type': 'python',
-        'env': {'GOOGLE_SERVICE_ACCOUNT_JSON': '{}'}
-    },
-    'mcp-pdf-reader': {
-        'path': 'mcp-pdf-reader',
-        'dockerfile': 'Dockerfile',
-        'type': 'python',
-        'env': {}
-    },
-    'mcp-openai': {
-        'path': 'mcp-openai',
-        'dockerfile': 'Dockerfile',
-        'type': 'python',
-        'env': {'OPENAI_API_KEY': 'sk-test-123'}
-    },
-    
-    # Node.js-based servers
-    'mcp-notion': {
-        'path': 'mcp-notion',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'NOTION_API_KEY': 'secret_test_123'}
-    },
-    'mcp-gdrive': {
-        'path': 'mcp-gdrive',
-        'dockerfile': 'Dockerfile.mcp-gdrive',
-        'dockerfile_location': 'dockerfiles',
-        'type': 'node',
-        'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test.json'}
-    },
-    'mcp-cloudflare': {
-        'path': 'mcp-cloudflare',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'CLOUDFLARE_API_TOKEN': 'test_token'}
-    },
-    'mcp-stripe': {
-        'path': 'mcp-stripe',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'STRIPE_API_KEY': 'sk_test_123'}
-    },
-    'mcp-paypal': {
-        'path': 'mcp-paypal',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'PAYPAL_ACCESS_TOKEN': 'test_token'}
-    },
-    'mcp-shopify': {
-        'path': 'mcp-shopify',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'SHOPIFY_API_KEY': 'test_key'}
-    },
-    'mcp-firecrawl': {
-        'path': 'mcp-firecrawl',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'FIRECRAWL_API_KEY': 'test_key'}
-    },
-    'mcp-elevenlabs': {
-        'path': 'mcp-elevenlabs',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'ELEVENLABS_API_KEY': 'test_key'}
-    },
-    'mcp-docker': {
-        'path': 'mcp-docker',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {}
-    },
-    'mcp-redis': {
-        'path': 'mcp-redis',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'REDIS_URL': 'redis://localhost:6379'}
-    },
-    'mcp-alchemy': {
-        'path': 'mcp-alchemy',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {'ALCHEMY_API_KEY': 'test_key'}
-    },
-    
-    # Go-based servers
-    'mcp-slack': {
-        'path': 'mcp-slack',
-        'dockerfile': 'Dockerfile',
-        'type': 'go',
-        'env': {'SLACK_BOT_TOKEN': 'xoxb-test', 'SLACK_APP_TOKEN': 'xapp-test'}
-    },
-    
-    # Official servers collection
-    'mcp-filesystem': {
-        'path': 'mcp-servers-official/src/filesystem',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {}
-    },
-    'mcp-screenshot': {
-        'path': 'mcp-servers-official/src/screenshot',
-        'dockerfile': 'Dockerfile',
-        'type': 'node',
-        'env': {}
-    }
-}
 
 class MCPServerTester:
-    def __init__(self):
+    def __init__(self, build_jobs=DEFAULT_BUILD_JOBS, probe_jobs=DEFAULT_PROBE_JOBS, use_cache=True,
+                 benchmark=False, reuse_catalog=False, build_timeout=BUILD_TIMEOUT):
         self.results = {}
         self.start_time = datetime.now()
-        
-    def run_command(self, cmd, cwd=None, timeout=30):
-        """Run shell command with timeout"""
-        try:
-            result = subprocess.run(
-                cmd, 
-                shell=True, 
-                cwd=cwd,
-                capture_output=True, 
-                text=True,
-                timeout=timeout
-            )
-            return result.returncode == 0, result.stdout, result.stderr
-        except subprocess.TimeoutExpired:
-            return False, "", "Command timed out"
-        except Exception as e:
-            return False, "", str(e)
+        self.build_jobs = max(1, build_jobs)
+        self.probe_jobs = max(1, probe_jobs)
+        self.use_cache = use_cache
+        self.manifest = BuildManifest(MANIFEST_PATH)
+        self.cache_hits = set()
+        self.probe_details = {}
+        self.catalog = ToolCatalog(CATALOG_PATH)
+        self.reuse_catalog = reuse_catalog
+        self.benchmark = benchmark
+        self.benchmarks = {}
+        self.build_timeout = build_timeout
+        self.build_logs = {}
+        # Streams command output to per-server logs and kills overrunning commands
+        self.runner = AsyncRunner(LOGS_PATH)
+        
+        # Separate slots so light probes never queue behind heavy builds
+        self._build_slots = threading.BoundedSemaphore(self.build_jobs)
+        self._probe_slots = threading.BoundedSemaphore(self.probe_jobs)
+        self._results_lock = threading.Lock()
+        self._print_lock = threading.Lock()
+    
+    def log(self, message):
+        """Print a message without interleaving output from worker threads"""
+        with self._print_lock:
+            print(message, flush=True)
+        
+    def run_command(self, cmd, cwd=None, timeout=30, log_name=None, container_name=None):
+        """
+        Run a command (argv list) with a hard timeout
+        
+        Output is streamed to reports/logs/<log_name>.log; only the last
+        lines are kept in memory and returned as stdout/stderr.
+        """
+        result = self.runner.run(cmd, cwd=cwd, timeout=timeout, log_name=log_name,
+                                 container_name=container_name)
+        return result.ok, result.stdout, result.stderr
     
     def check_dockerfile_exists(self, server_name, config):
         """Check if Dockerfile exists and create if needed"""
@@ -178,7 +89,7 @@ class MCPServerTester:
             dockerfile_path = repo_path / config['dockerfile']
         
         if not dockerfile_path.exists():
-            print(f"⚠️  No Dockerfile found for {server_name}, creating one...")
+            self.log(f"⚠️  No Dockerfile found for {server_name}, creating one...")
             self.create_dockerfile(server_name, config, dockerfile_path)
         
         return dockerfile_path
@@ -226,123 +137,218 @@ CMD ["/bin/bash"]
         
         dockerfile_path.parent.mkdir(parents=True, exist_ok=True)
         dockerfile_path.write_text(content)
-        print(f"✅ Created Dockerfile for {server_name}")
+        self.log(f"✅ Created Dockerfile for {server_name}")
     
     def build_docker_image(self, server_name, config):
-        """Build Docker image for MCP server"""
-        print(f"\n📦 Building {server_name}...")
-        
+        """Build Docker image for MCP server, skipping unchanged ones"""
         repo_path = REPOS_PATH / config['path']
         dockerfile_path = self.check_dockerfile_exists(server_name, config)
+        tag = f"{server_name}:test"
+        build_args = config.get('build_args', {})
+        
+        fingerprint = self.manifest.fingerprint(tag, repo_path, dockerfile_path, build_args)
+        if self.use_cache and self.manifest.is_fresh(tag, fingerprint):
+            self.log(f"⚡ {server_name} unchanged, reusing {tag}")
+            with self._results_lock:
+                self.cache_hits.add(server_name)
+            return True
+        
+        self.log(f"📦 Building {server_name}...")
         
         # Build command
-        build_cmd = f"docker build -t {server_name}:test -f {dockerfile_path} {repo_path}"
+        build_cmd = ['docker', 'build', '-t', tag]
+        for key, value in build_args.items():
+            build_cmd += ['--build-arg', f'{key}={value}']
+        build_cmd += ['-f', str(dockerfile_path), str(repo_path)]
         
-        success, stdout, stderr = self.run_command(build_cmd, timeout=300)
+        log_name = f'{server_name}-build'
+        success, stdout, stderr = self.run_command(build_cmd, timeout=self.build_timeout, log_name=log_name)
+        with self._results_lock:
+            self.build_logs[server_name] = str(self.runner.log_path(log_name))
         
         if success:
-            print(f"✅ Successfully built {server_name}")
+            self.manifest.record(tag, fingerprint)
+            self.log(f"✅ Successfully built {server_name}")
             # Try to get image size
-            size_cmd = f"docker images {server_name}:test --format '{{{{.Size}}}}'"
+            size_cmd = ['docker', 'images', tag, '--format', '{{.Size}}']
             _, size_out, _ = self.run_command(size_cmd)
             if size_out:
-                print(f"   Image size: {size_out.strip()}")
+                self.log(f"   Image size: {size_out.strip()}")
         else:
-            print(f"❌ Failed to build {server_name}")
+            self.manifest.forget(tag)
+            self.log(f"❌ Failed to build {server_name}")
             if stderr:
-                print(f"   Error: {stderr[:200]}...")
+                # Build errors are at the end of the output
+                self.log(f"   Error: ...{stderr[-300:]}")
+            self.log(f"   Full log: {self.build_logs[server_name]}")
         
         return success
     
     def test_mcp_protocol(self, server_name, config):
-        """Test MCP server protocol"""
-        print(f"🧪 Testing {server_name} MCP protocol...")
-        
-        # Create environment string
-        env_vars = ' '.join([f'-e {k}={v}' for k, v in config['env'].items()])
-        
-        # Test initialization command
-        init_cmd = json.dumps({
-            "jsonrpc": "2.0",
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "1.0.0",
-                "capabilities": {},
-                "clientInfo": {
-                    "name": "test-client",
-                    "version": "1.0.0"
-                }
-            },
-            "id": 1
-        })
-        
-        # Run test
-        run_cmd = f"echo '{init_cmd}' | docker run -i --rm {env_vars} {server_name}:test"
-        success, stdout, stderr = self.run_command(run_cmd, timeout=10)
+        """Handshake and discover tools/resources/prompts in one container session"""
+        tag = f"{server_name}:test"
+        image_id = docker_image_id(tag)
+        
+        # An unchanged image that already passed needs no relaunch
+        if self.reuse_catalog and image_id and self.catalog.get(server_name, image_id):
+            entry = self.catalog.get(server_name, image_id)
+            self.log(f"📇 {server_name} unchanged, using catalog ({len(entry['tools'])} tools)")
+            with self._results_lock:
+                self.probe_details[server_name] = {'tools': len(entry['tools']), 'from_catalog': True}
+            return True
+        
+        self.log(f"🧪 Testing {server_name} MCP protocol...")
+        container = f"mcp-test-{server_name}-{os.getpid()}"
+        with self.runner.container(container):
+            probe = probe_image(tag, config['env'], container_name=container)
+        
+        with self._results_lock:
+            self.probe_details[server_name] = {
+                'tools': len(probe.get('tools', [])),
+                'resources': len(probe.get('resources', [])),
+                'prompts': len(probe.get('prompts', [])),
+                'latency': probe['latency']
+            }
         
         # Check if we got a valid response
-        if stdout:
-            try:
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip().startswith('{'):
-                        response = json.loads(line)
-                        if 'result' in response or 'error' in response:
-                            print(f"✅ {server_name} MCP protocol test passed")
-                            return True
-            except:
-                pass
+        if probe['initialized']:
+            self.catalog.update(server_name, image_id, probe)
+            self.log(f"✅ {server_name} MCP protocol test passed ({len(probe['tools'])} tools)")
+            return True
+        if probe['responded']:
+            self.log(f"✅ {server_name} MCP protocol test passed (initialize returned an error)")
+            return True
         
         # Even if we get an error response, it means the server is running
+        stderr = '\n'.join(probe.get('stderr_tail', []))
         if stderr and 'error' in stderr.lower():
-            print(f"⚠️  {server_name} responded with error (server is running)")
+            self.log(f"⚠️  {server_name} responded with error (server is running)")
             return True
         
-        print(f"❌ {server_name} MCP protocol test failed")
+        self.log(f"❌ {server_name} MCP protocol test failed")
         return False
     
+    def benchmark_mcp_server(self, server_name, config):
+        """Measure cold start, tools/list latency and throughput for one server"""
+        self.log(f"⏱️  Benchmarking {server_name}...")
+        
+        tag = f"{server_name}:test"
+        container = f"mcp-bench-{server_name}-{os.getpid()}"
+        make_client = make_client_factory(docker_command(tag, config['env'], name=container),
+                                          container_name=container)
+        
+        def factory():
+            # Each cold start launches a new container; stop once interrupted
+            if self.runner.cancelled:
+                raise MCPClientError('cancelled')
+            return make_client()
+        
+        with self.runner.container(container):
+            result = benchmark_server(factory)
+        result['image_id'] = docker_image_id(tag)
+        
+        cold = result['cold_start_ms'].get('p50')
+        rps = result.get('throughput', {}).get('rps')
+        self.log(f"   {server_name}: cold start p50 {cold}ms, throughput {rps} req/s")
+        with self._results_lock:
+            self.benchmarks[server_name] = result
+    
     def test_server(self, server_name, config):
         """Test individual MCP server"""
-        print(f"\n{'='*60}")
-        print(f"Testing {server_name}")
-        print(f"Type: {config['type']}")
-        print(f"Path: {config['path']}")
+        self.log(f"▶️  {server_name} ({config['type']}, {config['path']})")
+        started = time.monotonic()
         
-        # Build Docker image
-        build_success = self.build_docker_image(server_name, config)
+        # Build Docker image (bounded by the build slots)
+        with self._build_slots:
+            build_success = self.build_docker_image(server_name, config)
         
-        # Test MCP protocol if build succeeded
+        # Test MCP protocol if build succeeded (bounded by the probe slots)
         protocol_success = False
-        if build_success:
-            protocol_success = self.test_mcp_protocol(server_name, config)
+        if build_success and not self.runner.cancelled:
+            with self._probe_slots:
+                protocol_success = self.test_mcp_protocol(server_name, config)
         
-        # Store results
-        self.results[server_name] = {
+        return {
             'type': config['type'],
             'build': build_success,
             'protocol': protocol_success,
-            'status': 'Passed' if build_success and protocol_success else 'Failed'
+            'status': 'Passed' if build_success and protocol_success else 'Failed',
+            'cached': server_name in self.cache_hits,
+            'probe': self.probe_details.get(server_name, {}),
+            'build_log': self.build_logs.get(server_name),
+            'duration': round(time.monotonic() - started, 2)
         }
     
-    def run_all_tests(self):
-        """Run tests for all MCP servers"""
-        print("🚀 MCP Server Build and Test Suite")
-        print(f"Testing {len(MCP_SERVERS)} servers...")
-        print(f"Started at: {self.start_time}")
-        
-        # Test each server
-        for server_name, config in MCP_SERVERS.items():
+    def run_benchmarks(self):
+        """Benchmark every server whose protocol test passed"""
+        passed = sorted(name for name, result in self.results.items() if result.get('protocol'))
+        for server_name in passed:
+            if self.runner.cancelled:
+                break
             try:
-                self.test_server(server_name, config)
+                self.benchmark_mcp_server(server_name, MCP_SERVERS[server_name])
             except Exception as e:
-                print(f"❌ Error testing {server_name}: {str(e)}")
-                self.results[server_name] = {
-                    'type': config['type'],
-                    'build': False,
-                    'protocol': False,
-                    'status': 'Error',
-                    'error': str(e)
-                }
+                self.log(f"❌ Error benchmarking {server_name}: {str(e)}")
+    
+    def record_result(self, server_name, result):
+        """Store a finished server result and stream it to the console"""
+        with self._results_lock:
+            self.results[server_name] = result
+            done = len(self.results)
+        
+        icon = '✅' if result['status'] == 'Passed' else '❌'
+        self.log(f"{icon} [{done}/{len(MCP_SERVERS)}] {server_name}: {result['status']} "
+                 f"({result.get('duration', 0):.1f}s)")
+    
+    def run_all_tests(self):
+        """Run tests for all MCP servers"""
+        self.log("🚀 MCP Server Build and Test Suite")
+        self.log(f"Testing {len(MCP_SERVERS)} servers...")
+        self.log(f"Concurrency: {self.build_jobs} builds, {self.probe_jobs} probes")
+        self.log(f"Started at: {self.start_time}")
+        
+        # Every server gets a worker; the build/probe slots do the real limiting
+        workers = min(len(MCP_SERVERS), self.build_jobs + self.probe_jobs)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {
+                executor.submit(self.test_server, server_name, config): server_name
+                for server_name, config in MCP_SERVERS.items()
+            }
+            
+            for future in as_completed(futures):
+                server_name = futures[future]
+                config = MCP_SERVERS[server_name]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.log(f"❌ Error testing {server_name}: {str(e)}")
+                    result = {
+                        'type': config['type'],
+                        'build': False,
+                        'protocol': False,
+                        'status': 'Error',
+                        'error': str(e)
+                    }
+                self.record_result(server_name, result)
+            
+            # Benchmarks run one at a time once every build and probe is done,
+            # so nothing else competes for the CPU while they measure
+            if self.benchmark:
+                executor.shutdown()
+                self.run_benchmarks()
+        except KeyboardInterrupt:
+            self.log("🛑 Interrupted, stopping running builds and containers...")
+            killed = self.runner.cancel_all()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.log(f"   Stopped {killed} running command(s) and container(s)")
+            # Keep the fingerprints of builds that did finish
+            self.manifest.save()
+            sys.exit(130)
+        executor.shutdown()
+        
+        self.manifest.save()
+        self.catalog.save()
         
         # Generate report
         self.generate_report()
@@ -376,19 +382,27 @@ CMD ["/bin/bash"]
         
         print(f"{'-'*80}")
         print(f"Total: {passed}/{len(self.results)} passed")
+        print(f"Cache hits: {len(self.cache_hits)} (builds skipped)")
         print(f"Duration: {duration:.2f} seconds")
         print(f"\nBy type: Python: {by_type['python']}, Node.js: {by_type['node']}, Go: {by_type['go']}")
         
+        report_name = f'test-report-{self.start_time.strftime("%Y%m%d-%H%M%S")}'
+        
         # Save detailed report
         report = {
             'timestamp': self.start_time.isoformat(),
             'duration': duration,
             'total_servers': len(self.results),
             'passed': passed,
+            'cache_hits': sorted(self.cache_hits),
             'results': self.results
         }
         
-        report_file = REPORTS_PATH / f'test-report-{self.start_time.strftime("%Y%m%d-%H%M%S")}.json'
+        if self.benchmarks:
+            report['benchmark'] = self.benchmarks
+            report['benchmark_regressions'] = self.check_regressions(f'{report_name}.json')
+        
+        report_file = REPORTS_PATH / f'{report_name}.json'
         with open(report_file, 'w') as f:
             json.dump(report, f, indent=2)
         
@@ -397,6 +411,24 @@ CMD ["/bin/bash"]
         # Create markdown report
         self.create_markdown_report(report)
     
+    def check_regressions(self, report_filename):
+        """Compare this run's benchmarks against the last report that had any"""
+        previous, previous_file = load_previous_benchmarks(REPORTS_PATH, exclude=report_filename)
+        regressions = {}
+        for server, result in sorted(self.benchmarks.items()):
+            found = find_regressions(result, previous.get(server))
+            if found:
+                regressions[server] = found
+        
+        if previous_file:
+            print(f"\nBenchmark baseline: {previous_file}")
+            for server, found in regressions.items():
+                for item in found:
+                    print(f"⚠️  Regression in {server}: {item}")
+            if not regressions:
+                print("No benchmark regressions detected")
+        return regressions
+    
     def create_markdown_report(self, report):
         """Create a markdown report"""
         md_content = f"""# MCP Server Test Report
@@ -405,6 +437,7 @@ CMD ["/bin/bash"]
 **Duration**: {report['duration']:.2f} seconds  
 **Total Servers**: {report['total_servers']}  
 **Passed**: {report['passed']}  
+**Cache Hits**: {len(report.get('cache_hits', []))}  
 
 ## Test Results
 
@@ -417,6 +450,19 @@ CMD ["/bin/bash"]
             protocol = '✅' if result['protocol'] else '❌'
             md_content += f"| {server} | {result['type']} | {build} | {protocol} | {result['status']} |\n"
         
+        if report.get('benchmark'):
+            md_content += "\n## Benchmarks\n\n"
+            md_content += "| Server | Cold start p50/p95/p99 (ms) | tools/list p50/p95/p99 (ms) | Throughput (req/s) |\n"
+            md_content += "|--------|-----------------------------|-----------------------------|--------------------|\n"
+            for server, bench in sorted(report['benchmark'].items()):
+                cold = bench.get('cold_start_ms', {})
+                tools = bench.get('tools_list_ms', {})
+                rps = bench.get('throughput', {}).get('rps', '-')
+                md_content += (f"| {server} | {cold.get('p50', '-')} / {cold.get('p95', '-')} / {cold.get('p99', '-')} "
+                               f"| {tools.get('p50', '-')} / {tools.get('p95', '-')} / {tools.get('p99', '-')} | {rps} |\n")
+            for server, found in sorted(report.get('benchmark_regressions', {}).items()):
+                md_content += f"\n**Regression in {server}**: {'; '.join(found)}\n"
+        
         md_content += "\n## Next Steps\n\n"
         md_content += "1. Fix any failing builds\n"
         md_content += "2. Update Dockerfiles for servers without them\n"
@@ -427,10 +473,31 @@ CMD ["/bin/bash"]
         md_file.write_text(md_content)
         print(f"Markdown report saved to: {md_file}")
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='Build and test all MCP servers')
+    parser.add_argument('--build-jobs', type=int, default=DEFAULT_BUILD_JOBS,
+                        help=f'Concurrent docker builds (default: {DEFAULT_BUILD_JOBS})')
+    parser.add_argument('--probe-jobs', type=int, default=DEFAULT_PROBE_JOBS,
+                        help=f'Concurrent protocol probes (default: {DEFAULT_PROBE_JOBS})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Rebuild every image even if its inputs are unchanged')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Measure cold start, tools/list latency and throughput per server')
+    parser.add_argument('--build-timeout', type=int, default=BUILD_TIMEOUT,
+                        help=f'Seconds before a docker build is killed (default: {BUILD_TIMEOUT})')
+    parser.add_argument('--reuse-catalog', action='store_true',
+                        help='Skip the protocol probe for images already in the tool catalog')
+    return parser.parse_args()
+
 if __name__ == '__main__':
+    args = parse_args()
+    
     # Create reports directory if it doesn't exist
     REPORTS_PATH.mkdir(exist_ok=True)
     
     # Run tests
-    tester = MCPServerTester()
+    tester = MCPServerTester(build_jobs=args.build_jobs, probe_jobs=args.probe_jobs,
+                             use_cache=not args.no_cache, benchmark=args.benchmark,
+                             reuse_catalog=args.reuse_catalog, build_timeout=args.build_timeout)
     tester.run_all_tests()
\ No newline at end of file
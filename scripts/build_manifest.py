@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Incremental build manifest for MCP server images
+Fingerprints each build context so unchanged servers can skip docker build
+"""
+
+import functools
+import hashlib
+import json
+import os
+import posixpath
+import re
+import subprocess
+import threading
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+# Directories that never influence an image but are expensive to walk
+ALWAYS_SKIP = {'.git', '.hg', '.svn', '__pycache__'}
+
+
+def docker_image_id(tag):
+    """Return the local image ID for a tag, or None if it does not exist"""
+    try:
+        result = subprocess.run(
+            ['docker', 'image', 'inspect', '--format', '{{.Id}}', tag],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip() or None
+
+
+def load_dockerignore(context_path):
+    """Load .dockerignore as a list of (pattern, negated) in file order"""
+    ignore_file = Path(context_path) / '.dockerignore'
+    if not ignore_file.exists():
+        return []
+
+    patterns = []
+    for line in ignore_file.read_text(errors='replace').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:].strip()
+        pattern = posixpath.normpath(line).lstrip('/')
+        if pattern and pattern != '.':
+            patterns.append((pattern, negated))
+    return patterns
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_pattern(pattern):
+    """
+    Regex for a .dockerignore pattern
+
+    Follows Go's filepath.Match as docker does: * and ? never match a
+    slash, only ** crosses directories.
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex += '(?:.*/)?'
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex += '.*'
+            i += 2
+            continue
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        elif char == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('^'):
+                    # Negated classes must not match a separator either
+                    body = '^/' + body[1:]
+                regex += f"[{body}]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile(regex + r'\Z')
+
+
+def is_ignored(rel_path, patterns):
+    """
+    Check a context-relative path against .dockerignore patterns
+
+    A pattern matches a path or any of its parent directories, and the last
+    matching pattern wins, so a later !pattern re-includes what an earlier
+    one excluded.
+    """
+    parts = rel_path.split('/')
+    candidates = ['/'.join(parts[:end]) for end in range(1, len(parts) + 1)]
+    ignored = False
+    for pattern, negated in patterns:
+        regex = _compile_pattern(pattern)
+        if any(regex.match(candidate) for candidate in candidates):
+            ignored = not negated
+    return ignored
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Persistent record of the fingerprint each image was last built from
+
+    File digests are memoised per image by (mtime_ns, size), so re-walking a
+    large unchanged context only costs a stat() per file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.images = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, json.JSONDecodeError):
+            # A corrupt manifest only costs one full rebuild
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.images = data.get('images', {})
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            payload = json.dumps({'version': MANIFEST_VERSION, 'images': self.images}, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, self.path)
+
+    def _walk_context(self, context_path):
+        """Yield (relative path, DirEntry) for every file docker would send"""
+        patterns = load_dockerignore(context_path)
+        # A re-include may reach inside an ignored directory, so walk it anyway
+        prune = not any(negated for _, negated in patterns)
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                entries = list(os.scandir(os.path.join(context_path, rel_dir)))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.name in ALWAYS_SKIP:
+                    continue
+                ignored = is_ignored(rel_path, patterns)
+                if entry.is_dir(follow_symlinks=False):
+                    if not (ignored and prune):
+                        stack.append(rel_path)
+                elif entry.is_file(follow_symlinks=False) and not ignored:
+                    yield rel_path, entry
+
+    def fingerprint(self, tag, context_path, dockerfile_path, build_args=None):
+        """
+        Compute the fingerprint of an image's inputs
+
+        Args:
+            tag: Image tag the fingerprint belongs to
+            context_path: Docker build context directory
+            dockerfile_path: Dockerfile used for the build
+            build_args: Optional dict of --build-arg values
+
+        Returns:
+            Hex digest covering the context files, Dockerfile and build args
+        """
+        with self._lock:
+            previous = dict(self.images.get(tag, {}).get('files', {}))
+
+        files = {}
+        for rel_path, entry in self._walk_context(str(context_path)):
+            stat = entry.stat(follow_symlinks=False)
+            cached = previous.get(rel_path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                digest = cached[2]
+            else:
+                digest = hash_file(entry.path)
+            files[rel_path] = [stat.st_mtime_ns, stat.st_size, digest, stat.st_mode & 0o111]
+
+        combined = hashlib.sha256()
+        for rel_path in sorted(files):
+            _, _, digest, exec_bits = files[rel_path]
+            combined.update(f"{rel_path}\0{digest}\0{exec_bits}\n".encode())
+        combined.update(b"dockerfile\0" + hash_file(dockerfile_path).encode())
+        for key, value in sorted((build_args or {}).items()):
+            combined.update(f"arg\0{key}={value}\n".encode())
+        fingerprint = combined.hexdigest()
+
+        with self._lock:
+            entry = self.images.setdefault(tag, {})
+            entry['files'] = files
+        return fingerprint
+
+    def is_fresh(self, tag, fingerprint):
+        """True if the tag was built from this fingerprint and still exists"""
+        with self._lock:
+            entry = self.images.get(tag, {})
+            recorded_fp = entry.get('fingerprint')
+            recorded_id = entry.get('image_id')
+        if not recorded_fp or recorded_fp != fingerprint:
+            return False
+        return recorded_id is not None and docker_image_id(tag) == recorded_id
+
+    def record(self, tag, fingerprint):
+        """Remember the fingerprint and image ID of a successful build"""
+        image_id = docker_image_id(tag)
+        with self._lock:
+            entry = self.images.setdefault(tag, {})
+            entry['fingerprint'] = fingerprint
+            entry['image_id'] = image_id
+            entry['built_at'] = datetime.now().isoformat()
+
+    def forget(self, tag):
+        """Drop the recorded build for a tag so it is rebuilt next time"""
+        with self._lock:
+            entry = self.images.get(tag)
+            if entry:
+                entry.pop('fingerprint', None)
+                entry.pop('image_id', None)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Minimal stdio MCP server for exercising the harness offline
+Speaks line-delimited JSON-RPC and answers the common MCP methods
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PROTOCOL_VERSION = '2024-11-05'
+
+
+def build_tools(count):
+    """Generate a deterministic tool list"""
+    tools = [
+        {
+            'name': 'echo',
+            'description': 'Echo the given text back',
+            'inputSchema': {
+                'type': 'object',
+                'properties': {'text': {'type': 'string'}},
+                'required': ['text']
+            }
+        },
+        {
+            'name': 'sleep',
+            'description': 'Sleep for the given number of milliseconds',
+            'inputSchema': {
+                'type': 'object',
+                'properties': {'ms': {'type': 'integer'}}
+            }
+        }
+    ]
+    for i in range(max(0, count - len(tools))):
+        tools.append({
+            'name': f'noop_{i}',
+            'description': f'No-op tool #{i}',
+            'inputSchema': {'type': 'object', 'properties': {}}
+        })
+    return tools
+
+
+class FakeMCPServer:
+    def __init__(self, tool_count=2, delay_ms=0, ignore=()):
+        self.tools = build_tools(tool_count)
+        self.delay = delay_ms / 1000.0
+        self.ignore = set(ignore)
+        self.initialized = False
+        self.calls = 0
+
+    def handle(self, message):
+        """Return the response for a request, or None for notifications"""
+        method = message.get('method')
+        if 'id' not in message:
+            if method == 'notifications/initialized':
+                self.initialized = True
+            return None
+        if method in self.ignore:
+            return None
+
+        if self.delay:
+            time.sleep(self.delay)
+
+        params = message.get('params') or {}
+        if method == 'initialize':
+            result = {
+                'protocolVersion': params.get('protocolVersion', PROTOCOL_VERSION),
+                'capabilities': {'tools': {}, 'resources': {}, 'prompts': {}},
+                'serverInfo': {'name': 'fake-mcp-server', 'version': '1.0.0'}
+            }
+        elif method == 'ping':
+            # Lets tests tell which process answered
+            result = {'pid': os.getpid()}
+        elif method == 'tools/list':
+            result = {'tools': self.tools}
+        elif method == 'resources/list':
+            result = {'resources': [{'uri': 'fake://readme', 'name': 'README', 'mimeType': 'text/plain'}]}
+        elif method == 'prompts/list':
+            result = {'prompts': [{'name': 'greet', 'description': 'Say hello'}]}
+        elif method == 'tools/call':
+            self.calls += 1
+            name = params.get('name')
+            arguments = params.get('arguments') or {}
+            if name == 'echo':
+                text = str(arguments.get('text', ''))
+            elif name == 'sleep':
+                time.sleep(int(arguments.get('ms', 0)) / 1000.0)
+                text = 'ok'
+            elif any(tool['name'] == name for tool in self.tools):
+                text = ''
+            else:
+                return error_response(message['id'], -32602, f'Unknown tool: {name}')
+            result = {'content': [{'type': 'text', 'text': text}], 'isError': False}
+        else:
+            return error_response(message['id'], -32601, f'Method not found: {method}')
+
+        return {'jsonrpc': '2.0', 'id': message['id'], 'result': result}
+
+
+def error_response(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake stdio MCP server')
+    parser.add_argument('--tools', type=int, default=2, help='Number of tools to advertise')
+    parser.add_argument('--delay-ms', type=int, default=0, help='Delay before every response')
+    parser.add_argument('--startup-ms', type=int, default=0, help='Simulated cold-start delay')
+    parser.add_argument('--ignore', action='append', default=[], metavar='METHOD',
+                        help='Never answer requests for this method (repeatable)')
+    parser.add_argument('--reverse-batch', type=int, default=0, metavar='N',
+                        help='Hold replies (except initialize) until N are ready, then send them newest first')
+    args = parser.parse_args()
+
+    if args.startup_ms:
+        time.sleep(args.startup_ms / 1000.0)
+
+    server = FakeMCPServer(tool_count=args.tools, delay_ms=args.delay_ms, ignore=args.ignore)
+    held = []
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            message, response = {}, error_response(None, -32700, 'Parse error')
+        else:
+            response = server.handle(message)
+        if response is None:
+            continue
+        held.append(response)
+        if args.reverse_batch and message.get('method') != 'initialize' and len(held) < args.reverse_batch:
+            continue
+        for reply in reversed(held):
+            sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+        held = []
+
+
+if __name__ == '__main__':
+    main()
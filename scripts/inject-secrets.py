@@ -4,10 +4,17 @@ Inject secrets from AWS Secrets Manager into files for Docker containers
 This runs as an init container to prepare secrets before MCP servers start
 """
 
+import argparse
 import os
 import json
+import random
+import signal
 import sys
-from aws_secrets_manager import get_mcp_secret, MCP_SECRET_MAPPINGS
+import tempfile
+import threading
+from aws_secrets_manager import (
+    get_mcp_secrets, get_secrets_manager, resolve_secret_path, DEFAULT_FETCH_WORKERS
+)
 
 # Define which secrets each MCP server needs
 MCP_SERVER_SECRETS = {
@@ -27,25 +34,52 @@ MCP_SERVER_SECRETS = {
     'perplexity': ['PERPLEXITY_API_KEY']
 }
 
-def inject_secrets():
-    """Fetch secrets from AWS and write to shared volume"""
-    use_beepmedia = os.getenv('USE_BEEPMEDIA_ACCOUNT', 'true').lower() == 'true'
-    secrets_dir = '/secrets'
+def read_secret_file(path):
+    """Load an existing secrets file, or None if missing or unreadable"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def write_secret_file(path, data):
+    """
+    Atomically write a secrets file if its contents changed
     
-    # Create secrets directory
-    os.makedirs(secrets_dir, exist_ok=True)
+    The data goes to a temp file in the same directory which then
+    replaces the target, so readers never see a half-written file.
     
-    # Collect all unique secrets needed
-    all_secrets = set()
-    for server_secrets in MCP_SERVER_SECRETS.values():
-        all_secrets.update(server_secrets)
+    Returns:
+        True if the file was (re)written, False if it was already current
+    """
+    if read_secret_file(path) == data:
+        return False
+    
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)  # Restrict access
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return True
+
+def fetch_secrets(secret_names, use_beepmedia):
+    """Fetch secrets, returning (values, errors) keyed by secret name"""
+    # Fetch all secrets in one batch (or a bounded pool), failures stay per secret
+    max_workers = int(os.getenv('SECRETS_FETCH_WORKERS', DEFAULT_FETCH_WORKERS))
+    print(f"Fetching {len(secret_names)} secrets...")
+    fetched, errors = get_mcp_secrets(sorted(secret_names), use_beepmedia, max_workers)
     
-    # Fetch and store secrets
     secrets_data = {}
-    for secret_name in all_secrets:
-        try:
-            print(f"Fetching secret: {secret_name}")
-            value = get_mcp_secret(secret_name, use_beepmedia)
+    for secret_name in sorted(secret_names):
+        if secret_name in fetched:
+            value = fetched[secret_name]
             
             # Handle different secret types
             if isinstance(value, dict):
@@ -54,32 +88,148 @@ def inject_secrets():
                 secrets_data[secret_name] = str(value)
                 
             print(f"✓ Retrieved {secret_name}")
-            
-        except Exception as e:
-            print(f"✗ Failed to retrieve {secret_name}: {str(e)}", file=sys.stderr)
+        else:
+            print(f"✗ Failed to retrieve {secret_name}: {errors.get(secret_name)}", file=sys.stderr)
             # Continue with other secrets
     
-    # Write secrets to files for each server
+    return secrets_data, errors
+
+def write_secret_files(secrets_dir, secrets_data, failed=()):
+    """
+    Write per-server secrets files plus all-secrets.json, only where changed
+    
+    Secrets that failed to fetch this time keep the value already on
+    disk, so a transient error never wipes a working credential.
+    
+    Returns:
+        Sorted list of servers whose secrets file changed
+    """
+    previous = read_secret_file(os.path.join(secrets_dir, 'all-secrets.json')) or {}
+    combined = dict(secrets_data)
+    for secret in failed:
+        if secret in previous:
+            combined[secret] = previous[secret]
+    
+    changed = []
     for server, required_secrets in MCP_SERVER_SECRETS.items():
-        server_secrets = {}
-        for secret in required_secrets:
-            if secret in secrets_data:
-                server_secrets[secret] = secrets_data[secret]
+        server_secrets = {secret: combined[secret] for secret in required_secrets if secret in combined}
         
         # Write server-specific secrets file
         secrets_file = os.path.join(secrets_dir, f'{server}.json')
-        with open(secrets_file, 'w') as f:
-            json.dump(server_secrets, f)
-        os.chmod(secrets_file, 0o600)  # Restrict access
-        print(f"Created secrets file for {server}")
+        if write_secret_file(secrets_file, server_secrets):
+            changed.append(server)
+            print(f"Updated secrets file for {server}")
     
     # Also write a combined secrets file
-    combined_file = os.path.join(secrets_dir, 'all-secrets.json')
-    with open(combined_file, 'w') as f:
-        json.dump(secrets_data, f)
-    os.chmod(combined_file, 0o600)
+    write_secret_file(os.path.join(secrets_dir, 'all-secrets.json'), combined)
+    return sorted(changed)
+
+def required_secrets():
+    """Collect all unique secrets needed"""
+    all_secrets = set()
+    for server_secrets in MCP_SERVER_SECRETS.values():
+        all_secrets.update(server_secrets)
+    return all_secrets
+
+def inject_secrets():
+    """Fetch secrets from AWS and write to shared volume"""
+    use_beepmedia = os.getenv('USE_BEEPMEDIA_ACCOUNT', 'true').lower() == 'true'
+    secrets_dir = os.getenv('SECRETS_DIR', '/secrets')
+    
+    # Create secrets directory
+    os.makedirs(secrets_dir, exist_ok=True)
+    
+    secrets_data, errors = fetch_secrets(required_secrets(), use_beepmedia)
+    changed = write_secret_files(secrets_dir, secrets_data, failed=errors.keys())
     
+    if changed:
+        print(f"Changed servers: {', '.join(changed)}")
+    else:
+        print("No secrets changed")
     print("Secret injection completed successfully")
+    return changed
+
+def secret_versions(secret_paths):
+    """Current version ID per AWS secret path (metadata only, no values)"""
+    return get_secrets_manager().get_secret_versions(secret_paths.values())
+
+def watch_secrets(interval, max_backoff, stop):
+    """
+    Keep /secrets current as secrets rotate
+    
+    Each poll reads only version metadata; values are re-fetched just for
+    secrets whose AWSCURRENT version changed, and only the affected
+    server files are rewritten.
+    """
+    use_beepmedia = os.getenv('USE_BEEPMEDIA_ACCOUNT', 'true').lower() == 'true'
+    secrets_dir = os.getenv('SECRETS_DIR', '/secrets')
+    os.makedirs(secrets_dir, exist_ok=True)
+    
+    secret_paths = {}
+    for name in required_secrets():
+        try:
+            secret_paths[name] = resolve_secret_path(name, use_beepmedia)
+        except ValueError as e:
+            print(f"✗ {e}", file=sys.stderr)
+    
+    # Record versions before reading values so a rotation in between is caught next poll
+    known_versions = secret_versions(secret_paths)
+    secrets_data, errors = fetch_secrets(required_secrets(), use_beepmedia)
+    write_secret_files(secrets_dir, secrets_data, failed=errors.keys())
+    print(f"Watching {len(secret_paths)} secrets for rotation every ~{interval}s")
+    
+    failures = 0
+    while True:
+        # Jittered interval, doubling on consecutive failures
+        delay = min(interval * (2 ** failures), max_backoff)
+        if stop.wait(delay * random.uniform(0.8, 1.2)):
+            break
+        
+        try:
+            versions = secret_versions(secret_paths)
+        except Exception as e:
+            failures += 1
+            print(f"✗ Version check failed ({e}), backing off", file=sys.stderr)
+            continue
+        failures = 0
+        
+        rotated = [name for name, path in secret_paths.items()
+                   if versions.get(path) and versions[path] != known_versions.get(path)]
+        # Retry secrets that exist but have never been fetched successfully
+        rotated += [name for name, path in secret_paths.items()
+                    if name not in secrets_data and name not in rotated and versions.get(path)]
+        if not rotated:
+            continue
+        
+        for name in rotated:
+            get_secrets_manager().invalidate(secret_paths[name])
+        fetched, errors = fetch_secrets(rotated, use_beepmedia)
+        secrets_data.update(fetched)
+        for name in fetched:
+            known_versions[secret_paths[name]] = versions.get(secret_paths[name])
+        
+        changed = write_secret_files(secrets_dir, secrets_data, failed=errors.keys())
+        if changed:
+            print(f"Rotated secrets for: {', '.join(changed)}")
+    
+    print("Secret watcher stopped")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Inject MCP secrets into /secrets')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and rewrite files when secrets rotate')
+    parser.add_argument('--interval', type=float, default=float(os.getenv('SECRETS_POLL_INTERVAL', 300)),
+                        help='Seconds between version checks in watch mode')
+    parser.add_argument('--max-backoff', type=float, default=float(os.getenv('SECRETS_POLL_MAX_BACKOFF', 3600)),
+                        help='Upper bound for the retry delay after failed checks')
+    return parser.parse_args()
 
 if __name__ == '__main__':
-    inject_secrets()
\ No newline at end of file
+    args = parse_args()
+    if args.watch:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        watch_secrets(args.interval, args.max_backoff, stop)
+    else:
+        inject_secrets()
\ No newline at end of file
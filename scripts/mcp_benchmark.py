@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Latency and throughput benchmarks for stdio MCP servers
+Measures cold start, tools/list latency and sustained request throughput
+"""
+
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_stdio_client import MCPStdioClient, MCPClientError
+
+# Fixed workload so results from different runs are comparable
+BENCHMARK_PARAMS = {
+    'cold_starts': 3,
+    'tools_list_iterations': 20,
+    'throughput_requests': 200,
+    'throughput_concurrency': 8
+}
+
+# A metric must be this much worse than the previous run to count as a regression
+REGRESSION_THRESHOLD = 0.25
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return ordered[int(rank)]
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(seconds):
+    """p50/p95/p99 summary of latencies given in seconds, reported in ms"""
+    if not seconds:
+        return {'samples': 0}
+    ms = [s * 1000 for s in seconds]
+    return {
+        'samples': len(ms),
+        'p50': round(percentile(ms, 50), 2),
+        'p95': round(percentile(ms, 95), 2),
+        'p99': round(percentile(ms, 99), 2),
+        'min': round(min(ms), 2),
+        'max': round(max(ms), 2)
+    }
+
+
+def measure_cold_start(make_client):
+    """Seconds from process launch to the first initialize response"""
+    client = make_client()
+    try:
+        client.start()
+        response = client.initialize()
+        if 'result' not in response:
+            raise MCPClientError(f"initialize failed: {response.get('error')}")
+        return client.ready_at - client.started_at
+    finally:
+        client.close()
+
+
+def benchmark_server(make_client, params=None):
+    """
+    Benchmark one MCP server
+
+    Args:
+        make_client: Callable returning a fresh, unstarted MCPStdioClient
+        params: Workload overrides (defaults to BENCHMARK_PARAMS)
+
+    Returns:
+        Dict of cold_start_ms, tools_list_ms and throughput results
+    """
+    params = {**BENCHMARK_PARAMS, **(params or {})}
+    results = {'params': params, 'errors': []}
+
+    cold_starts = []
+    for _ in range(params['cold_starts']):
+        try:
+            cold_starts.append(measure_cold_start(make_client))
+        except MCPClientError as e:
+            results['errors'].append(f"cold start: {e}")
+    results['cold_start_ms'] = summarize(cold_starts)
+
+    client = make_client()
+    try:
+        client.start()
+        if 'result' not in client.initialize():
+            results['errors'].append('initialize failed, skipping session benchmarks')
+            return results
+
+        list_latencies = []
+        for _ in range(params['tools_list_iterations']):
+            started = time.perf_counter()
+            client.request('tools/list')
+            list_latencies.append(time.perf_counter() - started)
+        results['tools_list_ms'] = summarize(list_latencies)
+
+        # Pipelined load over the same session
+        def timed_request(_):
+            started = time.perf_counter()
+            client.request('tools/list', timeout=30)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=params['throughput_concurrency']) as executor:
+            latencies = list(executor.map(timed_request, range(params['throughput_requests'])))
+        elapsed = time.perf_counter() - started
+        results['throughput'] = {
+            'requests': len(latencies),
+            'concurrency': params['throughput_concurrency'],
+            'seconds': round(elapsed, 3),
+            'rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+            'latency_ms': summarize(latencies)
+        }
+    except MCPClientError as e:
+        results['errors'].append(f"session: {e}")
+    finally:
+        client.close()
+
+    return results
+
+
+def find_regressions(current, previous, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two benchmark results for the same server
+
+    Only runs with identical workload params are compared. Latency
+    percentiles regress when they grow, throughput when it shrinks.
+
+    Returns:
+        List of human-readable regression descriptions
+    """
+    if not previous or current.get('params') != previous.get('params'):
+        return []
+
+    regressions = []
+    for metric in ('cold_start_ms', 'tools_list_ms'):
+        for pct in ('p50', 'p95', 'p99'):
+            new = current.get(metric, {}).get(pct)
+            old = previous.get(metric, {}).get(pct)
+            if new and old and new > old * (1 + threshold):
+                regressions.append(f"{metric} {pct}: {old}ms -> {new}ms")
+
+    new_rps = current.get('throughput', {}).get('rps')
+    old_rps = previous.get('throughput', {}).get('rps')
+    if new_rps and old_rps and new_rps < old_rps * (1 - threshold):
+        regressions.append(f"throughput: {old_rps} -> {new_rps} req/s")
+    return regressions
+
+
+def load_previous_benchmarks(reports_path, exclude=None):
+    """Return the benchmark section of the most recent report that has one"""
+    for report_file in sorted(reports_path.glob('test-report-*.json'), reverse=True):
+        if exclude and report_file.name == exclude:
+            continue
+        try:
+            report = json.loads(report_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            continue
+        if report.get('benchmark'):
+            return report['benchmark'], report_file.name
+    return {}, None
+
+
+def make_client_factory(command, container_name=None, timeout=30):
+    """Factory producing fresh clients for the same server command"""
+    def factory():
+        return MCPStdioClient(command, timeout=timeout, container_name=container_name)
+    return factory
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Caching stdio proxy for MCP servers
+Sits between a client and one stdio server and answers idempotent methods
+(tools/list, prompts/list, resources/list, resources/templates/list and
+allowlisted read-only tools/call) from an LRU cache with a TTL. Everything
+else passes through unchanged. Hit/miss and bytes-saved counters are
+logged to stderr on exit and on SIGUSR1.
+
+The cache lives as long as the proxy process. Started per session it only
+helps repeats within that session; to share it across sessions (the new
+session re-listing tools, prompts and resources), run it as the upstream
+of mcp_multiplexer.py, which keeps one server for every client:
+
+    python mcp_multiplexer.py serve --socket /tmp/mcp-notion.sock --cache -- docker run -i --rm mcp-notion:latest
+
+    # any command
+    python mcp_cache_proxy.py --cache-tool search=60 -- docker run -i --rm mcp-notion:latest
+
+    # an MCP_SERVERS entry, with its cache_tools allowlist
+    python mcp_cache_proxy.py --server mcp-notion
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+from collections import OrderedDict
+
+from mcp_multiplexer import LINE_LIMIT, encode, error_response
+from mcp_servers import IMAGE_TAG, MCP_SERVERS, image_for
+from mcp_stdio_client import docker_command
+
+DEFAULT_TTL = 300
+DEFAULT_TOOL_TTL = 30
+DEFAULT_MAX_ENTRIES = 512
+
+# Methods whose result depends only on their params
+LIST_METHODS = ('tools/list', 'prompts/list', 'resources/list', 'resources/templates/list')
+
+# list_changed notifications and the cached methods they make stale
+INVALIDATED_BY = {
+    'notifications/tools/list_changed': ('tools/list',),
+    'notifications/prompts/list_changed': ('prompts/list',),
+    'notifications/resources/list_changed': ('resources/list', 'resources/templates/list')
+}
+
+
+def log(message):
+    print(f"[mcp-cache] {message}", file=sys.stderr, flush=True)
+
+
+class LRUCache:
+    """Bounded mapping of key -> (expiry, value); the least recently used entry goes first"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() >= expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, methods):
+        for key in [key for key in self._entries if key[0] in methods]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CachingProxy:
+    """
+    Relays one client's stdio to one upstream server, caching idempotent results
+
+    Cache keys are the method plus its params (minus _meta), so paginated
+    lists are cached per cursor and tool calls per argument set. Identical
+    requests that arrive while the first is in flight wait for its
+    response; if the client cancels that first request, the next waiter
+    is sent upstream in its place. Only successful results are stored; a tool result with
+    isError is not. A tools/call outside the allowlist may write, so it
+    drops every cached tool result, and results still in flight at that
+    point are passed on but not stored.
+    """
+
+    def __init__(self, command, cache_tools=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.command = command
+        self.cache_tools = dict(cache_tools or {})
+        self.ttl = ttl
+        self.cache = LRUCache(max_entries)
+        self.process = None
+        self.pending = {}
+        self.inflight = {}
+        self.generation = 0
+        self.stats = {}
+
+    def _count(self, method, outcome, size=0):
+        stats = self.stats.setdefault(method, {'hits': 0, 'misses': 0, 'bytes_saved': 0})
+        stats[outcome] += 1
+        stats['bytes_saved'] += size
+
+    def cache_key(self, message):
+        """(method, canonical params) for a cacheable request, else None"""
+        method = message.get('method')
+        params = message.get('params') or {}
+        if not isinstance(params, dict):
+            return None
+        params = {key: value for key, value in params.items() if key != '_meta'}
+        if method == 'tools/call' and params.get('name') not in self.cache_tools:
+            return None
+        if method != 'tools/call' and method not in LIST_METHODS:
+            return None
+        return method, json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+    def ttl_for(self, key):
+        if key[0] == 'tools/call':
+            return self.cache_tools[json.loads(key[1])['name']]
+        return self.ttl
+
+    def invalidate(self, methods):
+        # Results already in flight may predate the change; don't store them
+        self.generation += 1
+        self.cache.invalidate(methods)
+
+    def send_client(self, message):
+        data = encode(message)
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return len(data)
+
+    async def send_upstream(self, line):
+        self.process.stdin.write(line)
+        await self.process.stdin.drain()
+
+    async def cancel(self, request_id):
+        """
+        Handle the client cancelling a cacheable request
+
+        Returns:
+            True if the cancellation concerned only the proxy and must not
+            be forwarded (a waiter the server never saw)
+        """
+        for entry in self.inflight.values():
+            if request_id in entry['waiters']:
+                entry['waiters'].remove(request_id)
+                return True
+        pending = self.pending.pop(request_id, None)
+        if pending is None:
+            return False
+        key = pending[0]
+        entry = self.inflight.pop(key)
+        if entry['waiters']:
+            # A compliant server never answers the cancelled request
+            leader = entry['waiters'].pop(0)
+            self.inflight[key] = {'request': entry['request'], 'waiters': entry['waiters']}
+            self.pending[leader] = (key, self.generation)
+            self._count(key[0], 'misses')
+            await self.send_upstream(encode({**entry['request'], 'id': leader}))
+        return False
+
+    def fail_inflight(self, reason):
+        """Answer the cacheable requests still waiting on the server with an error"""
+        for request_id in list(self.pending):
+            key = self.pending.pop(request_id)[0]
+            entry = self.inflight.pop(key, {'waiters': []})
+            for waiter in [request_id, *entry['waiters']]:
+                self.send_client(error_response(waiter, -32000, reason))
+
+    async def from_client(self, line):
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            await self.send_upstream(line)
+            return
+        if (isinstance(message, dict) and message.get('method') == 'notifications/cancelled'
+                and 'id' not in message):
+            request_id = (message.get('params') or {}).get('requestId')
+            if await self.cancel(request_id):
+                return
+        if not (isinstance(message, dict) and 'id' in message and 'method' in message):
+            await self.send_upstream(line)
+            return
+
+        key = self.cache_key(message)
+        if key is None:
+            if message['method'] == 'tools/call':
+                self.invalidate(('tools/call',))
+            await self.send_upstream(line)
+            return
+
+        result = self.cache.get(key)
+        if result is not None:
+            size = self.send_client({'jsonrpc': '2.0', 'id': message['id'], 'result': result})
+            self._count(key[0], 'hits', size)
+            return
+        if key in self.inflight:
+            # Answered along with the identical request already upstream
+            self.inflight[key]['waiters'].append(message['id'])
+            return
+        self._count(key[0], 'misses')
+        self.inflight[key] = {'request': message, 'waiters': []}
+        self.pending[message['id']] = (key, self.generation)
+        await self.send_upstream(line)
+
+    def from_upstream(self, line):
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            # Not protocol traffic; pass it on as the server wrote it
+            sys.stdout.buffer.write(line)
+            sys.stdout.buffer.flush()
+            return
+        if not isinstance(message, dict):
+            self.send_client(message)
+            return
+        if message.get('method') in INVALIDATED_BY:
+            self.invalidate(INVALIDATED_BY[message['method']])
+
+        pending = self.pending.pop(message.get('id'), None) if 'method' not in message else None
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+        if pending is None:
+            return
+
+        key, generation = pending
+        waiters = self.inflight.pop(key, {'waiters': []})['waiters']
+        result = message.get('result')
+        if (result is not None and generation == self.generation
+                and not (isinstance(result, dict) and result.get('isError'))):
+            self.cache.set(key, result, self.ttl_for(key))
+        for request_id in waiters:
+            self._count(key[0], 'hits', self.send_client({**message, 'id': request_id}))
+
+    def report(self):
+        hits = sum(stats['hits'] for stats in self.stats.values())
+        misses = sum(stats['misses'] for stats in self.stats.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'bytes_saved': sum(stats['bytes_saved'] for stats in self.stats.values()),
+            'entries': len(self.cache),
+            'methods': self.stats
+        }
+
+    async def run(self):
+        """Relay until the client closes stdin and the server exits; returns the server's exit code"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT
+        )
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGUSR1, lambda: log(f"stats: {json.dumps(self.report())}"))
+        stdin = asyncio.StreamReader(limit=LINE_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdin), sys.stdin)
+
+        async def client_side():
+            try:
+                while True:
+                    line = await stdin.readline()
+                    if not line:
+                        break
+                    await self.from_client(line)
+                self.process.stdin.close()
+            except (ConnectionError, BrokenPipeError):
+                pass
+
+        async def upstream_side():
+            while True:
+                try:
+                    line = await self.process.stdout.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    continue
+                if not line:
+                    break
+                self.from_upstream(line)
+
+        reader = asyncio.ensure_future(client_side())
+        await upstream_side()
+        reader.cancel()
+        self.fail_inflight('Upstream server exited')
+        return await self.process.wait()
+
+
+def parse_cache_tools(specs, default_ttl=DEFAULT_TOOL_TTL):
+    """['search=60', 'describe'] -> {'search': 60, 'describe': default_ttl}"""
+    tools = {}
+    for spec in specs:
+        name, _, ttl = spec.partition('=')
+        tools[name] = int(ttl) if ttl else default_ttl
+    return tools
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cache idempotent MCP methods in front of a stdio server')
+    parser.add_argument('--server', help='MCP_SERVERS entry to run (uses its cache_tools allowlist)')
+    parser.add_argument('--tag', default=IMAGE_TAG, help=f'Image tag for --server (default: {IMAGE_TAG})')
+    parser.add_argument('--cache-tool', action='append', default=[], metavar='NAME[=TTL]',
+                        help=f'Read-only tool whose calls may be cached (repeatable; default TTL {DEFAULT_TOOL_TTL}s)')
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL,
+                        help=f'TTL for list methods in seconds (default: {DEFAULT_TTL})')
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f'Cache size (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--stats-file', help='Write the counters here as JSON on exit')
+    parser.add_argument('command', nargs=argparse.REMAINDER, help='Server command (after --)')
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    cache_tools = {}
+    if args.server:
+        if args.server not in MCP_SERVERS:
+            parser.error(f'unknown server {args.server}')
+        config = MCP_SERVERS[args.server]
+        command = command or docker_command(image_for(args.server, args.tag), config.get('env'))
+        cache_tools.update(config.get('cache_tools', {}))
+    if not command:
+        parser.error('give a server command after -- or --server')
+    cache_tools.update(parse_cache_tools(args.cache_tool))
+
+    proxy = CachingProxy(command, cache_tools, args.ttl, args.max_entries)
+    try:
+        returncode = asyncio.run(proxy.run())
+    except KeyboardInterrupt:
+        returncode = 130
+    report = proxy.report()
+    log(f"stats: {json.dumps(report)}")
+    if args.stats_file:
+        with open(args.stats_file, 'w') as f:
+            json.dump(report, f, indent=2)
+    sys.exit(returncode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Stdio MCP multiplexer
+Fronts one long-lived stdio MCP server and lets many logical clients share
+it over a Unix socket. Request ids are rewritten so every response (and
+progress notification) goes back to the client that asked; the upstream
+server is initialized once and later initialize requests are answered
+from that result.
+
+    # sidecar in front of one server
+    python mcp_multiplexer.py serve --socket /tmp/mcp-notion.sock -- docker run -i --rm mcp-notion:latest
+
+    # with mcp_cache_proxy.py as the upstream, so every session shares its cache
+    python mcp_multiplexer.py serve --socket /tmp/mcp-notion.sock --cache --cache-tool API-post-search=60 \
+        -- docker run -i --rm mcp-notion:latest
+
+    # one logical client: stdio <-> socket (what the bridge spawns per session)
+    python mcp_multiplexer.py connect --socket /tmp/mcp-notion.sock
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+# tools/list and friends can be large single lines
+LINE_LIMIT = 16 * 1024 * 1024
+CACHE_PROXY = Path(__file__).resolve().parent / 'mcp_cache_proxy.py'
+
+
+def log(message):
+    print(f"[mcp-mux] {message}", file=sys.stderr, flush=True)
+
+
+def encode(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+def error_response(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+class MuxClient:
+    """One logical client connection"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, writer):
+        self.id = next(self._ids)
+        self.writer = writer
+        self.pending = set()
+        self.connected_at = time.monotonic()
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(encode(message))
+
+
+class Multiplexer:
+    """
+    Routes many clients onto one upstream stdio server
+
+    Upstream ids are a single counter; each maps back to (client, original
+    id). Progress tokens are rewritten the same way. Upstream notifications
+    without a routing key are broadcast. Server-to-client requests
+    (sampling, roots) are refused, since no single client owns them.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.clients = {}
+        self.routes = {}
+        self.progress_routes = {}
+        self._upstream_ids = itertools.count(1)
+        self._write_lock = asyncio.Lock()
+        self._start_lock = asyncio.Lock()
+        self.init_result = None
+        self.init_future = None
+        self.init_upstream_id = None
+        self.stats = {'clients': 0, 'requests': 0, 'initialize_cached': 0, 'upstream_starts': 0}
+
+    async def ensure_upstream(self):
+        """Start the upstream server if it is not running"""
+        async with self._start_lock:
+            if self.process and self.process.returncode is None:
+                return
+            self.process = await asyncio.create_subprocess_exec(
+                *self.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=LINE_LIMIT
+            )
+            self.stats['upstream_starts'] += 1
+            self.init_result = None
+            self.init_future = None
+            self.init_upstream_id = None
+            log(f"started upstream pid {self.process.pid}: {' '.join(self.command)}")
+            asyncio.ensure_future(self._read_upstream(self.process))
+
+    async def _write_upstream(self, message):
+        async with self._write_lock:
+            self.process.stdin.write(encode(message))
+            await self.process.stdin.drain()
+
+    async def _read_upstream(self, process):
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                log('dropped an oversized upstream line')
+                continue
+            if not line:
+                break
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # Servers that log to stdout interleave non-protocol lines
+                continue
+            if isinstance(message, dict):
+                await self._dispatch_upstream(message)
+        await process.wait()
+        log(f"upstream exited with {process.returncode}")
+        self._upstream_gone()
+
+    async def _dispatch_upstream(self, message):
+        if 'method' in message:
+            if 'id' in message:
+                await self._write_upstream(error_response(
+                    message['id'], -32601, 'Server-initiated requests are not supported through the multiplexer'))
+                return
+            params = message.get('params') or {}
+            token = params.get('progressToken')
+            if message['method'] == 'notifications/progress' and token in self.progress_routes:
+                client, original = self.progress_routes[token]
+                client.send({**message, 'params': {**params, 'progressToken': original}})
+                return
+            for client in list(self.clients.values()):
+                client.send(message)
+            return
+
+        route = self.routes.pop(message.get('id'), None)
+        if route is None:
+            return
+        client, original_id, method = route
+        self.progress_routes.pop(f"mux-{message['id']}", None)
+        if method == 'initialize':
+            await self._finish_initialize(message)
+        if client is not None:
+            client.pending.discard(message['id'])
+            client.send({**message, 'id': original_id})
+
+    async def _finish_initialize(self, message):
+        self.init_upstream_id = None
+        if 'result' in message:
+            self.init_result = message['result']
+            # Completes the upstream handshake; clients' own copies are dropped
+            await self._write_upstream({'jsonrpc': '2.0', 'method': 'notifications/initialized'})
+        if self.init_future and not self.init_future.done():
+            self.init_future.set_result(message)
+        if 'result' not in message:
+            # Let the next client try its own initialize
+            self.init_future = None
+
+    def _upstream_gone(self):
+        """Fail everything in flight; clients must reconnect to a fresh server"""
+        for upstream_id, (client, original_id, _) in list(self.routes.items()):
+            if client is not None:
+                client.send(error_response(original_id, -32000, 'Upstream server exited'))
+        self.routes.clear()
+        self.progress_routes.clear()
+        if self.init_future and not self.init_future.done():
+            self.init_future.set_result(error_response(None, -32000, 'Upstream server exited'))
+        for client in list(self.clients.values()):
+            client.writer.close()
+
+    async def _forward(self, client, message):
+        """Rewrite a client request's id (and progress token) and send it upstream"""
+        upstream_id = next(self._upstream_ids)
+        self.routes[upstream_id] = (client, message['id'], message.get('method'))
+        client.pending.add(upstream_id)
+
+        params = message.get('params')
+        meta = params.get('_meta') if isinstance(params, dict) else None
+        if isinstance(meta, dict) and 'progressToken' in meta:
+            token = f"mux-{upstream_id}"
+            self.progress_routes[token] = (client, meta['progressToken'])
+            params = {**params, '_meta': {**meta, 'progressToken': token}}
+            message = {**message, 'params': params}
+
+        self.stats['requests'] += 1
+        await self._write_upstream({**message, 'id': upstream_id})
+        return upstream_id
+
+    async def _initialize(self, client, message):
+        """Run initialize upstream once; everyone else gets the cached result"""
+        if self.init_result is not None:
+            self.stats['initialize_cached'] += 1
+            client.send({'jsonrpc': '2.0', 'id': message['id'], 'result': self.init_result})
+            return
+        if self.init_future is not None:
+            # Another client's initialize is in flight
+            response = await self.init_future
+            if 'result' in response:
+                self.stats['initialize_cached'] += 1
+                client.send({'jsonrpc': '2.0', 'id': message['id'], 'result': response['result']})
+            else:
+                client.send({**response, 'id': message['id']})
+            return
+        self.init_future = asyncio.get_running_loop().create_future()
+        self.init_upstream_id = await self._forward(client, message)
+
+    async def handle_message(self, client, message):
+        method = message.get('method')
+        if 'id' not in message:
+            if method == 'notifications/initialized':
+                # Sent upstream once by _finish_initialize
+                return
+            if method == 'notifications/cancelled':
+                params = message.get('params') or {}
+                for upstream_id in client.pending:
+                    if upstream_id == self.init_upstream_id:
+                        continue
+                    if self.routes.get(upstream_id, (None, None))[1] == params.get('requestId'):
+                        await self._write_upstream({**message, 'params': {**params, 'requestId': upstream_id}})
+                        break
+                return
+            await self._write_upstream(message)
+            return
+        if method is None:
+            # A response to a server-initiated request; those are refused above
+            return
+        if method == 'initialize':
+            await self._initialize(client, message)
+            return
+        await self._forward(client, message)
+
+    async def handle_client(self, reader, writer):
+        await self.ensure_upstream()
+        client = MuxClient(writer)
+        self.clients[client.id] = client
+        self.stats['clients'] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    client.send(error_response(None, -32700, 'Parse error'))
+                    continue
+                for item in message if isinstance(message, list) else [message]:
+                    if isinstance(item, dict):
+                        await self.handle_message(client, item)
+                await writer.drain()
+        except (ConnectionError, BrokenPipeError):
+            pass
+        finally:
+            await self._drop_client(client)
+
+    async def _drop_client(self, client):
+        self.clients.pop(client.id, None)
+        for upstream_id in list(client.pending):
+            if upstream_id == self.init_upstream_id:
+                # Other clients are waiting on this handshake, and initialize
+                # must not be cancelled; keep the route without a client
+                self.routes[upstream_id] = (None, *self.routes[upstream_id][1:])
+                continue
+            # Tell the server to stop work nobody will read
+            self.routes.pop(upstream_id, None)
+            if self.process and self.process.returncode is None:
+                try:
+                    await self._write_upstream({'jsonrpc': '2.0', 'method': 'notifications/cancelled',
+                                                'params': {'requestId': upstream_id,
+                                                           'reason': 'client disconnected'}})
+                except (ConnectionError, BrokenPipeError):
+                    pass
+        for token, (owner, _) in list(self.progress_routes.items()):
+            if owner is client:
+                del self.progress_routes[token]
+        client.writer.close()
+
+    async def close(self):
+        if self.process and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        log(f"stats: {json.dumps(self.stats)}")
+
+
+def cached_command(command, cache_tools=()):
+    """Run a server command behind mcp_cache_proxy.py"""
+    return [sys.executable, str(CACHE_PROXY), *(f'--cache-tool={tool}' for tool in cache_tools), '--', *command]
+
+
+async def serve(socket_path, command):
+    mux = Multiplexer(command)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(mux.handle_client, path=socket_path, limit=LINE_LIMIT)
+    os.chmod(socket_path, 0o600)
+    await mux.ensure_upstream()
+    log(f"listening on {socket_path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    server.close()
+    await mux.close()
+    os.unlink(socket_path)
+
+
+async def open_connection(socket_path, wait=0):
+    """Connect to the socket, retrying for up to `wait` seconds while the multiplexer starts"""
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            return await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def connect(socket_path, wait=0, header=None):
+    """Relay this process's stdin/stdout to the multiplexer socket (after an optional header line)"""
+    reader, writer = await open_connection(socket_path, wait)
+    if header is not None:
+        writer.write(encode(header))
+    loop = asyncio.get_running_loop()
+    stdin = asyncio.StreamReader(limit=LINE_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stdin), sys.stdin)
+
+    async def upstream():
+        while True:
+            line = await stdin.readline()
+            if not line:
+                break
+            writer.write(line)
+            await writer.drain()
+        writer.write_eof()
+
+    async def downstream():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            sys.stdout.buffer.write(line)
+            sys.stdout.buffer.flush()
+
+    # The session ends when the multiplexer closes our connection
+    sender = asyncio.ensure_future(upstream())
+    await downstream()
+    sender.cancel()
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Share one stdio MCP server between many clients')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    serve_parser = sub.add_parser('serve', help='Run the multiplexer in front of a server command')
+    serve_parser.add_argument('--socket', required=True, help='Unix socket path to listen on')
+    serve_parser.add_argument('--cache', action='store_true',
+                              help='Put mcp_cache_proxy.py in front of the server, shared by every client')
+    serve_parser.add_argument('--cache-tool', action='append', default=[], metavar='NAME[=TTL]',
+                              help='With --cache, a read-only tool whose calls may be cached (repeatable)')
+    serve_parser.add_argument('command', nargs=argparse.REMAINDER, help='Server command (after --)')
+    connect_parser = sub.add_parser('connect', help='Relay stdio to a running multiplexer')
+    connect_parser.add_argument('--socket', required=True, help='Unix socket path to connect to')
+    connect_parser.add_argument('--wait', type=float, default=0,
+                                help='Seconds to keep retrying while the multiplexer starts')
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        command = args.command[1:] if args.command[:1] == ['--'] else args.command
+        if not command:
+            parser.error('serve needs a server command after --')
+        if args.cache:
+            command = cached_command(command, args.cache_tool)
+        asyncio.run(serve(args.socket, command))
+    else:
+        try:
+            asyncio.run(connect(args.socket, args.wait))
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            log(f"cannot connect to {args.socket}: {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
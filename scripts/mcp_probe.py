@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Single-session MCP capability probe and tool catalog
+Runs the full handshake plus tools/resources/prompts discovery in one
+session per image and caches what it finds in a machine-readable catalog
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from mcp_stdio_client import MCPStdioClient, MCPClientError, docker_command
+
+CATALOG_VERSION = 1
+
+# Capability queries sent after the handshake, keyed by the list field they return
+DISCOVERY_METHODS = {
+    'tools/list': 'tools',
+    'resources/list': 'resources',
+    'prompts/list': 'prompts'
+}
+
+MAX_PAGES = 20
+
+
+def probe_session(client):
+    """
+    Run the handshake and capability discovery over a started client
+
+    Returns:
+        Dict with handshake status, server info and the discovered
+        tools, resources and prompts
+    """
+    probe = {
+        'initialized': False,
+        'responded': False,
+        'server_info': None,
+        'protocol_version': None,
+        'capabilities': {},
+        'tools': [],
+        'resources': [],
+        'prompts': [],
+        'errors': {}
+    }
+
+    init = client.initialize()
+    probe['responded'] = 'result' in init or 'error' in init
+    if 'result' not in init:
+        probe['errors']['initialize'] = init.get('error')
+        return probe
+
+    result = init['result']
+    probe['initialized'] = True
+    probe['server_info'] = result.get('serverInfo')
+    probe['protocol_version'] = result.get('protocolVersion')
+    probe['capabilities'] = result.get('capabilities', {})
+
+    # All discovery queries go out together; follow cursors afterwards.
+    # A method that times out or fails is recorded on its own, so the
+    # handshake and whatever else was discovered are kept.
+    handles = {}
+    for method in DISCOVERY_METHODS:
+        try:
+            handles[method] = client.send_request(method)
+        except MCPClientError as e:
+            probe['errors'][method] = str(e)
+    for method, handle in handles.items():
+        field = DISCOVERY_METHODS[method]
+        pages = 1
+        try:
+            response = client.wait_response(handle)
+            while True:
+                if 'error' in response:
+                    probe['errors'][method] = response['error']
+                    break
+                page = response.get('result', {})
+                probe[field].extend(page.get(field, []))
+                cursor = page.get('nextCursor')
+                if not cursor or pages >= MAX_PAGES:
+                    break
+                response = client.request(method, {'cursor': cursor})
+                pages += 1
+        except MCPClientError as e:
+            probe['errors'][method] = str(e)
+
+    return probe
+
+
+def probe_image(image, env=None, container_name=None, timeout=15):
+    """Probe a docker image in a single container session"""
+    client = MCPStdioClient(
+        docker_command(image, env, name=container_name),
+        timeout=timeout,
+        container_name=container_name
+    )
+    probe = {'responded': False, 'initialized': False, 'errors': {}}
+    try:
+        with client:
+            probe = probe_session(client)
+    except MCPClientError as e:
+        probe['errors']['session'] = str(e)
+    probe['latency'] = client.latency_summary()
+    probe['stderr_tail'] = list(client.stderr_tail)[-5:]
+    return probe
+
+
+class ToolCatalog:
+    """
+    Persistent catalog of what each MCP server image exposes
+
+    Entries are keyed by server name and tagged with the image ID they
+    were probed from, so a rebuilt image never serves a stale entry.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.servers = {}
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text())
+                if data.get('version') == CATALOG_VERSION:
+                    self.servers = data.get('servers', {})
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    def get(self, server_name, image_id=None):
+        """Return the catalog entry, or None if missing or from another image"""
+        with self._lock:
+            entry = self.servers.get(server_name)
+        if not entry or (image_id and entry.get('image_id') != image_id):
+            return None
+        return entry
+
+    def update(self, server_name, image_id, probe):
+        """Record a successful probe"""
+        entry = {
+            'image_id': image_id,
+            'probed_at': datetime.now().isoformat(),
+            'server_info': probe.get('server_info'),
+            'protocol_version': probe.get('protocol_version'),
+            'capabilities': probe.get('capabilities', {}),
+            'tools': probe.get('tools', []),
+            'resources': probe.get('resources', []),
+            'prompts': probe.get('prompts', [])
+        }
+        with self._lock:
+            self.servers[server_name] = entry
+        return entry
+
+    def save(self):
+        """Write the catalog atomically"""
+        with self._lock:
+            payload = json.dumps({
+                'version': CATALOG_VERSION,
+                'generated_at': datetime.now().isoformat(),
+                'servers': self.servers
+            }, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp_path.write_text(payload)
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show the cached MCP tool catalog')
+    parser.add_argument('catalog', help='Path to mcp-catalog.json')
+    parser.add_argument('--server', help='Only show this server')
+    parser.add_argument('--json', action='store_true', help='Print raw JSON')
+    args = parser.parse_args()
+
+    catalog = ToolCatalog(args.catalog)
+    servers = {k: v for k, v in catalog.servers.items() if not args.server or k == args.server}
+    if args.json:
+        print(json.dumps(servers, indent=2))
+        return
+
+    for name, entry in sorted(servers.items()):
+        print(f"{name} ({entry.get('probed_at')})")
+        for tool in entry.get('tools', []):
+            print(f"  - {tool.get('name')}: {tool.get('description', '')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+MCP server registry shared by the harness and the warm pool
+Keyed by image name; images are built and tagged <name>:test
+"""
+
+IMAGE_TAG = 'test'
+
+MCP_SERVERS = {
+    # Python-based servers
+    'mcp-aws': {
+        'path': 'mcp-aws/src/core-mcp-server',
+        'dockerfile': 'Dockerfile',
+        'type': 'python',
+        'env': {'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test', 'AWS_REGION': 'us-east-1'}
+    },
+    'mcp-google-workspace': {
+        'path': 'mcp-google-workspace',
+        'dockerfile': 'Dockerfile',
+        'type': 'python',
+        'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test.json'}
+    },
+    'mcp-google-sheets': {
+        'path': 'mcp-google-sheets',
+        'dockerfile': 'Dockerfile.mcp-google-sheets',
+        'dockerfile_location': 'dockerfiles',
+        'type': 'python',
+        'env': {'GOOGLE_SERVICE_ACCOUNT_JSON': '{}'}
+    },
+    'mcp-pdf-reader': {
+        'path': 'mcp-pdf-reader',
+        'dockerfile': 'Dockerfile',
+        'type': 'python',
+        'env': {}
+    },
+    'mcp-openai': {
+        'path': 'mcp-openai',
+        'dockerfile': 'Dockerfile',
+        'type': 'python',
+        'env': {'OPENAI_API_KEY': 'sk-test-123'}
+    },
+    
+    # Node.js-based servers
+    'mcp-notion': {
+        'path': 'mcp-notion',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'NOTION_API_KEY': 'secret_test_123'},
+        # Read-only tools mcp_cache_proxy.py may cache, with TTLs in seconds
+        'cache_tools': {'API-post-search': 60, 'API-get-users': 300}
+    },
+    'mcp-gdrive': {
+        'path': 'mcp-gdrive',
+        'dockerfile': 'Dockerfile.mcp-gdrive',
+        'dockerfile_location': 'dockerfiles',
+        'type': 'node',
+        'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test.json'}
+    },
+    'mcp-cloudflare': {
+        'path': 'mcp-cloudflare',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'CLOUDFLARE_API_TOKEN': 'test_token'}
+    },
+    'mcp-stripe': {
+        'path': 'mcp-stripe',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'STRIPE_API_KEY': 'sk_test_123'}
+    },
+    'mcp-paypal': {
+        'path': 'mcp-paypal',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'PAYPAL_ACCESS_TOKEN': 'test_token'}
+    },
+    'mcp-shopify': {
+        'path': 'mcp-shopify',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'SHOPIFY_API_KEY': 'test_key'}
+    },
+    'mcp-firecrawl': {
+        'path': 'mcp-firecrawl',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'FIRECRAWL_API_KEY': 'test_key'}
+    },
+    'mcp-elevenlabs': {
+        'path': 'mcp-elevenlabs',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'ELEVENLABS_API_KEY': 'test_key'}
+    },
+    'mcp-docker': {
+        'path': 'mcp-docker',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {}
+    },
+    'mcp-redis': {
+        'path': 'mcp-redis',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'REDIS_URL': 'redis://localhost:6379'}
+    },
+    'mcp-alchemy': {
+        'path': 'mcp-alchemy',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {'ALCHEMY_API_KEY': 'test_key'}
+    },
+    
+    # Go-based servers
+    'mcp-slack': {
+        'path': 'mcp-slack',
+        'dockerfile': 'Dockerfile',
+        'type': 'go',
+        'env': {'SLACK_BOT_TOKEN': 'xoxb-test', 'SLACK_APP_TOKEN': 'xapp-test'}
+    },
+    
+    # Official servers collection
+    'mcp-filesystem': {
+        'path': 'mcp-servers-official/src/filesystem',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {}
+    },
+    'mcp-screenshot': {
+        'path': 'mcp-servers-official/src/screenshot',
+        'dockerfile': 'Dockerfile',
+        'type': 'node',
+        'env': {}
+    }
+}
+
+
+def image_for(server_name, tag=IMAGE_TAG):
+    return f"{server_name}:{tag}"
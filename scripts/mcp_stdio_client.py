@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Persistent stdio JSON-RPC client for MCP servers
+Keeps one server process (or container) alive and runs many requests over it
+"""
+
+import itertools
+import json
+import subprocess
+import threading
+import time
+from collections import deque
+
+DEFAULT_PROTOCOL_VERSION = '2024-11-05'
+CLIENT_INFO = {'name': 'mcp-test-client', 'version': '1.0.0'}
+
+
+class MCPClientError(Exception):
+    """Raised when the server process dies or a request cannot complete"""
+
+
+class MCPTimeoutError(MCPClientError):
+    """Raised when a request gets no response in time"""
+
+
+def docker_command(image, env=None, name=None, extra_args=None):
+    """Build the argv for an interactive, self-removing MCP container"""
+    cmd = ['docker', 'run', '-i', '--rm']
+    if name:
+        cmd += ['--name', name]
+    for key, value in (env or {}).items():
+        cmd += ['-e', f'{key}={value}']
+    cmd += list(extra_args or [])
+    cmd.append(image)
+    return cmd
+
+
+class _Pending:
+    """A request waiting for its response"""
+
+    __slots__ = ('method', 'sent_at', 'event', 'response')
+
+    def __init__(self, method):
+        self.method = method
+        self.sent_at = time.perf_counter()
+        self.event = threading.Event()
+        self.response = None
+
+
+class MCPStdioClient:
+    """
+    Line-framed JSON-RPC client over a child process's stdin/stdout
+
+    Responses are matched to requests by id, so requests may be pipelined
+    from several threads. Latency of every request is recorded per method.
+    """
+
+    def __init__(self, command, env=None, cwd=None, timeout=10.0, container_name=None):
+        self.command = list(command)
+        self.env = env
+        self.cwd = cwd
+        self.timeout = timeout
+        self.container_name = container_name
+        self.process = None
+        self.latencies = {}
+        self.notifications = []
+        self.stray_lines = 0
+        self.stderr_tail = deque(maxlen=50)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = threading.Event()
+        self.started_at = None
+        self.ready_at = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        """Launch the server process and the reader threads"""
+        self.started_at = time.perf_counter()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self.env,
+            cwd=self.cwd,
+            bufsize=0
+        )
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+        return self
+
+    def _read_stdout(self):
+        for raw in self.process.stdout:
+            line = raw.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                # Servers that log to stdout interleave non-protocol lines
+                self.stray_lines += 1
+                continue
+            if isinstance(message, dict):
+                self._dispatch(message)
+        self._fail_pending('server closed stdout')
+
+    def _read_stderr(self):
+        for raw in self.process.stderr:
+            self.stderr_tail.append(raw.decode('utf-8', errors='replace').rstrip())
+
+    def _dispatch(self, message):
+        if 'method' in message:
+            if 'id' in message:
+                # Server-initiated request (sampling, roots, ...) - not supported
+                try:
+                    self._send({'jsonrpc': '2.0', 'id': message['id'],
+                                'error': {'code': -32601, 'message': 'Method not supported by client'}})
+                except MCPClientError:
+                    pass
+            else:
+                self.notifications.append(message)
+            return
+
+        with self._lock:
+            pending = self._pending.pop(message.get('id'), None)
+        if pending is None:
+            self.stray_lines += 1
+            return
+        elapsed = time.perf_counter() - pending.sent_at
+        with self._lock:
+            self.latencies.setdefault(pending.method, []).append(elapsed)
+        pending.response = message
+        pending.event.set()
+
+    def _fail_pending(self, reason):
+        self._closed.set()
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for item in pending:
+            item.response = {'error': {'code': -32000, 'message': reason}, '_client_error': True}
+            item.event.set()
+
+    def _send(self, message):
+        data = (json.dumps(message) + '\n').encode()
+        with self._write_lock:
+            try:
+                self.process.stdin.write(data)
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                raise MCPClientError(f'Failed to write to server: {e}') from e
+
+    def send_request(self, method, params=None):
+        """Send a request without waiting; returns a handle for wait_response()"""
+        if self.process is None:
+            raise MCPClientError('Client not started')
+        if self._closed.is_set():
+            raise MCPClientError('Server process has exited')
+
+        request_id = next(self._ids)
+        message = {'jsonrpc': '2.0', 'id': request_id, 'method': method}
+        if params is not None:
+            message['params'] = params
+
+        pending = _Pending(method)
+        with self._lock:
+            self._pending[request_id] = pending
+        self._send(message)
+        return request_id, pending
+
+    def wait_response(self, handle, timeout=None):
+        """Wait for the response to a request sent with send_request()"""
+        request_id, pending = handle
+        if not pending.event.wait(timeout or self.timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise MCPTimeoutError(f'{pending.method} timed out after {timeout or self.timeout}s')
+        if pending.response.get('_client_error'):
+            raise MCPClientError(pending.response['error']['message'])
+        return pending.response
+
+    def request(self, method, params=None, timeout=None):
+        """
+        Send a request and wait for its response
+
+        Args:
+            method: JSON-RPC method name
+            params: Optional params object
+            timeout: Seconds to wait (defaults to the client timeout)
+
+        Returns:
+            The full response message (containing 'result' or 'error')
+        """
+        return self.wait_response(self.send_request(method, params), timeout)
+
+    def request_many(self, calls, timeout=None):
+        """Pipeline several (method, params) requests and return their responses in order"""
+        handles = [self.send_request(method, params) for method, params in calls]
+        return [self.wait_response(handle, timeout) for handle in handles]
+
+    def notify(self, method, params=None):
+        """Send a notification (no response expected)"""
+        message = {'jsonrpc': '2.0', 'method': method}
+        if params is not None:
+            message['params'] = params
+        self._send(message)
+
+    def initialize(self, protocol_version=DEFAULT_PROTOCOL_VERSION, capabilities=None):
+        """Run the MCP handshake: initialize + notifications/initialized"""
+        response = self.request('initialize', {
+            'protocolVersion': protocol_version,
+            'capabilities': capabilities or {},
+            'clientInfo': CLIENT_INFO
+        })
+        if 'result' in response:
+            self.ready_at = time.perf_counter()
+            self.notify('notifications/initialized')
+        return response
+
+    def call_tool(self, name, arguments=None, timeout=None):
+        """Invoke a tool via tools/call"""
+        return self.request('tools/call', {'name': name, 'arguments': arguments or {}}, timeout)
+
+    def latency_summary(self):
+        """Per-method latency stats in milliseconds"""
+        summary = {}
+        with self._lock:
+            items = {method: list(values) for method, values in self.latencies.items()}
+        for method, values in items.items():
+            summary[method] = {
+                'count': len(values),
+                'avg_ms': round(sum(values) / len(values) * 1000, 2),
+                'max_ms': round(max(values) * 1000, 2)
+            }
+        return summary
+
+    def close(self, timeout=5.0):
+        """Close stdin and stop the server, removing its container if named"""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.container_name:
+            # The docker CLI exiting does not always take the container with it
+            subprocess.run(['docker', 'rm', '-f', self.container_name],
+                           capture_output=True, timeout=30)
+        self._fail_pending('client closed')
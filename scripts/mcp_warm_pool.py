@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Warm pool of pre-initialized stdio MCP servers
+Keeps a few idle servers per MCP_SERVERS entry that have already started
+and finished the initialize handshake, and hands one to each session over
+a Unix socket. The session's own initialize is answered from the pooled
+server's result, so the client skips interpreter and container start-up.
+Servers go back to the pool after a clean session and are recycled after
+a number of sessions or when they sit idle too long.
+
+    # keep two warm servers for each registry entry
+    python mcp_warm_pool.py serve --socket /tmp/mcp-pool.sock --size 2
+
+    # one session: stdio <-> a warm server
+    python mcp_warm_pool.py connect --socket /tmp/mcp-pool.sock --server mcp-notion
+
+    # hit rate and time saved
+    python mcp_warm_pool.py stats --socket /tmp/mcp-pool.sock
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+
+from mcp_multiplexer import LINE_LIMIT, connect, encode, error_response, open_connection
+from mcp_servers import IMAGE_TAG, MCP_SERVERS, image_for
+from mcp_stdio_client import DEFAULT_PROTOCOL_VERSION, docker_command
+
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_SESSIONS = 20
+DEFAULT_IDLE_TIMEOUT = 600
+INIT_TIMEOUT = 120
+MAINTAIN_INTERVAL = 5
+# Delay before retrying an entry whose servers fail to start doubles up to this
+MAX_RETRY_DELAY = 300
+DRAIN_TIMEOUT = 30
+POOL_CLIENT_INFO = {'name': 'mcp-warm-pool', 'version': '1.0.0'}
+
+
+def log(message):
+    print(f"[mcp-pool] {message}", file=sys.stderr, flush=True)
+
+
+class PoolError(Exception):
+    """Raised when a server cannot be started or initialized"""
+
+
+def build_registry(tag=IMAGE_TAG, registry_file=None, only=None):
+    """
+    Server name -> entry to start it from
+
+    Entries come from MCP_SERVERS (image <name>:<tag>) unless a registry
+    file is given: {"name": {"image": ..., "env": {...}, "args": [...]}},
+    or {"name": {"command": [...]}} for servers that do not run in docker.
+    """
+    if registry_file:
+        with open(registry_file) as f:
+            registry = json.load(f)
+    else:
+        registry = {name: {'image': image_for(name, tag), 'env': config.get('env', {})}
+                    for name, config in MCP_SERVERS.items()}
+
+    if only:
+        unknown = set(only) - set(registry)
+        if unknown:
+            raise ValueError(f"Unknown servers: {', '.join(sorted(unknown))}")
+        registry = {name: entry for name, entry in registry.items() if name in only}
+    return registry
+
+
+def entry_command(entry, container_name):
+    """argv for a registry entry; docker entries get a named container so they can be removed"""
+    if 'command' in entry:
+        return list(entry['command'])
+    return docker_command(entry['image'], entry.get('env'), name=container_name) + list(entry.get('args', []))
+
+
+class PooledServer:
+    """One started, initialized server process"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name, process, container_name):
+        self.id = next(self._ids)
+        self.name = name
+        self.process = process
+        self.container_name = container_name
+        self.init_result = None
+        self.cold_start = 0.0
+        self.sessions = 0
+        self.idle_since = time.monotonic()
+        self.drainer = None
+
+    @property
+    def alive(self):
+        return self.process.returncode is None
+
+
+class WarmPool:
+    """
+    Idle, initialized servers per registry entry
+
+    checkout() hands out an idle server (a hit) or starts one on the spot
+    (a miss) and tops the pool back up in the background. Time saved is
+    each hit's server's average measured cold start. An entry whose
+    servers keep failing to start is retried with exponential backoff.
+    """
+
+    def __init__(self, registry, size=DEFAULT_POOL_SIZE, max_sessions=DEFAULT_MAX_SESSIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, init_timeout=INIT_TIMEOUT):
+        self.registry = registry
+        self.size = size
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.init_timeout = init_timeout
+        self.idle = {name: deque() for name in registry}
+        self.starting = {name: 0 for name in registry}
+        self.stats = {name: {'hits': 0, 'misses': 0, 'started': 0, 'failed': 0, 'recycled': 0,
+                             'cold_start_total': 0.0, 'time_saved': 0.0}
+                      for name in registry}
+        self.failures = {name: 0 for name in registry}
+        self.retry_at = {name: 0.0 for name in registry}
+        self._containers = itertools.count(1)
+        self._tasks = set()
+
+    async def _spawn(self, name):
+        """Start a server and run the handshake"""
+        container = f"mcp-pool-{name}-{os.getpid()}-{next(self._containers)}"
+        argv = entry_command(self.registry[name], container)
+        started = time.monotonic()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *argv,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                limit=LINE_LIMIT,
+                start_new_session=True
+            )
+        except OSError as e:
+            self._failed(name)
+            raise PoolError(f"{name}: {e}")
+
+        server = PooledServer(name, process, None if 'command' in self.registry[name] else container)
+        try:
+            server.init_result = await asyncio.wait_for(self._handshake(server), self.init_timeout)
+        except (asyncio.TimeoutError, PoolError, ConnectionError) as e:
+            self._failed(name)
+            await self._terminate(server)
+            raise PoolError(f"{name}: {str(e) or 'initialize timed out'}")
+        except asyncio.CancelledError:
+            # Shutting down mid-start; don't leave the process or container behind
+            await self._terminate(server)
+            raise
+
+        self.failures[name] = 0
+        self.retry_at[name] = 0.0
+        server.cold_start = time.monotonic() - started
+        self.stats[name]['started'] += 1
+        self.stats[name]['cold_start_total'] += server.cold_start
+        log(f"{name}: server {server.id} ready in {server.cold_start:.2f}s")
+        return server
+
+    def _failed(self, name):
+        self.stats[name]['failed'] += 1
+        self.failures[name] += 1
+        delay = min(MAINTAIN_INTERVAL * 2 ** (self.failures[name] - 1), MAX_RETRY_DELAY)
+        self.retry_at[name] = time.monotonic() + delay
+
+    async def _handshake(self, server):
+        server.process.stdin.write(encode({
+            'jsonrpc': '2.0', 'id': 'pool-init', 'method': 'initialize',
+            'params': {'protocolVersion': DEFAULT_PROTOCOL_VERSION, 'capabilities': {},
+                       'clientInfo': POOL_CLIENT_INFO}
+        }))
+        await server.process.stdin.drain()
+        while True:
+            line = await server.process.stdout.readline()
+            if not line:
+                raise PoolError('server exited during initialize')
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and message.get('id') == 'pool-init':
+                break
+        if 'result' not in message:
+            raise PoolError(f"initialize failed: {message.get('error')}")
+        server.process.stdin.write(encode({'jsonrpc': '2.0', 'method': 'notifications/initialized'}))
+        await server.process.stdin.drain()
+        return message['result']
+
+    def _park(self, server):
+        """Add a server to its idle queue, discarding its output until checkout"""
+        server.idle_since = time.monotonic()
+        server.drainer = asyncio.ensure_future(self._discard_output(server))
+        self.idle[server.name].append(server)
+
+    async def _unpark(self, server):
+        if server.drainer:
+            server.drainer.cancel()
+            await asyncio.wait([server.drainer])
+            server.drainer = None
+
+    async def _discard_output(self, server):
+        # Notifications sent while parked (list_changed, logging) belong to
+        # no session; left in the pipe they would reach the next client, and
+        # a full pipe would stall the server
+        while True:
+            try:
+                line = await server.process.stdout.readline()
+            except (ValueError, asyncio.LimitOverrunError):
+                continue
+            if not line:
+                return
+
+    async def _terminate(self, server):
+        """Close stdin (docker -i --rm exits on EOF), then kill the group and the container"""
+        await self._unpark(server)
+        if server.alive:
+            try:
+                server.process.stdin.close()
+                await asyncio.wait_for(server.process.wait(), 5)
+            except (asyncio.TimeoutError, ConnectionError):
+                try:
+                    os.killpg(server.process.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+                await server.process.wait()
+        if server.container_name:
+            try:
+                remover = await asyncio.create_subprocess_exec(
+                    'docker', 'rm', '-f', server.container_name,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+                await remover.wait()
+            except OSError:
+                pass
+
+    def _background(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def refill(self, name):
+        """Start enough servers in the background to bring the pool back to size"""
+        if time.monotonic() < self.retry_at[name]:
+            return
+        missing = self.size - len(self.idle[name]) - self.starting[name]
+        for _ in range(max(0, missing)):
+            self.starting[name] += 1
+            self._background(self._warm(name))
+
+    async def _warm(self, name):
+        try:
+            server = await self._spawn(name)
+        except PoolError as e:
+            # Retried by a maintenance pass once the entry's backoff has passed
+            log(f"warm-up failed: {e} (retrying in {self.retry_at[name] - time.monotonic():.0f}s)")
+            return
+        finally:
+            self.starting[name] -= 1
+        self._park(server)
+
+    async def checkout(self, name):
+        stats = self.stats[name]
+        while self.idle[name]:
+            server = self.idle[name].popleft()
+            await self._unpark(server)
+            if server.alive:
+                stats['hits'] += 1
+                stats['time_saved'] += stats['cold_start_total'] / max(1, stats['started'])
+                self.refill(name)
+                return server
+            self._background(self._terminate(server))
+
+        stats['misses'] += 1
+        self.refill(name)
+        return await self._spawn(name)
+
+    async def release(self, server, reusable):
+        """Return a server after a session, or recycle it"""
+        server.sessions += 1
+        if (reusable and server.alive and server.sessions < self.max_sessions
+                and len(self.idle[server.name]) < self.size):
+            self._park(server)
+            return
+        self.stats[server.name]['recycled'] += 1
+        await self._terminate(server)
+        self.refill(server.name)
+
+    async def maintain(self):
+        """Recycle dead and long-idle servers and keep every pool at size"""
+        while True:
+            now = time.monotonic()
+            for name, idle in self.idle.items():
+                for server in list(idle):
+                    if not server.alive or now - server.idle_since > self.idle_timeout:
+                        idle.remove(server)
+                        self.stats[name]['recycled'] += 1
+                        self._background(self._terminate(server))
+                self.refill(name)
+            await asyncio.sleep(MAINTAIN_INTERVAL)
+
+    def report(self):
+        servers = {}
+        for name, stats in self.stats.items():
+            checkouts = stats['hits'] + stats['misses']
+            servers[name] = {
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_rate': round(stats['hits'] / checkouts, 3) if checkouts else None,
+                'time_saved_s': round(stats['time_saved'], 2),
+                'avg_cold_start_s': round(stats['cold_start_total'] / stats['started'], 3)
+                if stats['started'] else None,
+                'started': stats['started'],
+                'failed': stats['failed'],
+                'recycled': stats['recycled'],
+                'idle': len(self.idle[name])
+            }
+        hits = sum(s['hits'] for s in servers.values())
+        checkouts = hits + sum(s['misses'] for s in servers.values())
+        return {
+            'hit_rate': round(hits / checkouts, 3) if checkouts else None,
+            'time_saved_s': round(sum(s['time_saved_s'] for s in servers.values()), 2),
+            'servers': servers
+        }
+
+    async def session(self, server, reader, writer):
+        """
+        Relay one client to a pooled server
+
+        The client's initialize gets the pooled result and its
+        notifications/initialized is dropped; everything else passes
+        through unchanged, including server-to-client requests, since the
+        client owns the server for the whole session. A client that
+        half-closes still gets its in-flight responses; a server with
+        requests unanswered when the session ends is not reused.
+        """
+        outstanding = set()
+        drained = asyncio.Event()
+
+        async def client_to_server():
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    return
+                if not line:
+                    return
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    writer.write(encode(error_response(None, -32700, 'Parse error')))
+                    continue
+                if isinstance(message, dict):
+                    method = message.get('method')
+                    if method == 'initialize' and 'id' in message:
+                        writer.write(encode({'jsonrpc': '2.0', 'id': message['id'],
+                                             'result': server.init_result}))
+                        await writer.drain()
+                        continue
+                    if method == 'notifications/initialized':
+                        continue
+                    if method and 'id' in message:
+                        outstanding.add(message['id'])
+                        drained.clear()
+                server.process.stdin.write(line)
+                await server.process.stdin.drain()
+
+        async def server_to_client():
+            while True:
+                try:
+                    line = await server.process.stdout.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    continue
+                if not line:
+                    return
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(message, dict) and 'method' not in message:
+                    outstanding.discard(message.get('id'))
+                    if not outstanding:
+                        drained.set()
+                writer.write(line)
+                await writer.drain()
+
+        client_task = asyncio.ensure_future(client_to_server())
+        server_task = asyncio.ensure_future(server_to_client())
+        tasks = [client_task, server_task]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            if client_task.done() and not server_task.done() and outstanding:
+                # The client half-closed; let in-flight responses reach it
+                tasks.append(asyncio.ensure_future(drained.wait()))
+                await asyncio.wait(tasks[1:], timeout=DRAIN_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return not outstanding
+
+    async def handle_client(self, reader, writer):
+        """First line names the server ({"server": name}) or asks for {"stats": true}"""
+        try:
+            header = json.loads(await reader.readline() or b'{}')
+        except (json.JSONDecodeError, ValueError):
+            header = {}
+        try:
+            if header.get('stats'):
+                writer.write(encode(self.report()))
+                return
+            name = header.get('server')
+            if name not in self.registry:
+                writer.write(encode(error_response(None, -32602, f"Unknown server: {name}")))
+                return
+            try:
+                server = await self.checkout(name)
+            except PoolError as e:
+                writer.write(encode(error_response(None, -32000, str(e))))
+                return
+            reusable = False
+            try:
+                reusable = await self.session(server, reader, writer)
+            except (ConnectionError, BrokenPipeError):
+                pass
+            finally:
+                await self.release(server, reusable)
+        finally:
+            writer.close()
+
+    async def close(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        servers = [server for idle in self.idle.values() for server in idle]
+        await asyncio.gather(*(self._terminate(server) for server in servers), return_exceptions=True)
+        log(f"stats: {json.dumps(self.report())}")
+
+
+async def serve(socket_path, pool):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(pool.handle_client, path=socket_path, limit=LINE_LIMIT)
+    os.chmod(socket_path, 0o600)
+    maintainer = asyncio.ensure_future(pool.maintain())
+    log(f"listening on {socket_path}: {len(pool.registry)} servers, {pool.size} warm each")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    server.close()
+    maintainer.cancel()
+    await pool.close()
+    os.unlink(socket_path)
+
+
+async def fetch_stats(socket_path):
+    reader, writer = await open_connection(socket_path)
+    writer.write(encode({'stats': True}))
+    line = await reader.readline()
+    writer.close()
+    return json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep pre-initialized stdio MCP servers ready for new sessions')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    serve_parser = sub.add_parser('serve', help='Run the pool')
+    serve_parser.add_argument('--socket', required=True, help='Unix socket path to listen on')
+    serve_parser.add_argument('--server', action='append', dest='servers',
+                              help='Registry entry to pool (repeatable; default: all)')
+    serve_parser.add_argument('--size', type=int, default=DEFAULT_POOL_SIZE,
+                              help=f'Idle servers to keep per entry (default: {DEFAULT_POOL_SIZE})')
+    serve_parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS,
+                              help=f'Recycle a server after this many sessions (default: {DEFAULT_MAX_SESSIONS})')
+    serve_parser.add_argument('--idle-timeout', type=int, default=DEFAULT_IDLE_TIMEOUT,
+                              help=f'Recycle servers idle this many seconds (default: {DEFAULT_IDLE_TIMEOUT})')
+    serve_parser.add_argument('--tag', default=IMAGE_TAG, help=f'Image tag for MCP_SERVERS entries (default: {IMAGE_TAG})')
+    serve_parser.add_argument('--registry', help='JSON registry to use instead of MCP_SERVERS')
+    connect_parser = sub.add_parser('connect', help='Relay stdio to a warm server')
+    connect_parser.add_argument('--socket', required=True, help='Unix socket path to connect to')
+    connect_parser.add_argument('--server', required=True, help='Registry entry to check out')
+    connect_parser.add_argument('--wait', type=float, default=0,
+                                help='Seconds to keep retrying while the pool starts')
+    stats_parser = sub.add_parser('stats', help='Print pool hit rate and time saved')
+    stats_parser.add_argument('--socket', required=True, help='Unix socket path to connect to')
+    args = parser.parse_args()
+
+    try:
+        if args.mode == 'serve':
+            try:
+                registry = build_registry(args.tag, args.registry, args.servers)
+            except (OSError, ValueError) as e:
+                parser.error(str(e))
+            pool = WarmPool(registry, args.size, args.max_sessions, args.idle_timeout)
+            asyncio.run(serve(args.socket, pool))
+        elif args.mode == 'connect':
+            asyncio.run(connect(args.socket, args.wait, header={'server': args.server}))
+        else:
+            print(json.dumps(asyncio.run(fetch_stats(args.socket)), indent=2))
+    except (ConnectionRefusedError, FileNotFoundError) as e:
+        log(f"cannot connect to {args.socket}: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
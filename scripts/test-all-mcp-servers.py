@@ -4,73 +4,68 @@ Comprehensive MCP Server Testing Suite
 Tests building, running, and basic functionality of all MCP servers
 """
 
-import subprocess
 import json
 import os
 import time
 import sys
 from pathlib import Path
 
+from async_runner import AsyncRunner
+from build_manifest import BuildManifest, docker_image_id
+from mcp_probe import ToolCatalog, probe_image
+
+BUILD_TIMEOUT = 600
+
 # MCP servers configuration
 MCP_SERVERS = {
     'mcp-aws': {
         'type': 'python',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test'}
     },
     'mcp-notion': {
         'type': 'node',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'NOTION_API_KEY': 'secret_test_123'}
     },
     'mcp-google-workspace': {
         'type': 'python',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test-creds.json'}
     },
     'mcp-google-sheets': {
         'type': 'python',
         'dockerfile': '../dockerfiles/Dockerfile.mcp-google-sheets',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'GOOGLE_SERVICE_ACCOUNT_JSON': '{}'}
     },
     'mcp-gdrive': {
         'type': 'node',
         'dockerfile': '../dockerfiles/Dockerfile.mcp-gdrive',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'GOOGLE_APPLICATION_CREDENTIALS': '/tmp/test-creds.json'}
     },
     'mcp-slack': {
         'type': 'go',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'SLACK_BOT_TOKEN': 'xoxb-test', 'SLACK_APP_TOKEN': 'xapp-test'}
     },
     'mcp-pdf-reader': {
         'type': 'python',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {}
     },
     'mcp-cloudflare': {
         'type': 'node',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'CLOUDFLARE_API_TOKEN': 'test_token'}
     },
     'mcp-stripe': {
         'type': 'node',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {'STRIPE_API_KEY': 'sk_test_123'}
     },
     'mcp-shopify': {
         'type': 'node',
         'dockerfile': 'Dockerfile',
-        'test_cmd': '{"jsonrpc":"2.0","method":"tools/list","id":1}',
         'env': {}
     }
 }
@@ -79,19 +74,16 @@ class MCPServerTester:
     def __init__(self):
         self.base_path = Path('/Users/andreihasna/Missions/beepmedia/mission-mcps')
         self.results = {}
-        
-    def run_command(self, cmd, cwd=None, capture=True):
-        """Run shell command"""
-        try:
-            if capture:
-                result = subprocess.run(cmd, shell=True, cwd=cwd, 
-                                      capture_output=True, text=True)
-                return result.returncode == 0, result.stdout, result.stderr
-            else:
-                result = subprocess.run(cmd, shell=True, cwd=cwd)
-                return result.returncode == 0, "", ""
-        except Exception as e:
-            return False, "", str(e)
+        # Own manifest: build-and-test-all.py builds the same tags from other contexts
+        self.manifest = BuildManifest(self.base_path / '.build-manifest-repos.json')
+        self.cache_hits = set()
+        self.catalog = ToolCatalog(self.base_path / 'reports' / 'mcp-catalog.json')
+        self.runner = AsyncRunner(self.base_path / 'reports' / 'logs')
+        
+    def run_command(self, cmd, cwd=None, timeout=BUILD_TIMEOUT, log_name=None):
+        """Run a command (argv list) with a hard timeout, streaming output to a log"""
+        result = self.runner.run(cmd, cwd=cwd, timeout=timeout, log_name=log_name)
+        return result.ok, result.stdout, result.stderr
     
     def build_docker_image(self, server_name, config):
         """Build Docker image for MCP server"""
@@ -111,46 +103,50 @@ class MCPServerTester:
             print(f"❌ Dockerfile not found: {dockerfile_path}")
             return False
             
+        # Skip the build if nothing that feeds the image has changed
+        tag = f"{server_name}:test"
+        fingerprint = self.manifest.fingerprint(tag, repo_path, dockerfile_path)
+        if self.manifest.is_fresh(tag, fingerprint):
+            print(f"⚡ {server_name} unchanged, reusing {tag}")
+            self.cache_hits.add(server_name)
+            return True
+        
         # Build command
-        build_cmd = f"docker build -t {server_name}:test -f {dockerfile_path} {repo_path}"
+        build_cmd = ['docker', 'build', '-t', tag, '-f', str(dockerfile_path), str(repo_path)]
         
-        success, stdout, stderr = self.run_command(build_cmd)
+        success, stdout, stderr = self.run_command(build_cmd, log_name=f'{server_name}-build')
         
         if success:
+            self.manifest.record(tag, fingerprint)
             print(f"✅ Successfully built {server_name}")
         else:
+            self.manifest.forget(tag)
             print(f"❌ Failed to build {server_name}")
             print(f"Error: {stderr}")
+            print(f"Full log: {self.runner.log_path(f'{server_name}-build')}")
             
         return success
     
     def test_mcp_stdio(self, server_name, config):
-        """Test MCP server in stdio mode"""
+        """Test MCP server in stdio mode: handshake plus capability discovery"""
         print(f"\n🧪 Testing {server_name} stdio mode...")
         
-        # Create environment string
-        env_vars = ' '.join([f'-e {k}={v}' for k, v in config['env'].items()])
+        tag = f"{server_name}:test"
+        probe = probe_image(tag, config['env'], container_name=f"mcp-stdio-{server_name}-{os.getpid()}",
+                            timeout=30)
         
-        # Run container and send test command
-        test_cmd = config['test_cmd']
-        run_cmd = f"echo '{test_cmd}' | docker run -i --rm {env_vars} {server_name}:test"
-        
-        success, stdout, stderr = self.run_command(run_cmd)
-        
-        if success and stdout:
-            try:
-                # Try to parse JSON response
-                lines = stdout.strip().split('\n')
-                for line in lines:
-                    if line.strip().startswith('{'):
-                        response = json.loads(line)
-                        if 'result' in response or 'error' in response:
-                            print(f"✅ {server_name} stdio test passed")
-                            return True
-            except:
-                pass
+        if probe['initialized']:
+            self.catalog.update(server_name, docker_image_id(tag), probe)
+            print(f"✅ {server_name} stdio test passed ({len(probe['tools'])} tools, "
+                  f"{len(probe['resources'])} resources, {len(probe['prompts'])} prompts)")
+            return True
+        if probe['responded']:
+            print(f"✅ {server_name} stdio test passed (initialize returned an error)")
+            return True
         
         print(f"❌ {server_name} stdio test failed")
+        for method, error in probe['errors'].items():
+            print(f"   {method}: {error}")
         return False
     
     def test_server(self, server_name, config):
@@ -175,6 +171,7 @@ class MCPServerTester:
         
         self.results[server_name] = {
             'build': build_success,
+            'cached': server_name in self.cache_hits,
             'stdio_test': stdio_success,
             'status': 'Passed' if build_success and stdio_success else 'Failed'
         }
@@ -184,8 +181,17 @@ class MCPServerTester:
         print("🚀 Starting MCP Server Test Suite")
         print(f"Testing {len(MCP_SERVERS)} servers...")
         
-        for server_name, config in MCP_SERVERS.items():
-            self.test_server(server_name, config)
+        try:
+            for server_name, config in MCP_SERVERS.items():
+                self.test_server(server_name, config)
+        except KeyboardInterrupt:
+            print("\n🛑 Interrupted, stopping running commands...")
+            self.runner.cancel_all()
+            self.manifest.save()
+            sys.exit(130)
+        
+        self.manifest.save()
+        self.catalog.save()
         
         # Print summary
         self.print_summary()
@@ -211,6 +217,7 @@ class MCPServerTester:
         
         print(f"{'-'*60}")
         print(f"Total: {passed}/{len(self.results)} passed")
+        print(f"Cache hits: {len(self.cache_hits)} (builds skipped)")
         
         # Save results
         results_file = self.base_path / 'reports' / 'test-results.json'
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = SCRIPTS_DIR.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+# check_elastic_ips.py lives at the repository root
+sys.path.append(str(REPO_ROOT))
+
+
+@pytest.fixture
+def fake_server_command():
+    """argv for the offline stand-in MCP server"""
+    def command(*args):
+        return [sys.executable, str(SCRIPTS_DIR / 'fake_mcp_server.py'), *args]
+    return command
@@ -0,0 +1,27 @@
+import pytest
+
+from build_manifest import BuildManifest, is_ignored, load_dockerignore
+
+
+@pytest.mark.parametrize('rel_path, pattern, ignored', [
+    ('app.py', '*.py', True),
+    ('src/app.py', '*.py', False),
+    ('src/app.py', '**/*.py', True),
+    ('src/pkg/app.py', 'src/*.py', False),
+    ('node_modules/pkg/index.js', 'node_modules', True),
+    ('web/node_modules/pkg/index.js', '**/node_modules', True),
+    ('a/c', 'a?c', False)
+])
+def test_star_and_question_mark_stay_within_a_directory(rel_path, pattern, ignored):
+    assert is_ignored(rel_path, [(pattern, False)]) is ignored
+
+
+def test_last_matching_pattern_wins(tmp_path):
+    (tmp_path / '.dockerignore').write_text('# docs stay out\ndocs\n!docs/README.md\n*.log\n')
+    for rel_path in ('docs/README.md', 'docs/guide.md', 'server.py', 'debug.log'):
+        (tmp_path / rel_path).parent.mkdir(exist_ok=True)
+        (tmp_path / rel_path).write_text(rel_path)
+
+    assert load_dockerignore(tmp_path) == [('docs', False), ('docs/README.md', True), ('*.log', False)]
+    walked = sorted(rel_path for rel_path, _ in BuildManifest(tmp_path / 'manifest.json')._walk_context(str(tmp_path)))
+    assert walked == ['.dockerignore', 'docs/README.md', 'server.py']
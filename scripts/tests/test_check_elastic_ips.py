@@ -0,0 +1,97 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from check_elastic_ips import (InventoryCache, build_inventory, cached_scan, diff_inventories,
+                               scan_all_regions, snapshot_to_save)
+
+
+def address(allocation_id, public_ip, instance_id=None):
+    addr = {'AllocationId': allocation_id, 'PublicIp': public_ip}
+    if instance_id:
+        addr.update(InstanceId=instance_id, AssociationId=f'eipassoc-{allocation_id}')
+    return addr
+
+
+def test_failed_region_keeps_its_rows_until_it_scans_again():
+    first = build_inventory([
+        ('us-east-1', [address('eipalloc-1', '1.1.1.1', 'i-1')], None),
+        ('eu-west-1', [address('eipalloc-2', '2.2.2.2')], None)
+    ])
+    flaky = build_inventory([
+        ('us-east-1', [address('eipalloc-1', '1.1.1.1', 'i-1')], None),
+        ('eu-west-1', [], RuntimeError('throttled'))
+    ])
+    assert diff_inventories(first, flaky)['released'] == []
+
+    saved = snapshot_to_save(first, flaky)
+    assert saved['regions']['eu-west-1'] == first['regions']['eu-west-1']
+    assert saved['failed_regions'] == {'eu-west-1': 'throttled'}
+
+    recovered = build_inventory([
+        ('us-east-1', [address('eipalloc-1', '1.1.1.1', 'i-1')], None),
+        ('eu-west-1', [address('eipalloc-2', '2.2.2.2')], None)
+    ])
+    diff = diff_inventories(saved, recovered)
+    assert diff['newly_unassociated'] == [] and diff['released'] == []
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with mock_aws():
+        session = boto3.Session(region_name='us-east-1')
+        east = session.client('ec2', region_name='us-east-1')
+        image_id = east.describe_images()['Images'][0]['ImageId']
+        instance_id = east.run_instances(ImageId=image_id, MinCount=1, MaxCount=1)['Instances'][0]['InstanceId']
+        attached = east.allocate_address(Domain='vpc')['AllocationId']
+        east.associate_address(AllocationId=attached, InstanceId=instance_id)
+        east.allocate_address(Domain='vpc')
+        session.client('ec2', region_name='eu-west-1').allocate_address(Domain='vpc')
+        yield session
+
+
+class CountingSession:
+    """Counts describe_addresses calls and fails the regions it is told to"""
+
+    def __init__(self, session, failing=()):
+        self.session = session
+        self.failing = set(failing)
+        self.calls = []
+
+    def client(self, service, region_name):
+        client = self.session.client(service, region_name=region_name)
+        describe = client.describe_addresses
+
+        def describe_addresses(**kwargs):
+            self.calls.append(region_name)
+            if region_name in self.failing:
+                raise RuntimeError('throttled')
+            return describe(**kwargs)
+
+        client.describe_addresses = describe_addresses
+        return client
+
+
+def test_all_regions_are_scanned_and_summarised(session):
+    results = scan_all_regions(session, ['us-east-1', 'eu-west-1', 'ap-south-1'])
+
+    assert [region for region, _, _ in results] == ['us-east-1', 'eu-west-1', 'ap-south-1']
+    summary = build_inventory(results)['summary']
+    assert summary['total_allocated'] == 3
+    assert summary['total_associated'] == 1
+    assert summary['total_unassociated'] == 2
+    assert summary['regions_failed'] == 0
+
+
+def test_cached_scan_retries_only_failed_regions(session, tmp_path):
+    cache = InventoryCache(tmp_path, ttl=60)
+    flaky = CountingSession(session, failing=['eu-west-1'])
+    results = cached_scan(flaky, ['us-east-1', 'eu-west-1'], cache)
+    assert str(results[1][2]) == 'throttled'
+
+    recovered = CountingSession(session)
+    results = cached_scan(recovered, ['us-east-1', 'eu-west-1'], cache)
+    assert recovered.calls == ['eu-west-1']
+    assert [len(addresses) for _, addresses, _ in results] == [2, 1]
@@ -0,0 +1,108 @@
+import importlib.util
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+SCRIPTS_DIR = Path(__file__).resolve().parents[1]
+
+
+def load_script(filename, module_name, monkeypatch):
+    """Import a hyphenated script under the name its container copy has"""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, module_name, module)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def secrets(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('SECRETS_DIR', str(tmp_path))
+    with mock_aws():
+        client = boto3.client('secretsmanager', region_name='us-east-1')
+        client.create_secret(Name='beepmedia/tool/notion/general/api', SecretString='notion-key')
+        client.create_secret(Name='beepmedia/tool/openai/api', SecretString=json.dumps({'api_key': 'sk-1'}))
+        client.create_secret(Name='beepmedia/tool/twilio/credentials',
+                             SecretString=json.dumps({'username': 'AC1', 'password': 'twilio-key'}))
+        # The module builds its client at import, so load it inside the mock
+        load_script('aws-secrets-manager.py', 'aws_secrets_manager', monkeypatch)
+        yield load_script('inject-secrets.py', 'inject_secrets', monkeypatch), client
+
+
+def read(path):
+    return json.loads(path.read_text())
+
+
+def test_secrets_are_fetched_in_one_batch(tmp_path, secrets):
+    inject, client = secrets
+    calls = []
+    batch_get = client.batch_get_secret_value
+    manager = sys.modules['aws_secrets_manager'].get_secrets_manager()
+    manager.client.batch_get_secret_value = lambda **kwargs: calls.append(kwargs) or batch_get(**kwargs)
+
+    changed = inject.inject_secrets()
+
+    assert len(calls) == 1
+    assert read(tmp_path / 'notion.json') == {'NOTION_API_KEY': 'notion-key'}
+    assert read(tmp_path / 'openai.json') == {'OPENAI_API_KEY': {'api_key': 'sk-1'}}
+    assert read(tmp_path / 'twilio.json') == {'TWILIO_CREDENTIALS': 'twilio-key'}
+    # Secrets that don't exist or have no mapping leave their server's file empty
+    assert read(tmp_path / 'slack.json') == {}
+    assert {'notion', 'openai', 'twilio'} <= set(changed)
+    assert inject.inject_secrets() == []
+
+
+def test_concurrent_fallback_when_batch_is_unavailable(tmp_path, secrets):
+    inject, _ = secrets
+    manager = sys.modules['aws_secrets_manager'].get_secrets_manager()
+
+    def unavailable(**kwargs):
+        raise RuntimeError('BatchGetSecretValue not supported')
+
+    manager.client.batch_get_secret_value = unavailable
+    values, errors = inject.fetch_secrets({'NOTION_API_KEY', 'SLACK_TOKEN', 'CLOUDFLARE_API_TOKEN'}, True)
+
+    assert values == {'NOTION_API_KEY': 'notion-key'}
+    assert set(errors) == {'SLACK_TOKEN', 'CLOUDFLARE_API_TOKEN'}
+
+
+def test_failed_secret_keeps_the_value_on_disk(tmp_path, secrets):
+    inject, _ = secrets
+    inject.write_secret_files(str(tmp_path), {'NOTION_API_KEY': 'old-key', 'OPENAI_API_KEY': 'sk-0'})
+
+    changed = inject.write_secret_files(str(tmp_path), {'OPENAI_API_KEY': 'sk-1'}, failed=['NOTION_API_KEY'])
+
+    assert changed == ['openai']
+    assert read(tmp_path / 'notion.json') == {'NOTION_API_KEY': 'old-key'}
+
+
+def test_concurrent_loads_share_one_fetch_and_leave_no_key_locks(secrets):
+    cache = sys.modules['aws_secrets_manager'].SecretCache()
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get_or_load, 'key', slow_loader) for _ in range(4)]
+        release.set()
+        assert [future.result() for future in futures] == ['value'] * 4
+    assert calls == [1]
+
+    def failing_loader():
+        raise RuntimeError('AccessDenied')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('other', failing_loader)
+    assert cache._loading == {}
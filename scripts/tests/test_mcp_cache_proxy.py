@@ -0,0 +1,189 @@
+import asyncio
+import json
+import time
+
+from mcp_cache_proxy import CachingProxy
+from mcp_multiplexer import LINE_LIMIT, Multiplexer, cached_command
+
+
+class RecordingStdin:
+    """Stands in for the upstream server's stdin"""
+
+    def __init__(self):
+        self.messages = []
+
+    def write(self, data):
+        self.messages.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+class StubProcess:
+    def __init__(self):
+        self.stdin = RecordingStdin()
+
+
+def line(message):
+    return (json.dumps(message) + '\n').encode()
+
+
+def request(request_id, method='tools/list', params=None):
+    message = {'jsonrpc': '2.0', 'id': request_id, 'method': method}
+    if params is not None:
+        message['params'] = params
+    return message
+
+
+def cancelled(request_id):
+    return {'jsonrpc': '2.0', 'method': 'notifications/cancelled', 'params': {'requestId': request_id}}
+
+
+def result(request_id, value):
+    return {'jsonrpc': '2.0', 'id': request_id, 'result': value}
+
+
+def make_proxy(**kwargs):
+    proxy = CachingProxy(['unused'], **kwargs)
+    proxy.process = StubProcess()
+    return proxy
+
+
+def client_output(capsysbinary):
+    return [json.loads(raw) for raw in capsysbinary.readouterr().out.splitlines()]
+
+
+def test_list_methods_are_served_from_cache(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        proxy.from_upstream(line(result(1, {'tools': []})))
+        await proxy.from_client(line(request(2, params={'_meta': {'progressToken': 'p'}})))
+
+    asyncio.run(scenario())
+    assert [m['id'] for m in proxy.process.stdin.messages] == [1]
+    assert [m['id'] for m in client_output(capsysbinary)] == [1, 2]
+    assert proxy.report()['hits'] == 1
+
+
+def test_identical_requests_in_flight_share_one_upstream_call(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        await proxy.from_client(line(request(2)))
+        proxy.from_upstream(line(result(1, {'tools': []})))
+
+    asyncio.run(scenario())
+    assert len(proxy.process.stdin.messages) == 1
+    assert sorted(m['id'] for m in client_output(capsysbinary)) == [1, 2]
+
+
+def test_cancelled_leader_hands_over_to_a_waiter(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        await proxy.from_client(line(request(2)))
+        await proxy.from_client(line(cancelled(1)))
+        # The server honours the cancellation and answers only the resent request
+        proxy.from_upstream(line(result(2, {'tools': []})))
+
+    asyncio.run(scenario())
+    upstream = proxy.process.stdin.messages
+    assert [m.get('id') for m in upstream] == [1, 2, None]
+    assert upstream[2]['method'] == 'notifications/cancelled'
+    assert [m['id'] for m in client_output(capsysbinary)] == [2]
+    assert not proxy.inflight and not proxy.pending
+
+
+def test_cancelled_leader_without_waiters_is_forgotten(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        await proxy.from_client(line(cancelled(1)))
+        await proxy.from_client(line(request(2)))
+        proxy.from_upstream(line(result(2, {'tools': []})))
+
+    asyncio.run(scenario())
+    assert [m.get('id') for m in proxy.process.stdin.messages] == [1, None, 2]
+    assert [m['id'] for m in client_output(capsysbinary)] == [2]
+
+
+def test_cancelled_waiter_is_not_forwarded(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        await proxy.from_client(line(request(2)))
+        await proxy.from_client(line(cancelled(2)))
+        proxy.from_upstream(line(result(1, {'tools': []})))
+
+    asyncio.run(scenario())
+    assert [m['id'] for m in proxy.process.stdin.messages] == [1]
+    assert [m['id'] for m in client_output(capsysbinary)] == [1]
+
+
+def test_waiters_fail_when_upstream_exits(capsysbinary):
+    proxy = make_proxy()
+
+    async def scenario():
+        await proxy.from_client(line(request(1)))
+        await proxy.from_client(line(request(2)))
+        proxy.fail_inflight('Upstream server exited')
+
+    asyncio.run(scenario())
+    responses = client_output(capsysbinary)
+    assert sorted(m['id'] for m in responses) == [1, 2]
+    assert all(m['error']['code'] == -32000 for m in responses)
+
+
+def test_unlisted_tool_call_drops_cached_and_in_flight_tool_results(capsysbinary):
+    proxy = make_proxy(cache_tools={'search': 60})
+    search = {'name': 'search', 'arguments': {'q': 'x'}}
+
+    async def scenario():
+        await proxy.from_client(line(request(1, 'tools/call', search)))
+        await proxy.from_client(line(request(2, 'tools/call', {'name': 'update', 'arguments': {}})))
+        proxy.from_upstream(line(result(1, {'content': []})))
+        proxy.from_upstream(line(result(2, {'content': []})))
+        await proxy.from_client(line(request(3, 'tools/call', search)))
+
+    asyncio.run(scenario())
+    assert [m['id'] for m in proxy.process.stdin.messages] == [1, 2, 3]
+
+
+def test_second_session_through_the_multiplexer_is_served_from_cache(tmp_path, fake_server_command):
+    # Every upstream response takes 500ms, so only a cache hit comes back quickly
+    command = cached_command(fake_server_command('--delay-ms', '500'))
+
+    async def session(socket_path):
+        reader, writer = await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+        writer.write(line(request(1, 'initialize', {'protocolVersion': '2024-11-05', 'capabilities': {},
+                                                    'clientInfo': {'name': 'test', 'version': '1'}})))
+        await asyncio.wait_for(reader.readline(), 10)
+        started = time.monotonic()
+        writer.write(line(request(2)))
+        response = json.loads(await asyncio.wait_for(reader.readline(), 10))
+        elapsed = time.monotonic() - started
+        writer.close()
+        return response, elapsed
+
+    async def main():
+        socket_path = str(tmp_path / 'mux.sock')
+        mux = Multiplexer(command)
+        server = await asyncio.start_unix_server(mux.handle_client, path=socket_path, limit=LINE_LIMIT)
+        try:
+            first, first_elapsed = await session(socket_path)
+            second, second_elapsed = await session(socket_path)
+        finally:
+            server.close()
+            await mux.close()
+        assert first['result'] == second['result']
+        assert first_elapsed >= 0.5
+        assert second_elapsed < 0.25
+        assert mux.stats['upstream_starts'] == 1
+
+    asyncio.run(main())
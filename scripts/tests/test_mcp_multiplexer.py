@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from mcp_multiplexer import LINE_LIMIT, Multiplexer
+
+INITIALIZE = {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize',
+              'params': {'protocolVersion': '2024-11-05', 'capabilities': {},
+                         'clientInfo': {'name': 'test', 'version': '1'}}}
+
+
+async def send(writer, message):
+    writer.write((json.dumps(message) + '\n').encode())
+    await writer.drain()
+
+
+async def receive(reader, timeout=5):
+    return json.loads(await asyncio.wait_for(reader.readline(), timeout))
+
+
+def run_mux(tmp_path, command, scenario):
+    async def main():
+        socket_path = str(tmp_path / 'mux.sock')
+        mux = Multiplexer(command)
+        server = await asyncio.start_unix_server(mux.handle_client, path=socket_path, limit=LINE_LIMIT)
+        try:
+            await scenario(mux, lambda: asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT))
+        finally:
+            server.close()
+            await mux.close()
+    asyncio.run(main())
+
+
+def test_clients_share_one_upstream(tmp_path, fake_server_command):
+    async def scenario(mux, connect):
+        clients = [await connect() for _ in range(3)]
+        for reader, writer in clients:
+            await send(writer, INITIALIZE)
+            assert (await receive(reader))['result']['serverInfo']['name'] == 'fake-mcp-server'
+        # Every client uses the same request id; each gets its own answer
+        for i, (_, writer) in enumerate(clients):
+            await send(writer, {'jsonrpc': '2.0', 'id': 7, 'method': 'tools/call',
+                                'params': {'name': 'echo', 'arguments': {'text': str(i)}}})
+        for i, (reader, _) in enumerate(clients):
+            response = await receive(reader)
+            assert response['id'] == 7
+            assert response['result']['content'][0]['text'] == str(i)
+        assert mux.stats['upstream_starts'] == 1
+        assert mux.stats['initialize_cached'] == 2
+        for _, writer in clients:
+            writer.close()
+
+    run_mux(tmp_path, fake_server_command(), scenario)
+
+
+def test_initializing_client_disconnect_does_not_hang_others(tmp_path, fake_server_command):
+    async def scenario(mux, connect):
+        _, first = await connect()
+        await send(first, INITIALIZE)
+        # Leave while the upstream initialize is still in flight
+        await asyncio.sleep(0.1)
+        first.close()
+
+        reader, writer = await connect()
+        await send(writer, {**INITIALIZE, 'id': 'second'})
+        response = await receive(reader)
+        assert response['id'] == 'second'
+        assert 'result' in response
+        assert mux.init_result is not None
+
+        await send(writer, {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'})
+        assert 'tools' in (await receive(reader))['result']
+        writer.close()
+
+    run_mux(tmp_path, fake_server_command('--delay-ms', '500'), scenario)
@@ -0,0 +1,23 @@
+from mcp_stdio_client import MCPStdioClient
+from mcp_probe import probe_session
+
+
+def test_probe_discovers_everything(fake_server_command):
+    with MCPStdioClient(fake_server_command('--tools', '3')) as client:
+        probe = probe_session(client)
+    assert probe['initialized'] and probe['responded']
+    assert len(probe['tools']) == 3
+    assert [r['name'] for r in probe['resources']] == ['README']
+    assert [p['name'] for p in probe['prompts']] == ['greet']
+    assert probe['errors'] == {}
+
+
+def test_a_silent_discovery_method_keeps_the_rest_of_the_probe(fake_server_command):
+    command = fake_server_command('--ignore', 'resources/list', '--ignore', 'prompts/list')
+    with MCPStdioClient(command, timeout=0.5) as client:
+        probe = probe_session(client)
+    assert probe['initialized'] and probe['responded']
+    assert probe['server_info']['name'] == 'fake-mcp-server'
+    assert [tool['name'] for tool in probe['tools']] == ['echo', 'sleep']
+    assert set(probe['errors']) == {'resources/list', 'prompts/list'}
+    assert 'timed out' in probe['errors']['resources/list']
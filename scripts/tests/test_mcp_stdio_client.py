@@ -0,0 +1,49 @@
+import pytest
+
+from mcp_stdio_client import MCPClientError, MCPStdioClient, MCPTimeoutError
+
+
+def test_one_process_serves_the_whole_probe(fake_server_command):
+    with MCPStdioClient(fake_server_command('--tools', '4')) as client:
+        response = client.initialize()
+        assert response['result']['serverInfo']['name'] == 'fake-mcp-server'
+
+        tools = client.request('tools/list')['result']['tools']
+        assert [tool['name'] for tool in tools][:2] == ['echo', 'sleep']
+        for i in range(5):
+            assert client.call_tool('echo', {'text': str(i)})['result']['content'][0]['text'] == str(i)
+
+        # A later request is answered by the process the first one started
+        first = client.send_request('ping')
+        second = client.send_request('ping')
+        assert client.wait_response(first)['result']['pid'] == client.process.pid
+        assert client.wait_response(second)['result']['pid'] == client.process.pid
+
+    summary = client.latency_summary()
+    assert summary['tools/call']['count'] == 5
+    assert summary['initialize']['count'] == 1
+
+
+def test_pipelined_responses_are_matched_by_id(fake_server_command):
+    # The server answers all ten at once, newest first
+    with MCPStdioClient(fake_server_command('--reverse-batch', '10')) as client:
+        client.initialize()
+        responses = client.request_many([('tools/call', {'name': 'echo', 'arguments': {'text': str(i)}})
+                                         for i in range(10)])
+    assert [r['result']['content'][0]['text'] for r in responses] == [str(i) for i in range(10)]
+
+
+def test_errors_and_timeouts(fake_server_command):
+    with MCPStdioClient(fake_server_command(), timeout=5) as client:
+        client.initialize()
+        assert client.call_tool('missing')['error']['code'] == -32602
+        with pytest.raises(MCPTimeoutError):
+            client.call_tool('sleep', {'ms': 1000}, timeout=0.1)
+
+
+def test_server_exit_fails_pending_requests(fake_server_command):
+    client = MCPStdioClient(fake_server_command()).start()
+    client.initialize()
+    client.close()
+    with pytest.raises(MCPClientError):
+        client.request('tools/list')
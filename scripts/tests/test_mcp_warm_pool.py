@@ -0,0 +1,85 @@
+import asyncio
+import json
+import sys
+
+from mcp_multiplexer import LINE_LIMIT
+from mcp_warm_pool import MAINTAIN_INTERVAL, WarmPool
+
+# Announces a tools/list_changed after the handshake, while it sits in the pool
+CHATTY_SERVER = '''
+import json, sys
+for line in sys.stdin:
+    message = json.loads(line)
+    if message.get('method') == 'initialize':
+        print(json.dumps({'jsonrpc': '2.0', 'id': message['id'], 'result': {
+            'protocolVersion': '2024-11-05', 'capabilities': {}, 'serverInfo': {'name': 'chatty', 'version': '1'}}}))
+    elif message.get('method') == 'notifications/initialized':
+        print(json.dumps({'jsonrpc': '2.0', 'method': 'notifications/tools/list_changed'}))
+    elif 'id' in message:
+        print(json.dumps({'jsonrpc': '2.0', 'id': message['id'], 'result': {'tools': []}}))
+    sys.stdout.flush()
+'''
+
+
+async def send(writer, message):
+    writer.write((json.dumps(message) + '\n').encode())
+    await writer.drain()
+
+
+async def receive(reader, timeout=5):
+    return json.loads(await asyncio.wait_for(reader.readline(), timeout))
+
+
+async def wait_for(condition, timeout=10):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.02)
+
+
+def test_notifications_sent_while_parked_do_not_reach_the_next_session(tmp_path):
+    async def main():
+        pool = WarmPool({'chatty': {'command': [sys.executable, '-c', CHATTY_SERVER]}}, size=1)
+        socket_path = str(tmp_path / 'pool.sock')
+        server = await asyncio.start_unix_server(pool.handle_client, path=socket_path, limit=LINE_LIMIT)
+        try:
+            pool.refill('chatty')
+            await wait_for(lambda: pool.idle['chatty'])
+            await asyncio.sleep(0.2)
+
+            reader, writer = await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+            await send(writer, {'server': 'chatty'})
+            await send(writer, {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {}})
+            assert (await receive(reader))['id'] == 1
+            await send(writer, {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'})
+            assert await receive(reader) == {'jsonrpc': '2.0', 'id': 2, 'result': {'tools': []}}
+            writer.close()
+            assert pool.stats['chatty']['hits'] == 1
+        finally:
+            server.close()
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_failing_entry_backs_off():
+    async def main():
+        pool = WarmPool({'broken': {'command': [sys.executable, '-c', 'pass']}}, size=1)
+        try:
+            pool.refill('broken')
+            await wait_for(lambda: pool.stats['broken']['failed'] == 1 and not pool.starting['broken'])
+            first_retry = pool.retry_at['broken'] - asyncio.get_running_loop().time()
+
+            # A maintenance pass inside the backoff window starts nothing
+            pool.refill('broken')
+            assert pool.starting['broken'] == 0
+
+            pool.retry_at['broken'] = 0.0
+            pool.refill('broken')
+            await wait_for(lambda: pool.stats['broken']['failed'] == 2 and not pool.starting['broken'])
+            second_retry = pool.retry_at['broken'] - asyncio.get_running_loop().time()
+            assert first_retry <= MAINTAIN_INTERVAL < second_retry
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import json
+import os
+import random
+import stat
+import sys
+import tarfile
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'deployment'))
+from ship_images import Target, ship_image  # noqa: E402
+
+# Stands in for `docker image inspect` and `docker save` over prepared files
+FAKE_DOCKER = '''#!{python}
+import os, sys
+images = os.environ['FAKE_DOCKER_IMAGES']
+name = sys.argv[-1].replace(':', '_')
+try:
+    if sys.argv[1:3] == ['image', 'inspect']:
+        sys.stdout.write(open(os.path.join(images, name + '.json')).read())
+    elif sys.argv[1] == 'save':
+        with open(os.path.join(images, name + '.tar'), 'rb') as f:
+            sys.stdout.buffer.write(f.read())
+    else:
+        sys.exit(2)
+except OSError:
+    sys.exit(1)
+'''
+
+
+def layer_tar(seed, size):
+    data = random.Random(seed).randbytes(size)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar:
+        add_member(tar, f'layer-{seed}.bin', data)
+    return buffer.getvalue()
+
+
+def add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def save_oci_image(images_dir, image, layers):
+    """Write what `docker save` would produce for an OCI-layout image"""
+    diff_ids = [f'sha256:{hashlib.sha256(layer).hexdigest()}' for layer in layers]
+    config = json.dumps({'rootfs': {'type': 'layers', 'diff_ids': diff_ids}}).encode()
+    config_path = f'blobs/sha256/{hashlib.sha256(config).hexdigest()}'
+    name = image.replace(':', '_')
+    with tarfile.open(images_dir / f'{name}.tar', 'w') as tar:
+        for layer, diff_id in zip(layers, diff_ids):
+            add_member(tar, f'blobs/sha256/{diff_id[7:]}', layer)
+        add_member(tar, config_path, config)
+        add_member(tar, 'manifest.json', json.dumps([{
+            'Config': config_path, 'RepoTags': [image],
+            'Layers': [f'blobs/sha256/{diff_id[7:]}' for diff_id in diff_ids]
+        }]).encode())
+    (images_dir / f'{name}.json').write_text(json.dumps(diff_ids))
+    return images_dir / f'{name}.tar'
+
+
+@pytest.fixture
+def images_dir(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    docker = bin_dir / 'docker'
+    docker.write_text(FAKE_DOCKER.format(python=sys.executable))
+    docker.chmod(docker.stat().st_mode | stat.S_IEXEC)
+    images = tmp_path / 'images'
+    images.mkdir()
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv('FAKE_DOCKER_IMAGES', str(images))
+    return images
+
+
+def test_second_ship_sends_only_the_changed_layer(tmp_path, images_dir):
+    base = [layer_tar(1, 2 * 1024 * 1024), layer_tar(2, 300 * 1024)]
+    target = Target(local_store=str(tmp_path / 'store'))
+    output_dir = tmp_path / 'rebuilt'
+
+    saved = save_oci_image(images_dir, 'mcp-aws:test', [*base, layer_tar(3, 20 * 1024)])
+    stats = ship_image(target, 'mcp-aws:test', output_dir=output_dir)
+    assert (stats['layers_sent'], stats['layers_skipped']) == (3, 0)
+    assert (output_dir / 'mcp-aws_test.tar').read_bytes() == saved.read_bytes()
+
+    stats = ship_image(target, 'mcp-aws:test', output_dir=output_dir)
+    assert (stats['layers_sent'], stats['layers_skipped']) == (0, 3)
+    assert stats['bytes_wire'] < 64 * 1024
+    assert (output_dir / 'mcp-aws_test.tar').read_bytes() == saved.read_bytes()
+
+    saved = save_oci_image(images_dir, 'mcp-aws:test', [*base, layer_tar(4, 20 * 1024)])
+    stats = ship_image(target, 'mcp-aws:test', output_dir=output_dir)
+    assert (stats['layers_sent'], stats['layers_skipped']) == (1, 2)
+    assert (output_dir / 'mcp-aws_test.tar').read_bytes() == saved.read_bytes()
+
+
+def test_missing_image_is_skipped(tmp_path, images_dir):
+    assert ship_image(Target(local_store=str(tmp_path / 'store')), 'mcp-none:test') is None
+
+
+def test_receiver_failure_is_reported_instead_of_hanging(tmp_path, images_dir):
+    save_oci_image(images_dir, 'mcp-aws:test', [layer_tar(1, 4 * 1024 * 1024)])
+    target = Target(local_store=str(tmp_path / 'store'))
+
+    # The receiver cannot create its output directory under a regular file
+    with pytest.raises(RuntimeError, match='receiver exited with 1'):
+        ship_image(target, 'mcp-aws:test', output_dir=os.devnull + '/rebuilt')
@@ -0,0 +1,199 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+# update_cloudflare_dns.py and its helpers live in repos/
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'repos'))
+
+from update_cloudflare_dns import (MAX_RETRIES, CloudflareManager, IdCache, StaleZoneError, plan_changes,
+                                   record_key)
+
+ZONE_ID = 'zone-1'
+RECORDS = [
+    {'id': 'rec-mcp', 'name': 'mcp.beepmedia.com', 'type': 'A', 'content': '44.206.106.173', 'proxied': False},
+    {'id': 'rec-www', 'name': 'www.beepmedia.com', 'type': 'CNAME', 'content': 'beepmedia.com', 'proxied': True}
+]
+
+
+def response(status=200, body=None, headers=None):
+    result = requests.Response()
+    result.status_code = status
+    result._content = json.dumps(body if body is not None else {'success': True, 'result': []}).encode()
+    result.headers.update(headers or {})
+    return result
+
+
+class StubSession:
+    """Stands in for requests.Session, replaying scripted responses or exceptions"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url.split('/client/v4', 1)[1], kwargs))
+        if not self.replies:
+            raise AssertionError(f'unexpected {method} {url}')
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def close(self):
+        pass
+
+
+def manager(replies=(), id_cache=None):
+    cf = CloudflareManager('token', backoff=0, id_cache=id_cache)
+    cf.session = StubSession(replies)
+    return cf
+
+
+def test_a_snapshot_seeds_the_zone_records_and_ids(tmp_path):
+    put = response(body={'success': True, 'result': {**RECORDS[0], 'content': '1.2.3.4'}})
+    cf = manager([put], id_cache=IdCache(tmp_path / 'ids.json'))
+    cf.seed_from_snapshot({'zone': 'beepmedia.com', 'zone_id': ZONE_ID, 'records': RECORDS})
+
+    assert cf.get_zone_id('mcp.beepmedia.com') == ZONE_ID
+    assert cf.with_zone('beepmedia.com', ZONE_ID, cf.list_records) == (ZONE_ID, RECORDS)
+    assert cf.update_record(ZONE_ID, {'name': 'mcp.beepmedia.com', 'type': 'A', 'content': '1.2.3.4'})
+    # The only API call is the PUT, straight to the snapshot's record ID
+    assert [(method, path) for method, path, _ in cf.session.calls] == [
+        ('PUT', f'/zones/{ZONE_ID}/dns_records/rec-mcp')]
+
+
+def record(name, content, record_type='A', **fields):
+    return {'name': name, 'type': record_type, 'content': content, **fields}
+
+
+def test_plan_matches_by_content_then_updates_in_place():
+    existing = [
+        {'id': '1', **record('mcp.beepmedia.com', '1.1.1.1')},
+        {'id': '2', **record('mcp.beepmedia.com', '2.2.2.2', ttl=60)},
+        {'id': '3', **record('old.beepmedia.com', '3.3.3.3')},
+        {'id': '4', **record('untouched.beepmedia.com', '4.4.4.4')}
+    ]
+    desired = [
+        record('mcp.beepmedia.com', '2.2.2.2', ttl=300),
+        record('mcp.beepmedia.com', '5.5.5.5'),
+        record('mcp.beepmedia.com', '6.6.6.6'),
+        record('old.beepmedia.com', '', absent=True)
+    ]
+
+    plan = plan_changes(existing, desired)
+
+    assert plan['update'] == [(existing[1], desired[0]), (existing[0], desired[1])]
+    assert plan['create'] == [desired[2]]
+    assert plan['delete'] == [existing[2]]
+
+
+def test_plan_is_empty_when_the_zone_already_matches():
+    existing = [{'id': '1', **record('MCP.beepmedia.com', '1.1.1.1', 'a', proxied=False)}]
+    assert plan_changes(existing, [record('mcp.beepmedia.com', '1.1.1.1', proxied=False)]) == {
+        'create': [], 'update': [], 'delete': []}
+
+
+def test_plan_deletes_leftovers_of_a_desired_pair_only():
+    existing = [{'id': '1', **record('mcp.beepmedia.com', '1.1.1.1')},
+                {'id': '2', **record('mcp.beepmedia.com', '2.2.2.2')},
+                {'id': '3', **record('mcp.beepmedia.com', 'mcp', 'TXT')}]
+    plan = plan_changes(existing, [record('mcp.beepmedia.com', '2.2.2.2')])
+    assert plan == {'create': [], 'update': [], 'delete': [existing[0]]}
+
+
+def test_post_is_not_resent_after_a_5xx_or_read_timeout():
+    cf = manager([response(502)])
+    assert cf._request('POST', '/zones/z/dns_records', json={}).status_code == 502
+    assert len(cf.session.calls) == 1
+
+    cf = manager([requests.ReadTimeout('slow')])
+    with pytest.raises(requests.ReadTimeout):
+        cf._request('PATCH', '/zones/z/dns_records/r', json={})
+    assert len(cf.session.calls) == 1
+
+
+def test_post_is_retried_when_it_never_reached_cloudflare():
+    cf = manager([response(429, headers={'Retry-After': '0'}), requests.ConnectTimeout('no route'), response()])
+    assert cf._request('POST', '/zones/z/dns_records', json={}).status_code == 200
+    assert len(cf.session.calls) == 3
+    assert [call['attempt'] for call in cf.call_stats] == [1, 2, 3]
+
+
+def test_get_is_retried_on_5xx_and_timeouts_up_to_the_limit():
+    cf = manager([response(503), requests.ReadTimeout('slow'), response()])
+    assert cf._request('GET', '/zones').status_code == 200
+    assert cf.latency_summary()['retries'] == 2
+
+    cf = manager([response(500)] * (MAX_RETRIES + 1))
+    assert cf._request('GET', '/zones').status_code == 500
+    assert len(cf.session.calls) == MAX_RETRIES + 1
+
+
+def test_id_cache_expires_persists_and_drops_a_whole_zone(tmp_path, monkeypatch):
+    path = tmp_path / 'ids.json'
+    cache = IdCache(path)
+    cache.set('zone:beepmedia.com', id=ZONE_ID)
+    cache.set(record_key(ZONE_ID, 'MCP.beepmedia.com', 'a'), id='rec-mcp', content='1.1.1.1')
+    cache.set(record_key('zone-2', 'mcp.example.com', 'A'), id='rec-other', content='2.2.2.2')
+    cache.save()
+    assert not cache.dirty
+
+    reloaded = IdCache(path)
+    assert reloaded.get(f'record:{ZONE_ID}:mcp.beepmedia.com:A', 60)['id'] == 'rec-mcp'
+    assert IdCache(path, refresh=True).get('zone:beepmedia.com', 60) is None
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert reloaded.get('zone:beepmedia.com', 60) is None
+    assert reloaded.get('zone:beepmedia.com', 600)['id'] == ZONE_ID
+
+    reloaded.invalidate_zone(ZONE_ID)
+    assert set(reloaded.entries) == {record_key('zone-2', 'mcp.example.com', 'A')}
+    assert reloaded.dirty
+
+
+def test_a_stale_cached_record_id_is_looked_up_again(tmp_path):
+    cache = IdCache(tmp_path / 'ids.json')
+    key = record_key(ZONE_ID, 'mcp.beepmedia.com', 'A')
+    cache.set(key, id='rec-gone', content='1.1.1.1')
+    fresh = {**RECORDS[0], 'id': 'rec-new'}
+    cf = manager([
+        response(404, {'success': False, 'errors': [{'code': 81044, 'message': 'Record not found'}]}),
+        response(body={'success': True, 'result': [fresh]}),
+        response(body={'success': True, 'result': {**fresh, 'content': '1.2.3.4'}})
+    ], id_cache=cache)
+
+    assert cf.update_record(ZONE_ID, {'name': 'mcp.beepmedia.com', 'type': 'A', 'content': '1.2.3.4'})
+    assert [(method, path) for method, path, _ in cf.session.calls] == [
+        ('PUT', f'/zones/{ZONE_ID}/dns_records/rec-gone'),
+        ('GET', f'/zones/{ZONE_ID}/dns_records'),
+        ('PUT', f'/zones/{ZONE_ID}/dns_records/rec-new')]
+    assert (cache.get(key, 60)['id'], cache.get(key, 60)['content']) == ('rec-new', '1.2.3.4')
+
+
+def test_a_stale_cached_zone_id_is_resolved_again_once(tmp_path):
+    cache = IdCache(tmp_path / 'ids.json')
+    cache.set('zone:beepmedia.com', id='zone-gone')
+    cf = manager([
+        response(404, {'success': False, 'errors': [{'code': 7003, 'message': 'Could not route'}]}),
+        response(body={'success': True, 'result': [{'id': ZONE_ID}]}),
+        response(body={'success': True, 'result': RECORDS, 'result_info': {'total_pages': 1}})
+    ], id_cache=cache)
+
+    zone_id = cf.get_zone_id('beepmedia.com')
+    assert cf.with_zone('beepmedia.com', zone_id, cf.list_records) == (ZONE_ID, RECORDS)
+    assert cache.get('zone:beepmedia.com', 60)['id'] == ZONE_ID
+    assert [(method, path) for method, path, _ in cf.session.calls] == [
+        ('GET', '/zones/zone-gone/dns_records'),
+        ('GET', '/zones'),
+        ('GET', f'/zones/{ZONE_ID}/dns_records')]
+
+    # A zone that is still unknown after the lookup is not retried again
+    cf = manager([response(404), response(body={'success': True, 'result': [{'id': 'zone-gone'}]})],
+                 id_cache=IdCache(tmp_path / 'other.json'))
+    with pytest.raises(StaleZoneError):
+        cf.with_zone('beepmedia.com', 'zone-gone', cf.list_records)
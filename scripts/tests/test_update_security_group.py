@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+# update_security_group.py lives in repos/
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'repos'))
+
+from update_security_group import merge_intervals, plan_reconcile, subtract_intervals
+
+
+def rule(protocol, low, high, cidr='0.0.0.0/0', description=None):
+    return {'protocol': protocol, 'from': low, 'to': high, 'cidr': cidr, 'description': description}
+
+
+def test_merge_joins_overlapping_and_adjacent_ranges():
+    assert merge_intervals([(8000, 8010), (443, 443), (8011, 8020), (8005, 8006), (80, 80)]) == [
+        (80, 80), (443, 443), (8000, 8020)]
+    assert merge_intervals([(0, 65535), (22, 22)]) == [(0, 65535)]
+    assert merge_intervals([]) == []
+
+
+def test_subtract_splits_a_range_around_what_is_covered():
+    assert subtract_intervals([(8000, 8020)], [(8005, 8009), (8015, 8015)], 'tcp') == [
+        (8000, 8004), (8010, 8014), (8016, 8020)]
+    assert subtract_intervals([(0, 65535)], [(0, 21), (443, 443)], 'tcp') == [(22, 442), (444, 65535)]
+    assert subtract_intervals([(443, 443)], [(0, 65535)], 'tcp') == []
+    assert subtract_intervals([(22, 22), (80, 80)], [], 'udp') == [(22, 22), (80, 80)]
+
+
+def test_subtract_matches_exactly_for_protocols_without_ports():
+    assert subtract_intervals([(-1, -1)], [(-1, -1)], '-1') == []
+    assert subtract_intervals([(-1, -1)], [], '-1') == [(-1, -1)]
+    # icmp "ports" are type/code, never a range
+    assert subtract_intervals([(3, 4)], [(0, 65535)], 'icmp') == [(3, 4)]
+
+
+def test_plan_keeps_rules_inside_the_policy_and_revokes_the_rest():
+    existing = [rule('tcp', 443, 443), rule('tcp', 22, 22, '10.0.0.0/8'), rule('tcp', 8000, 9000)]
+    desired = [rule('tcp', 443, 443, description='HTTPS'), rule('tcp', 8000, 8020, description='MCP')]
+
+    plan = plan_reconcile(existing, desired)
+
+    assert plan['keep'] == [existing[0]]
+    assert plan['revoke'] == [existing[1], existing[2]]
+    assert plan['authorize'] == [rule('tcp', 8000, 8020, description='MCP')]
+
+
+def test_plan_only_authorizes_the_gaps_of_a_full_port_range():
+    existing = [rule('tcp', 22, 22), rule('tcp', 443, 443)]
+    plan = plan_reconcile(existing, [rule('tcp', 0, 65535, description='all tcp')])
+
+    assert plan['keep'] == existing
+    assert plan['revoke'] == []
+    assert plan['authorize'] == [rule('tcp', 0, 21, description='all tcp'),
+                                 rule('tcp', 23, 442, description='all tcp'),
+                                 rule('tcp', 444, 65535, description='all tcp')]
+
+
+def test_plan_treats_all_traffic_as_its_own_rule():
+    existing = [rule('-1', -1, -1, '10.0.0.0/8'), rule('tcp', 443, 443, '10.0.0.0/8')]
+    desired = [rule('-1', -1, -1, '10.0.0.0/8'), rule('-1', -1, -1, '::/0')]
+
+    plan = plan_reconcile(existing, desired)
+
+    # Protocol -1 covers every port, but only an identical -1 rule matches it
+    assert plan['keep'] == [existing[0]]
+    assert plan['revoke'] == [existing[1]]
+    assert plan['authorize'] == [rule('-1', -1, -1, '::/0')]
+
+
+def test_plan_is_empty_when_the_group_matches():
+    rules = [rule('tcp', 80, 80), rule('tcp', 443, 443, '::/0'), rule('udp', 5000, 5100)]
+    assert plan_reconcile(rules, rules) == {'keep': rules, 'revoke': [], 'authorize': []}